@@ -0,0 +1,31 @@
+"""add_text_stats_to_chapters
+
+Revision ID: 5e9d0c2b7f14
+Revises: d41b8f3a9e27
+Create Date: 2026-10-19 11:48:05.611902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9d0c2b7f14'
+down_revision = 'd41b8f3a9e27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Add text statistics columns to chapters table
+    # (text_stats of existing chapters is calculated lazily on first use)
+    op.add_column('chapters', sa.Column('character_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('chapters', sa.Column('reading_time_minutes', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('chapters', sa.Column('text_stats', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    # Remove text statistics columns from chapters table
+    op.drop_column('chapters', 'text_stats')
+    op.drop_column('chapters', 'reading_time_minutes')
+    op.drop_column('chapters', 'character_count')
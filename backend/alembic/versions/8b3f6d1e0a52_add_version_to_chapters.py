@@ -0,0 +1,26 @@
+"""add_version_to_chapters
+
+Revision ID: 8b3f6d1e0a52
+Revises: 5e9d0c2b7f14
+Create Date: 2026-10-19 13:20:41.274518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b3f6d1e0a52'
+down_revision = '5e9d0c2b7f14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Add content version column to chapters table (for optimistic concurrency on autosave)
+    op.add_column('chapters', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    # Remove content version column from chapters table
+    op.drop_column('chapters', 'version')
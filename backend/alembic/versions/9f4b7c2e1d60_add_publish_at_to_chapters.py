@@ -0,0 +1,32 @@
+"""add_publish_at_to_chapters
+
+Revision ID: 9f4b7c2e1d60
+Revises: e8a4b2d6f137
+Create Date: 2026-10-19 21:14:52.613027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f4b7c2e1d60'
+down_revision = 'e8a4b2d6f137'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Add scheduled release time to chapters table
+    op.add_column('chapters', sa.Column('publish_at', sa.DateTime(timezone=True), nullable=True))
+    # Partial index over scheduled chapters only, in release order
+    op.create_index(
+        'ix_chapters_publish_at', 'chapters', ['publish_at'],
+        unique=False, postgresql_where=sa.text('publish_at IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    # Remove publish_at column from chapters table
+    op.drop_index('ix_chapters_publish_at', table_name='chapters')
+    op.drop_column('chapters', 'publish_at')
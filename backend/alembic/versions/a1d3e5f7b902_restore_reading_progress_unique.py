@@ -0,0 +1,36 @@
+"""restore_reading_progress_unique
+
+Revision ID: a1d3e5f7b902
+Revises: 9f4b7c2e1d60
+Create Date: 2026-10-20 09:12:40.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1d3e5f7b902'
+down_revision = '9f4b7c2e1d60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 38eed8de1ea3 dropped the constraint the progress upserts use as their
+    # ON CONFLICT target; keep the most recently read row per user and book
+    op.execute(
+        """
+        DELETE FROM reading_progress AS older
+        USING reading_progress AS newer
+        WHERE older.user_id = newer.user_id
+          AND older.book_id = newer.book_id
+          AND (older.last_read_at, older.id) < (newer.last_read_at, newer.id)
+        """
+    )
+    op.create_unique_constraint('uq_reading_progress_user_book', 'reading_progress', ['user_id', 'book_id'])
+
+
+def downgrade() -> None:
+    # Duplicates removed by the upgrade are not restored
+    op.drop_constraint('uq_reading_progress_user_book', 'reading_progress', type_='unique')
@@ -0,0 +1,27 @@
+"""add_compiled_graph_to_chapters
+
+Revision ID: a7c2e91f4b60
+Revises: 38eed8de1ea3
+Create Date: 2026-10-19 10:12:41.503117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c2e91f4b60'
+down_revision = '38eed8de1ea3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Add compiled node graph column to chapters table
+    # (Existing interactive chapters are compiled lazily on first use)
+    op.add_column('chapters', sa.Column('compiled_graph', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    # Remove compiled_graph column from chapters table
+    op.drop_column('chapters', 'compiled_graph')
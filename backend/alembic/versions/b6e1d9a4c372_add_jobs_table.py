@@ -0,0 +1,58 @@
+"""add_jobs_table
+
+Revision ID: b6e1d9a4c372
+Revises: f2a4c6e8b013
+Create Date: 2026-10-19 16:42:37.215804
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e1d9a4c372'
+down_revision = 'f2a4c6e8b013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create jobs table
+    op.create_table('jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('queue', sa.String(length=50), nullable=False),
+        sa.Column('task', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.Column('status', sa.Enum('QUEUED', 'RUNNING', 'SUCCEEDED', 'FAILED', name='jobstatus'), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=200), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('run_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key')
+    )
+    op.create_index(op.f('ix_jobs_id'), 'jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_jobs_task'), 'jobs', ['task'], unique=False)
+    op.create_index(op.f('ix_jobs_status'), 'jobs', ['status'], unique=False)
+    # Partial index over waiting jobs only, in claim order
+    op.create_index(
+        'ix_jobs_claim', 'jobs', ['queue', sa.text('priority DESC'), 'run_at'],
+        unique=False, postgresql_where=sa.text("status = 'QUEUED'")
+    )
+
+
+def downgrade() -> None:
+    # Drop jobs table
+    op.drop_index('ix_jobs_claim', table_name='jobs')
+    op.drop_index(op.f('ix_jobs_status'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_task'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_id'), table_name='jobs')
+    op.drop_table('jobs')
+    sa.Enum(name='jobstatus').drop(op.get_bind(), checkfirst=True)
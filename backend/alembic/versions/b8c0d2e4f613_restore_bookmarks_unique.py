@@ -0,0 +1,36 @@
+"""restore_bookmarks_unique
+
+Revision ID: b8c0d2e4f613
+Revises: a1d3e5f7b902
+Create Date: 2026-10-20 09:31:07.524816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8c0d2e4f613'
+down_revision = 'a1d3e5f7b902'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 38eed8de1ea3 dropped the constraint the bookmark sync upserts use as
+    # their ON CONFLICT target; keep the most recently written row per user and book
+    op.execute(
+        """
+        DELETE FROM bookmarks AS older
+        USING bookmarks AS newer
+        WHERE older.user_id = newer.user_id
+          AND older.book_id = newer.book_id
+          AND (older.updated_at, older.id) < (newer.updated_at, newer.id)
+        """
+    )
+    op.create_unique_constraint('uq_bookmarks_user_book', 'bookmarks', ['user_id', 'book_id'])
+
+
+def downgrade() -> None:
+    # Duplicates removed by the upgrade are not restored
+    op.drop_constraint('uq_bookmarks_user_book', 'bookmarks', type_='unique')
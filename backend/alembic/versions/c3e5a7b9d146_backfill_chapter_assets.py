@@ -0,0 +1,34 @@
+"""backfill_chapter_assets
+
+Revision ID: c3e5a7b9d146
+Revises: b8c0d2e4f613
+Create Date: 2026-10-20 10:02:18.905431
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e5a7b9d146'
+down_revision = 'b8c0d2e4f613'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Queue the job storing the compiled graphs and asset manifests of chapters
+    # saved before they were kept (it re-enqueues itself batch by batch)
+    op.execute(
+        """
+        INSERT INTO jobs (queue, task, payload, priority, status, attempts, max_attempts, idempotency_key)
+        VALUES ('default', 'chapters.backfill_assets', '{"after_id": 0}', -10, 'QUEUED', 0, 5,
+                'chapters.backfill_assets:0')
+        ON CONFLICT (idempotency_key) DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    # Stored graphs and manifests are kept; drop the job if it has not run
+    op.execute("DELETE FROM jobs WHERE task = 'chapters.backfill_assets' AND status = 'QUEUED'")
@@ -0,0 +1,48 @@
+"""add_outbox_events_table
+
+Revision ID: c9d2e5f1a806
+Revises: b6e1d9a4c372
+Create Date: 2026-10-19 18:20:51.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9d2e5f1a806'
+down_revision = 'b6e1d9a4c372'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create outbox_events table
+    op.create_table('outbox_events',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('event_type', sa.String(length=100), nullable=False),
+        sa.Column('aggregate_type', sa.String(length=50), nullable=False),
+        sa.Column('aggregate_id', sa.Integer(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('log_offset', sa.BigInteger(), nullable=True),
+        sa.Column('published_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('log_offset')
+    )
+    op.create_index(op.f('ix_outbox_events_id'), 'outbox_events', ['id'], unique=False)
+    op.create_index(op.f('ix_outbox_events_event_type'), 'outbox_events', ['event_type'], unique=False)
+    # Events still waiting for the relay
+    op.create_index(
+        'ix_outbox_events_pending', 'outbox_events', ['id'],
+        unique=False, postgresql_where=sa.text('log_offset IS NULL')
+    )
+
+
+def downgrade() -> None:
+    # Drop outbox_events table
+    op.drop_index('ix_outbox_events_pending', table_name='outbox_events')
+    op.drop_index(op.f('ix_outbox_events_event_type'), table_name='outbox_events')
+    op.drop_index(op.f('ix_outbox_events_id'), table_name='outbox_events')
+    op.drop_table('outbox_events')
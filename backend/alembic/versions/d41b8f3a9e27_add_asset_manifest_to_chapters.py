@@ -0,0 +1,27 @@
+"""add_asset_manifest_to_chapters
+
+Revision ID: d41b8f3a9e27
+Revises: a7c2e91f4b60
+Create Date: 2026-10-19 11:02:17.284561
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41b8f3a9e27'
+down_revision = 'a7c2e91f4b60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Add asset manifest column to chapters table
+    # (Existing interactive chapters get a manifest lazily on first use)
+    op.add_column('chapters', sa.Column('asset_manifest', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    # Remove asset_manifest column from chapters table
+    op.drop_column('chapters', 'asset_manifest')
@@ -0,0 +1,35 @@
+"""backfill_chapter_text_stats
+
+Revision ID: d6f8b0c2e457
+Revises: c3e5a7b9d146
+Create Date: 2026-10-20 11:14:52.630184
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6f8b0c2e457'
+down_revision = 'c3e5a7b9d146'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Queue the job recounting chapters without text stats or counted by an
+    # earlier TEXT_STATS_VERSION, which skipped choice labels, questions and
+    # captions (it re-enqueues itself batch by batch)
+    op.execute(
+        """
+        INSERT INTO jobs (queue, task, payload, priority, status, attempts, max_attempts, idempotency_key)
+        VALUES ('default', 'chapters.backfill_text_stats', '{"after_id": 0}', -10, 'QUEUED', 0, 5,
+                'chapters.backfill_text_stats:0')
+        ON CONFLICT (idempotency_key) DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    # Recounted stats are kept; drop the job if it has not run
+    op.execute("DELETE FROM jobs WHERE task = 'chapters.backfill_text_stats' AND status = 'QUEUED'")
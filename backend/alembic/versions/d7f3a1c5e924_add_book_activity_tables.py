@@ -0,0 +1,62 @@
+"""add_book_activity_tables
+
+Revision ID: d7f3a1c5e924
+Revises: c9d2e5f1a806
+Create Date: 2026-10-19 19:42:07.318262
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7f3a1c5e924'
+down_revision = 'c9d2e5f1a806'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create book_activity_buckets table
+    op.create_table('book_activity_buckets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('views', sa.Integer(), nullable=False),
+        sa.Column('likes', sa.Integer(), nullable=False),
+        sa.Column('ratings', sa.Integer(), nullable=False),
+        sa.Column('bookmarks', sa.Integer(), nullable=False),
+        sa.Column('comments', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('book_id', 'bucket_start', name='uq_book_activity_bucket')
+    )
+    op.create_index(op.f('ix_book_activity_buckets_id'), 'book_activity_buckets', ['id'], unique=False)
+    op.create_index(op.f('ix_book_activity_buckets_book_id'), 'book_activity_buckets', ['book_id'], unique=False)
+    op.create_index(op.f('ix_book_activity_buckets_bucket_start'), 'book_activity_buckets', ['bucket_start'], unique=False)
+
+    # Create book_trending_scores table
+    op.create_table('book_trending_scores',
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('log_score', sa.Float(), nullable=False),
+        sa.Column('last_activity_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('book_id')
+    )
+    op.create_index(op.f('ix_book_trending_scores_updated_at'), 'book_trending_scores', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    # Drop book_trending_scores table
+    op.drop_index(op.f('ix_book_trending_scores_updated_at'), table_name='book_trending_scores')
+    op.drop_table('book_trending_scores')
+
+    # Drop book_activity_buckets table
+    op.drop_index(op.f('ix_book_activity_buckets_bucket_start'), table_name='book_activity_buckets')
+    op.drop_index(op.f('ix_book_activity_buckets_book_id'), table_name='book_activity_buckets')
+    op.drop_index(op.f('ix_book_activity_buckets_id'), table_name='book_activity_buckets')
+    op.drop_table('book_activity_buckets')
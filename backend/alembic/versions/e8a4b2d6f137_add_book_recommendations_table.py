@@ -0,0 +1,37 @@
+"""add_book_recommendations_table
+
+Revision ID: e8a4b2d6f137
+Revises: d7f3a1c5e924
+Create Date: 2026-10-19 21:05:33.740915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a4b2d6f137'
+down_revision = 'd7f3a1c5e924'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create book_recommendations table
+    op.create_table('book_recommendations',
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('similar_book_ids', sa.ARRAY(sa.Integer()), nullable=False),
+        sa.Column('scores', sa.ARRAY(sa.Float()), nullable=False),
+        sa.Column('computed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('book_id')
+    )
+    op.create_index(op.f('ix_book_recommendations_computed_at'), 'book_recommendations', ['computed_at'], unique=False)
+
+
+def downgrade() -> None:
+    # Drop book_recommendations table
+    op.drop_index(op.f('ix_book_recommendations_computed_at'), table_name='book_recommendations')
+    op.drop_table('book_recommendations')
@@ -0,0 +1,45 @@
+"""restore_chapters_number_unique
+
+Revision ID: e9a1c3d5f768
+Revises: d6f8b0c2e457
+Create Date: 2026-10-20 11:48:26.193507
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9a1c3d5f768'
+down_revision = 'd6f8b0c2e457'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 38eed8de1ea3 dropped the constraint chapter reordering relies on; chapters
+    # sharing a number keep it for the oldest one, the others move past the
+    # book's last chapter in id order
+    op.execute(
+        """
+        UPDATE chapters
+        SET chapter_number = renumbered.chapter_number
+        FROM (
+            SELECT id, last_number + ROW_NUMBER() OVER (PARTITION BY book_id ORDER BY id) AS chapter_number
+            FROM (
+                SELECT id, book_id,
+                       MAX(chapter_number) OVER (PARTITION BY book_id) AS last_number,
+                       ROW_NUMBER() OVER (PARTITION BY book_id, chapter_number ORDER BY id) AS copy
+                FROM chapters
+            ) AS numbered
+            WHERE copy > 1
+        ) AS renumbered
+        WHERE chapters.id = renumbered.id
+        """
+    )
+    op.create_unique_constraint('uq_chapters_book_chapter_number', 'chapters', ['book_id', 'chapter_number'])
+
+
+def downgrade() -> None:
+    # Renumbered chapters keep their new numbers
+    op.drop_constraint('uq_chapters_book_chapter_number', 'chapters', type_='unique')
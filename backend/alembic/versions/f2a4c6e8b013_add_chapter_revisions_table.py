@@ -0,0 +1,45 @@
+"""add_chapter_revisions_table
+
+Revision ID: f2a4c6e8b013
+Revises: 8b3f6d1e0a52
+Create Date: 2026-10-19 14:05:12.480391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a4c6e8b013'
+down_revision = '8b3f6d1e0a52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create chapter_revisions table
+    op.create_table('chapter_revisions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('chapter_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('content_type', postgresql.ENUM('SIMPLE', 'INTERACTIVE', name='contenttype', create_type=False), nullable=False),
+        sa.Column('is_keyframe', sa.Boolean(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('word_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('chapter_id', 'version', name='uq_chapter_revisions_chapter_version')
+    )
+    op.create_index(op.f('ix_chapter_revisions_id'), 'chapter_revisions', ['id'], unique=False)
+    op.create_index(op.f('ix_chapter_revisions_chapter_id'), 'chapter_revisions', ['chapter_id'], unique=False)
+
+
+def downgrade() -> None:
+    # Drop chapter_revisions table
+    op.drop_index(op.f('ix_chapter_revisions_chapter_id'), table_name='chapter_revisions')
+    op.drop_index(op.f('ix_chapter_revisions_id'), table_name='chapter_revisions')
+    op.drop_table('chapter_revisions')
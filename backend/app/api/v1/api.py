@@ -2,8 +2,8 @@
 API v1 router aggregation
 """
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, users, books, chapters, files, chapter_templates
-from app.api.v1.endpoints import reading_progress, bookmarks, ratings, comments
+from app.api.v1.endpoints import auth, users, books, chapters, chapter_revisions, files, chapter_templates
+from app.api.v1.endpoints import reading_progress, bookmarks, ratings, comments, events
 
 api_router = APIRouter()
 
@@ -12,12 +12,14 @@ api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(books.router, prefix="/books", tags=["books"])
 api_router.include_router(chapters.router, tags=["chapters"])
+api_router.include_router(chapter_revisions.router, tags=["chapter-revisions"])
 api_router.include_router(chapter_templates.router, tags=["chapter-templates"])
 api_router.include_router(reading_progress.router, prefix="/reading-progress", tags=["reading-progress"])
 api_router.include_router(bookmarks.router, prefix="/bookmarks", tags=["bookmarks"])
 api_router.include_router(ratings.router, prefix="/ratings", tags=["ratings"])
 api_router.include_router(comments.router, prefix="/comments", tags=["comments"])
 api_router.include_router(files.router, prefix="/files", tags=["files"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
 
 @api_router.get("/")
 async def api_root():
@@ -8,13 +8,14 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from app.core.config import settings
 from app.core.deps import get_db, get_current_user
+from app.core.instrumentation import InstrumentedRoute
 from app.core.security import create_access_token, create_refresh_token
 from app.models.user import User
 from app.schemas.user import UserCreate, User as UserSchema, Token
 from app.services import user_service
 from jose import jwt, JWTError
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.post("/register", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
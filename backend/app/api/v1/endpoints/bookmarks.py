@@ -5,11 +5,13 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from app.core.deps import get_db, get_current_user
+from app.core.instrumentation import InstrumentedRoute
 from app.models.user import User
-from app.schemas.bookmark import Bookmark, BookmarkCreate
-from app.services import bookmark_service
+from app.schemas.bookmark import Bookmark, BookmarkCreate, BookmarkSyncBatch
+from app.schemas.sync import SyncBatchResponse
+from app.services import bookmark_service, sync_service
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.post("/", response_model=Bookmark, status_code=status.HTTP_201_CREATED)
@@ -29,6 +31,27 @@ def create_bookmark(
     return bookmark
 
 
+@router.post("/batch", response_model=SyncBatchResponse)
+def sync_bookmarks(
+    batch: BookmarkSyncBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Apply queued bookmark adds/removes from an offline client in one request
+    
+    - **items**: Array (max 1000) of:
+      - **book_id**: ID of the book
+      - **bookmarked**: true to add the bookmark, false to remove it
+      - **client_timestamp**: When the toggle happened on the client
+    
+    Conflicts are resolved last-writer-wins per book. Returns a result per item
+    (applied, superseded or invalid), in request order.
+    """
+    results = bookmark_service.sync_bookmarks(db, current_user.id, batch.items)
+    return sync_service.build_batch_response(results)
+
+
 @router.get("/", response_model=List[Bookmark])
 def get_my_bookmarks(
     page: int = Query(1, ge=1, description="Page number"),
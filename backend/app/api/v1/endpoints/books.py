@@ -1,17 +1,27 @@
 """
 Books endpoints - CRUD operations for books
 """
-from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import re
+from typing import Optional, List, Iterator
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from app.core.deps import get_db, get_current_user, get_current_author
+from app.core.config import settings
+from app.core.deps import get_db, get_read_db, get_current_user, get_current_author
+from app.core.instrumentation import InstrumentedRoute
+from app.core.responses import model_response
+from app.db.session import SessionLocal
 from app.models.user import User
 from app.models.book import BookStatus
-from app.schemas.book import Book, BookCreate, BookUpdate, BookListResponse, BookStatistics
-from app.services import book_service
+from app.schemas.book import (
+    Book, BookCreate, BookUpdate, BookListResponse, BookStatistics, TrendingBook, TrendingBookListResponse,
+    RecommendedBook, RecommendationListResponse
+)
+from app.services import book_service, book_export_service, recommendation_service, trending_service
+from app.services.trending_tracker import trending_tracker
 import math
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.post("/", response_model=Book, status_code=status.HTTP_201_CREATED)
@@ -43,7 +53,7 @@ def get_books(
     genre: Optional[str] = Query(None, description="Filter by genre"),
     search: Optional[str] = Query(None, description="Search in title and description"),
     tags: Optional[str] = Query(None, description="Comma-separated tags to filter by"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get all books with pagination and filtering
@@ -77,13 +87,13 @@ def get_books(
     
     total_pages = math.ceil(total / page_size) if total > 0 else 0
     
-    return {
+    return model_response(BookListResponse, {
         "books": books,
         "total": total,
         "page": page,
         "page_size": page_size,
         "total_pages": total_pages
-    }
+    })
 
 
 @router.get("/my-books", response_model=List[Book])
@@ -100,6 +110,35 @@ def get_my_books(
     return books
 
 
+@router.get("/trending", response_model=TrendingBookListResponse)
+def get_trending_books(
+    genre: Optional[str] = Query(None, description="Rank within a genre"),
+    tag: Optional[str] = Query(None, description="Rank within a tag (ignored with genre)"),
+    limit: int = Query(20, ge=1, le=settings.TRENDING_TOP_K, description="Number of books"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get trending books, overall or within a genre or tag
+    
+    Books are ranked by recent weighted activity (views, likes, new ratings,
+    bookmarks and comments), each activity counting half as much every
+    TRENDING_HALF_LIFE_HOURS. Rankings are kept in memory and refreshed every
+    few seconds, so new activity shows up with a short delay.
+    """
+    if genre is not None:
+        tag = None
+    ranked = trending_tracker.get_trending(genre=genre, tag=tag, limit=limit)
+    books = trending_service.get_trending_books(db, ranked, genre=genre, tag=tag)
+    return {
+        "books": [
+            TrendingBook(**Book.model_validate(book).model_dump(), trending_score=round(score, 4))
+            for book, score in books
+        ],
+        "genre": genre,
+        "tag": tag
+    }
+
+
 @router.get("/{book_id}", response_model=Book)
 def get_book(
     book_id: int,
@@ -213,7 +252,7 @@ def like_book(
 @router.get("/{book_id}/statistics", response_model=BookStatistics)
 def get_book_statistics(
     book_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get comprehensive statistics for a book (public endpoint)
@@ -238,3 +277,90 @@ def get_book_statistics(
     
     return stats
 
+
+@router.get("/{book_id}/recommendations", response_model=RecommendationListResponse)
+def get_book_recommendations(
+    book_id: int,
+    limit: int = Query(10, ge=1, le=settings.RECOMMENDATIONS_TOP_N, description="Number of books"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get books often read by readers of this book (public endpoint)
+    
+    Lists are precomputed by the recommendation job from bookmarks, ratings
+    and reading progress; a book without enough readers has none yet.
+    """
+    book = book_service.get_book_by_id(db, book_id)
+    if not book:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found"
+        )
+    
+    books = recommendation_service.get_similar_books(db, book_id, limit)
+    return {
+        "books": [
+            RecommendedBook(**Book.model_validate(similar).model_dump(), score=round(score, 4))
+            for similar, score in books
+        ]
+    }
+
+
+@router.get("/{book_id}/export")
+def export_book(
+    book_id: int,
+    format: str = Query("epub", pattern="^(epub|html|ndjson)$", description="epub, html or ndjson"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Download a book's published chapters as one file (public endpoint)
+
+    - **epub**: EPUB 3 e-book
+    - **html**: single HTML page
+    - **ndjson**: one chapter object per line, in the chapter import format
+
+    The file is streamed as it is built. Finished exports are cached until a
+    published chapter or the book's details change; the ETag changes with them.
+    """
+    book = book_service.get_book_by_id(db, book_id)
+    if not book:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found"
+        )
+
+    key = book_export_service.get_export_key(db, book)
+    extension, media_type = book_export_service.EXPORT_FORMATS[format]
+    filename = f"{re.sub(r'[^A-Za-z0-9]+', '-', book.title).strip('-').lower() or 'book'}.{extension}"
+    headers = {
+        "ETag": f'"{key}"',
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    }
+
+    if if_none_match and f'"{key}"' in if_none_match:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": headers["ETag"]})
+
+    cached_path = book_export_service.get_cached_export(book_id, format, key)
+    if cached_path:
+        return FileResponse(cached_path, media_type=media_type, headers=headers)
+
+    # The request's session is closed when this handler returns, before the export is streamed
+    return StreamingResponse(
+        _stream_export(book_id, format, key),
+        media_type=media_type,
+        headers=headers
+    )
+
+
+def _stream_export(book_id: int, export_format: str, key: str) -> Iterator[bytes]:
+    """Build an export with its own session, caching it once complete"""
+    db = SessionLocal()
+    try:
+        book = book_service.get_book_by_id(db, book_id)
+        if not book:
+            return
+        chunks = book_export_service.export_book(db, book, export_format)
+        yield from book_export_service.cache_export(chunks, book_id, export_format, key)
+    finally:
+        db.close()
@@ -0,0 +1,156 @@
+"""
+Chapter revision endpoints - Revision history, diff and restore
+"""
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from app.core.deps import get_db, get_current_author
+from app.core.instrumentation import InstrumentedRoute
+from app.models.user import User
+from app.models.chapter import Chapter as ChapterModel
+from app.schemas.chapter import (
+    Chapter, ChapterUpdate, ChapterRevisionListResponse, ChapterRevisionContent, ChapterRevisionDiff
+)
+from app.services import chapter_service, chapter_revision_service
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+
+def _get_own_chapter(db: Session, chapter_id: int, user: User, load_content: bool = False) -> ChapterModel:
+    """Get a chapter the user is the author of, or raise 404/403"""
+    if load_content:
+        chapter = chapter_service.get_chapter_by_id(db, chapter_id)
+    else:
+        chapter = chapter_service.get_chapter_without_content(db, chapter_id)
+    if not chapter:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chapter not found"
+        )
+
+    # Check if user is the book author
+    if not chapter_service.is_chapter_author(db, chapter, user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this chapter's revisions"
+        )
+    return chapter
+
+
+@router.get("/chapters/{chapter_id}/revisions", response_model=ChapterRevisionListResponse)
+def get_chapter_revisions(
+    chapter_id: int,
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(50, ge=1, le=100, description="Items per page"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_author)
+):
+    """
+    Get the revision history of a chapter, newest first (Author only - must be book owner)
+
+    Old revisions are thinned out over time, so versions may have gaps.
+    """
+    chapter = _get_own_chapter(db, chapter_id, current_user)
+
+    skip = (page - 1) * page_size
+    revisions, total = chapter_revision_service.get_revisions(db, chapter_id, skip=skip, limit=page_size)
+
+    return {
+        "chapter_id": chapter_id,
+        "current_version": chapter.version,
+        "revisions": revisions,
+        "total": total
+    }
+
+
+@router.get("/chapters/{chapter_id}/revisions/{version}", response_model=ChapterRevisionContent)
+def get_chapter_revision(
+    chapter_id: int,
+    version: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_author)
+):
+    """
+    Get the content of a chapter revision (Author only - must be book owner)
+    """
+    _get_own_chapter(db, chapter_id, current_user)
+
+    revision = chapter_revision_service.get_revision_content(db, chapter_id, version)
+    if revision is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Revision not found"
+        )
+
+    content_data, content_type = revision
+    return {
+        "chapter_id": chapter_id,
+        "version": version,
+        "content_type": content_type,
+        "content_data": content_data
+    }
+
+
+@router.get("/chapters/{chapter_id}/revisions/{version}/diff", response_model=ChapterRevisionDiff)
+def get_chapter_revision_diff(
+    chapter_id: int,
+    version: int,
+    against: Optional[int] = Query(None, ge=1, description="Version to compare with (default: the current version)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_author)
+):
+    """
+    Get the changes from one revision to another (Author only - must be book owner)
+
+    Returns the delta that turns revision `against` into revision `version`,
+    in the same format as the delta save (PATCH) request.
+    """
+    chapter = _get_own_chapter(db, chapter_id, current_user)
+    from_version = against if against is not None else chapter.version
+
+    delta = chapter_revision_service.diff_revisions(db, chapter_id, from_version, version)
+    if delta is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Revision not found"
+        )
+
+    return {
+        "chapter_id": chapter_id,
+        "from_version": from_version,
+        "to_version": version,
+        **delta
+    }
+
+
+@router.post("/chapters/{chapter_id}/revisions/{version}/restore", response_model=Chapter)
+def restore_chapter_revision(
+    chapter_id: int,
+    version: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_author)
+):
+    """
+    Restore the content of a chapter revision (Author only - must be book owner)
+
+    The restored content is saved as a new version; later revisions are kept.
+    """
+    chapter = _get_own_chapter(db, chapter_id, current_user, load_content=True)
+
+    revision = chapter_revision_service.get_revision_content(db, chapter_id, version)
+    if revision is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Revision not found"
+        )
+
+    content_data, content_type = revision
+    try:
+        return chapter_service.update_chapter(
+            db, chapter, ChapterUpdate(content_type=content_type, content_data=content_data)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
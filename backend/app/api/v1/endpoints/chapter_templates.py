@@ -5,6 +5,7 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from app.core.deps import get_db, get_current_user, get_current_author
+from app.core.instrumentation import InstrumentedRoute
 from app.models.user import User
 from app.schemas.chapter_template import (
     ChapterTemplate, ChapterTemplateCreate, ChapterTemplateUpdate,
@@ -12,7 +13,7 @@ from app.schemas.chapter_template import (
 )
 from app.services import chapter_template_service
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.post("/chapter-templates", response_model=ChapterTemplate, status_code=status.HTTP_201_CREATED)
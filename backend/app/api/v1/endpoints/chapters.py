@@ -1,18 +1,32 @@
 """
 Chapters endpoints - CRUD operations for book chapters
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import json
+import tempfile
+from typing import List, Optional, Tuple, IO, Iterator
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.core.deps import get_db, get_current_user, get_current_author
+from app.core.coalescing import coalesce_requests
+from app.core.config import settings
+from app.core.deps import get_db, get_read_db, get_current_user, get_current_author
+from app.core.instrumentation import InstrumentedRoute
+from app.core.rate_limit import rate_limit
+from app.core.responses import model_response
+from app.db.session import SessionLocal
 from app.models.user import User
+from app.models.chapter import Chapter as ChapterModel, ContentType
 from app.schemas.chapter import (
     Chapter, ChapterCreate, ChapterUpdate, ChapterSummary,
-    ChapterListResponse, ChapterReorder
+    ChapterListResponse, ChapterReorder, ChapterNodeWindow, ChapterNodeBatch,
+    ChapterAssetManifest, ChapterTextStats, ChapterPatch, ChapterPatchResult,
+    ChapterMoveBatch, ChapterMoveResponse
 )
-from app.services import chapter_service, book_service
+from app.services import chapter_service, book_service, chapter_import_service, chapter_release_service
+from app.utils.chapter_graph import get_lookahead_window, get_node_targets
+from app.utils.chapter_assets import extract_node_assets, build_preload_header
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.post("/books/{book_id}/chapters", response_model=Chapter, status_code=status.HTTP_201_CREATED)
@@ -31,6 +45,7 @@ def create_chapter(
     - **content_type**: simple or interactive
     - **content_data**: Chapter content (JSON format)
     - **is_published**: Whether chapter is published
+    - **publish_at**: Release time of an unpublished chapter (published automatically)
     """
     # Check if book exists
     book = book_service.get_book_by_id(db, book_id)
@@ -48,8 +63,7 @@ def create_chapter(
         )
     
     # Check if chapter number already exists
-    existing_chapters = chapter_service.get_chapters_by_book(db, book_id)
-    if any(ch.chapter_number == chapter_in.chapter_number for ch in existing_chapters):
+    if chapter_service.chapter_number_exists(db, book_id, chapter_in.chapter_number):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Chapter number {chapter_in.chapter_number} already exists for this book"
@@ -59,11 +73,82 @@ def create_chapter(
     return chapter
 
 
-@router.get("/books/{book_id}/chapters", response_model=ChapterListResponse)
+@router.post("/books/{book_id}/chapters/import")
+def import_chapters(
+    book_id: int,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_author)
+):
+    """
+    Import many chapters at once (Authors only - must be book owner)
+    
+    - **file**: NDJSON (one chapter object per line) or a zip archive of
+      .json chapter objects and .txt/.md texts, imported in name order
+    
+    Chapter objects have the same fields as chapter creation; chapter_number
+    is optional (numbered after the last chapter) and {"title", "text"} is
+    accepted for simple chapters.
+    
+    Responds with a stream of NDJSON progress events ending in a
+    "completed" or "failed" event. Nothing is imported if any chapter is invalid.
+    """
+    # Check if book exists
+    book = book_service.get_book_by_id(db, book_id)
+    if not book:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found"
+        )
+    
+    # Check if user is the book author
+    if not book_service.is_book_author(book, current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to add chapters to this book"
+        )
+    
+    # The upload is closed when this handler returns, before the import is streamed
+    spool = tempfile.TemporaryFile()
+    while chunk := file.file.read(1024 * 1024):
+        spool.write(chunk)
+        if spool.tell() > settings.IMPORT_MAX_FILE_SIZE:
+            spool.close()
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Import files are limited to {settings.IMPORT_MAX_FILE_SIZE // (1024 * 1024)}MB"
+            )
+    spool.seek(0)
+    
+    return StreamingResponse(
+        _stream_import(book_id, spool, file.filename),
+        media_type="application/x-ndjson"
+    )
+
+
+def _stream_import(book_id: int, spool: IO[bytes], filename: Optional[str]) -> Iterator[str]:
+    """Run an import with its own session, yielding progress events as NDJSON lines"""
+    db = SessionLocal()
+    try:
+        items = chapter_import_service.iter_import_items(spool, filename)
+        events = chapter_import_service.import_chapters(
+            db, book_id, items, chapter_import_service.get_executor()
+        )
+        for event in events:
+            yield json.dumps(event) + "\n"
+    finally:
+        db.close()
+        spool.close()
+
+
+@router.get(
+    "/books/{book_id}/chapters", response_model=ChapterListResponse,
+    dependencies=[Depends(coalesce_requests())]
+)
 def get_book_chapters(
     book_id: int,
     published_only: bool = Query(False, description="Only return published chapters"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get all chapters for a book
@@ -82,21 +167,26 @@ def get_book_chapters(
         )
     
     # Get chapters (published only by default, or all if published_only=false)
-    chapters = chapter_service.get_chapters_by_book(
+    chapters = chapter_service.get_chapter_summaries(
         db, 
         book_id, 
         published_only=published_only if published_only else True
     )
     
-    return {
+    return model_response(ChapterListResponse, {
         "chapters": chapters,
         "total": len(chapters)
-    }
+    })
 
 
-@router.get("/chapters/{chapter_id}", response_model=Chapter)
+@router.get(
+    "/chapters/{chapter_id}", response_model=Chapter,
+    dependencies=[Depends(coalesce_requests()), Depends(rate_limit(settings.RATE_LIMIT_CHAPTER_READS_PER_MINUTE))]
+)
 def get_chapter(
     chapter_id: int,
+    response: Response,
+    accept_encoding: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
@@ -105,7 +195,13 @@ def get_chapter(
     - **chapter_id**: ID of the chapter
     
     Note: Only published chapters can be accessed through this endpoint.
+    For interactive chapters, a `Link: rel=preload` header announces the first assets.
+    Chapters released on schedule are served from a response prepared ahead of the release.
     """
+    released = chapter_release_service.get_release_response(chapter_id, accept_encoding)
+    if released is not None:
+        return released
+    
     chapter = chapter_service.get_chapter_by_id(db, chapter_id)
     if not chapter:
         raise HTTPException(
@@ -120,7 +216,230 @@ def get_chapter(
             detail="This chapter is not published"
         )
     
-    return chapter
+    asset_manifest = chapter_service.get_asset_manifest(chapter)
+    if asset_manifest:
+        _set_preload_header(response, asset_manifest["assets"])
+    
+    return model_response(Chapter, chapter, headers=response.headers)
+
+
+def _get_published_chapter_graph(db: Session, chapter_id: int) -> Tuple[ChapterModel, dict]:
+    """Get a published interactive chapter and its compiled graph, or raise"""
+    chapter = chapter_service.get_chapter_without_content(db, chapter_id)
+    if not chapter:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chapter not found"
+        )
+    
+    if not chapter.is_published:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This chapter is not published"
+        )
+    
+    if chapter.content_type != ContentType.INTERACTIVE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only interactive chapters are delivered by node"
+        )
+    
+    compiled_graph = chapter_service.get_compiled_graph(chapter)
+    if not compiled_graph or not compiled_graph["node_count"]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Chapter has no valid node graph; load it with GET /chapters/{chapter_id}"
+        )
+    
+    return chapter, compiled_graph
+
+
+@router.get("/chapters/{chapter_id}/nodes/window", response_model=ChapterNodeWindow)
+def get_chapter_node_window(
+    chapter_id: int,
+    response: Response,
+    from_node: Optional[str] = Query(None, description="Node id to start from (default: entry node)"),
+    depth: int = Query(3, ge=0, le=20, description="How many edges ahead to include"),
+    max_nodes: int = Query(50, ge=1, le=200, description="Maximum nodes in the window"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a node of an interactive chapter plus a bounded lookahead window
+    
+    - **chapter_id**: ID of the chapter
+    - **from_node**: Node id to start from (default: the entry node)
+    - **depth**: How many next/choice edges ahead to include (default: 3)
+    - **max_nodes**: Maximum number of nodes returned (default: 50)
+    
+    Use this instead of GET /chapters/{chapter_id} for large interactive chapters.
+    Nodes listed in `frontier` can be fetched with GET /chapters/{chapter_id}/nodes.
+    """
+    chapter, compiled_graph = _get_published_chapter_graph(db, chapter_id)
+    index = compiled_graph["index"]
+    
+    if from_node is None:
+        start = compiled_graph["entry"]
+    elif from_node in index:
+        start = index[from_node]
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Node '{from_node}' not found in this chapter"
+        )
+    
+    window, frontier = get_lookahead_window(compiled_graph, start, depth, max_nodes)
+    nodes = chapter_service.get_chapter_nodes(db, chapter_id, window)
+    
+    # The graph may be stale if the chapter was saved since it was read
+    start_node = nodes.get(start)
+    if start_node is None or index.get(start_node.get("id")) != start:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Chapter changed while loading; retry the request"
+        )
+    
+    # Preload the assets of the scenes the reader can reach next
+    window_assets = {}
+    for position in window:
+        for url, kind in extract_node_assets(nodes.get(position)):
+            window_assets.setdefault(url, {"url": url, "kind": kind})
+    _set_preload_header(response, list(window_assets.values()))
+    
+    return {
+        "chapter_id": chapter_id,
+        "start_node": start_node["id"],
+        "node_count": compiled_graph["node_count"],
+        "nodes": [nodes[position] for position in window if position in nodes],
+        "frontier": _frontier_ids(nodes, index, frontier)
+    }
+
+
+@router.get("/chapters/{chapter_id}/nodes", response_model=ChapterNodeBatch)
+def get_chapter_nodes(
+    chapter_id: int,
+    ids: List[str] = Query(..., max_length=200, description="Node ids to fetch (repeat the parameter)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get nodes of an interactive chapter by id
+    
+    - **chapter_id**: ID of the chapter
+    - **ids**: Node ids to fetch, e.g. `?ids=forest&ids=mountain` (max 200)
+    
+    Nodes are returned in the requested order; unknown ids are listed in `missing`.
+    """
+    chapter, compiled_graph = _get_published_chapter_graph(db, chapter_id)
+    index = compiled_graph["index"]
+    
+    requested = list(dict.fromkeys(ids))  # De-duplicate, keep order
+    positions = [index[node_id] for node_id in requested if node_id in index]
+    nodes = chapter_service.get_chapter_nodes(db, chapter_id, positions)
+    
+    return {
+        "chapter_id": chapter_id,
+        "nodes": [nodes[position] for position in positions if position in nodes],
+        "missing": [node_id for node_id in requested if node_id not in index]
+    }
+
+
+@router.get("/chapters/{chapter_id}/assets", response_model=ChapterAssetManifest)
+def get_chapter_assets(
+    chapter_id: int,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the asset manifest of a chapter
+    
+    - **chapter_id**: ID of the chapter
+    
+    Lists the images and audio used by an interactive chapter, ordered by the
+    first node (in reading order) that uses them, with file sizes when stored
+    on this server. Simple chapters have no assets. The first assets are also
+    announced in a `Link: rel=preload` header.
+    """
+    chapter = chapter_service.get_chapter_without_content(db, chapter_id)
+    if not chapter:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chapter not found"
+        )
+    
+    if not chapter.is_published:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This chapter is not published"
+        )
+    
+    asset_manifest = chapter_service.get_asset_manifest(chapter)
+    assets = asset_manifest["assets"] if asset_manifest else []
+    _set_preload_header(response, assets)
+    
+    return {
+        "chapter_id": chapter_id,
+        "total_size": asset_manifest["total_size"] if asset_manifest else 0,
+        "assets": assets
+    }
+
+
+@router.get("/chapters/{chapter_id}/stats", response_model=ChapterTextStats)
+def get_chapter_text_stats(
+    chapter_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_author)
+):
+    """
+    Get text statistics of a chapter (Author only - must be book owner)
+    
+    - **chapter_id**: ID of the chapter
+    
+    Returns word count, character count, estimated reading time and, for
+    interactive chapters, the counts of each node.
+    """
+    chapter = chapter_service.get_chapter_by_id(db, chapter_id)
+    if not chapter:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chapter not found"
+        )
+    
+    # Check if user is the book author
+    if not chapter_service.is_chapter_author(db, chapter, current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this chapter"
+        )
+    
+    text_stats = chapter_service.get_text_stats(chapter)
+    
+    return {
+        "chapter_id": chapter_id,
+        "word_count": text_stats["word_count"],
+        "character_count": text_stats["character_count"],
+        "reading_time_minutes": text_stats["reading_time_minutes"],
+        "nodes": [
+            {"id": node_id, "word_count": words, "character_count": characters}
+            for node_id, (_, words, characters) in text_stats.get("nodes", {}).items()
+        ]
+    }
+
+
+def _set_preload_header(response: Response, assets: List[dict]) -> None:
+    """Announce the first assets with a Link: rel=preload header"""
+    link_header = build_preload_header(assets, settings.ASSET_PRELOAD_LIMIT)
+    if link_header:
+        response.headers["Link"] = link_header
+
+
+def _frontier_ids(nodes: dict, index: dict, frontier: List[int]) -> List[str]:
+    """Get ids of frontier nodes from the links of the nodes in the window"""
+    frontier_positions = set(frontier)
+    ids = []
+    for node in nodes.values():
+        for target in get_node_targets(node):
+            if index.get(target) in frontier_positions and target not in ids:
+                ids.append(target)
+    return ids
 
 
 @router.put("/chapters/{chapter_id}", response_model=Chapter)
@@ -138,7 +457,8 @@ def update_chapter(
     - **chapter_number**: Updated chapter number
     - **content_type**: Updated content type
     - **content_data**: Updated content
-    - **is_published**: Updated published status
+    - **is_published**: Updated published status (publishing cancels a scheduled release)
+    - **publish_at**: Schedule the release of an unpublished chapter (null cancels it)
     """
     chapter = chapter_service.get_chapter_by_id(db, chapter_id)
     if not chapter:
@@ -156,17 +476,70 @@ def update_chapter(
     
     # If updating chapter_number, check for conflicts
     if chapter_update.chapter_number is not None and chapter_update.chapter_number != chapter.chapter_number:
-        existing_chapters = chapter_service.get_chapters_by_book(db, chapter.book_id)
-        if any(ch.chapter_number == chapter_update.chapter_number and ch.id != chapter_id for ch in existing_chapters):
+        if chapter_service.chapter_number_exists(
+            db, chapter.book_id, chapter_update.chapter_number, exclude_chapter_id=chapter_id
+        ):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Chapter number {chapter_update.chapter_number} already exists for this book"
             )
     
-    updated_chapter = chapter_service.update_chapter(db, chapter, chapter_update)
+    try:
+        updated_chapter = chapter_service.update_chapter(db, chapter, chapter_update)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     return updated_chapter
 
 
+@router.patch("/chapters/{chapter_id}", response_model=ChapterPatchResult)
+def patch_chapter(
+    chapter_id: int,
+    chapter_patch: ChapterPatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_author)
+):
+    """
+    Save changes to a chapter's content as a delta (Author only - must be book owner)
+    
+    - **chapter_id**: ID of the chapter to update
+    - **base_version**: Chapter version the edits were made against
+    - **operations**: JSON Patch (RFC 6902) operations on content_data
+    - **text_edits**: Text splices ({path, offset, delete, insert}), applied after operations
+    
+    Returns the new version and text stats. Responds 409 if the chapter was
+    saved since base_version; reload it and reapply the edits.
+    """
+    chapter = chapter_service.get_chapter_by_id(db, chapter_id)
+    if not chapter:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chapter not found"
+        )
+    
+    # Check if user is the book author
+    if not chapter_service.is_chapter_author(db, chapter, current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to update this chapter"
+        )
+    
+    try:
+        return chapter_service.patch_chapter(db, chapter, chapter_patch)
+    except chapter_service.ChapterVersionConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @router.delete("/chapters/{chapter_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_chapter(
     chapter_id: int,
@@ -228,7 +601,7 @@ def reorder_chapters(
         )
     
     # Check if chapter belongs to this book
-    chapter = chapter_service.get_chapter_by_id(db, reorder_data.chapter_id)
+    chapter = chapter_service.get_chapter_without_content(db, reorder_data.chapter_id)
     if not chapter or chapter.book_id != book_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -255,6 +628,58 @@ def reorder_chapters(
     }
 
 
+@router.post("/books/{book_id}/chapters/moves", response_model=ChapterMoveResponse)
+def move_chapters(
+    book_id: int,
+    move_batch: ChapterMoveBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_author)
+):
+    """
+    Apply several chapter moves at once (Author only - must be book owner)
+    
+    Moves are applied in order, each like a single reorder; if any move is
+    invalid, none are applied.
+    
+    - **book_id**: ID of the book
+    - **moves**: List of {chapter_id, new_chapter_number}
+    
+    Returns only the chapters whose chapter number changed.
+    """
+    # Check if book exists
+    book = book_service.get_book_by_id(db, book_id)
+    if not book:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found"
+        )
+    
+    # Check if user is the book author
+    if not book_service.is_book_author(book, current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to reorder chapters for this book"
+        )
+    
+    try:
+        changes = chapter_service.move_chapters(
+            db, book_id, [(move.chapter_id, move.new_chapter_number) for move in move_batch.moves]
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return {
+        "chapters": [
+            {"id": chapter_id, "chapter_number": chapter_number}
+            for chapter_id, chapter_number in sorted(changes, key=lambda change: change[1])
+        ],
+        "total": len(changes)
+    }
+
+
 @router.get("/books/{book_id}/chapters/next-number", response_model=dict)
 def get_next_chapter_number(
     book_id: int,
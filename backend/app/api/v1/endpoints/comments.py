@@ -4,12 +4,14 @@ Comments endpoints - User comments on chapters
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from app.core.deps import get_db, get_current_user
+from app.core.deps import get_db, get_read_db, get_current_user
+from app.core.instrumentation import InstrumentedRoute
+from app.core.responses import model_response
 from app.models.user import User
 from app.schemas.comment import Comment, CommentCreate, CommentUpdate
 from app.services import comment_service
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.post("/", response_model=Comment, status_code=status.HTTP_201_CREATED)
@@ -34,7 +36,7 @@ def get_chapter_comments(
     chapter_id: int,
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(50, ge=1, le=100, description="Items per page"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get all top-level comments for a chapter (public endpoint)
@@ -45,13 +47,13 @@ def get_chapter_comments(
     comments = comment_service.get_chapter_comments(
         db, chapter_id, skip=skip, limit=page_size
     )
-    return comments
+    return model_response(List[Comment], comments)
 
 
 @router.get("/{comment_id}/replies", response_model=List[Comment])
 def get_comment_replies(
     comment_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get all replies to a specific comment
@@ -139,7 +141,7 @@ def delete_comment(
 @router.get("/chapter/{chapter_id}/count")
 def get_chapter_comments_count(
     chapter_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get the total number of comments for a chapter
@@ -0,0 +1,34 @@
+"""
+Change event endpoints - Read the change log by offset
+"""
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from app.core.deps import get_db, get_current_admin
+from app.core.instrumentation import InstrumentedRoute
+from app.models.user import User
+from app.schemas.event import ChangeEventListResponse
+from app.services import outbox_service
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+
+@router.get("/", response_model=ChangeEventListResponse)
+def get_change_events(
+    after: int = Query(0, ge=0, description="Return events after this offset"),
+    limit: int = Query(100, ge=1, le=1000, description="Max events to return"),
+    type: Optional[str] = Query(None, description="Only event types starting with this, e.g. 'chapter.'"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """
+    Get changes to books, chapters, comments and ratings in commit order (Admin only)
+
+    Consumers keep the last offset they processed and pass it as `after`.
+    Events are kept for OUTBOX_RETENTION_DAYS.
+    """
+    events = outbox_service.get_events(db, after_offset=after, limit=limit, event_type_prefix=type)
+    return {
+        "events": events,
+        "next_offset": events[-1]["offset"] if events else after
+    }
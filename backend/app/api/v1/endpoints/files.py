@@ -2,27 +2,31 @@
 File upload endpoints
 """
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from app.core.storage import FileStorage
 from app.schemas.file import ImageUploadResponse, FileDeleteResponse
 from app.core.deps import get_db, get_current_user
+from app.core.instrumentation import InstrumentedRoute
 from app.models.user import User
 from app.models.book import Book
+from app.services import job_service
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.post("/upload/cover", response_model=ImageUploadResponse, status_code=status.HTTP_201_CREATED)
 async def upload_cover_image(
     file: UploadFile = File(...),
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Upload a book cover image
     - Validates file type and size
-    - Creates thumbnail automatically
+    - Creates thumbnail automatically (in the background, shortly after the upload)
     - Returns URLs for both original and thumbnail
     """
     # Validate file
@@ -42,8 +46,9 @@ async def upload_cover_image(
     filename = FileStorage.generate_filename(file.filename)
     
     try:
-        # Save image and create thumbnail
+        # Save image; the thumbnail is created by a background job
         result = await FileStorage.save_cover_image(file, filename)
+        await run_in_threadpool(_enqueue_cover_thumbnail, db, filename)
         
         return ImageUploadResponse(
             image_url=result["image_url"],
@@ -58,6 +63,18 @@ async def upload_cover_image(
         )
 
 
+def _enqueue_cover_thumbnail(db: Session, filename: str) -> None:
+    """Queue the thumbnail of a saved cover image"""
+    job_service.enqueue(
+        db,
+        "files.create_thumbnail",
+        {"filename": filename},
+        priority=job_service.PRIORITY_HIGH,
+        idempotency_key=f"thumbnail:{filename}"
+    )
+    db.commit()
+
+
 @router.post("/upload/chapter-image", response_model=ImageUploadResponse, status_code=status.HTTP_201_CREATED)
 async def upload_chapter_image(
     file: UploadFile = File(...),
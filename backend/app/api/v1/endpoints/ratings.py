@@ -4,11 +4,12 @@ Ratings endpoints - User ratings for books
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.core.deps import get_db, get_current_user
+from app.core.instrumentation import InstrumentedRoute
 from app.models.user import User
 from app.schemas.rating import Rating, RatingCreate, RatingUpdate, BookRatingStats
 from app.services import rating_service
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.post("/", response_model=Rating, status_code=status.HTTP_201_CREATED)
@@ -4,19 +4,31 @@ Reading Progress endpoints - Track user reading progress
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.core.deps import get_db, get_current_user
+from app.core.instrumentation import InstrumentedRoute
+from app.core.rate_limit import rate_limit
 from app.models.user import User
 from app.schemas.reading_progress import (
     ReadingProgress,
     ReadingProgressCreate,
-    ReadingProgressUpdate
+    ReadingProgressUpdate,
+    ReadingProgressPending,
+    ReadingProgressSyncBatch
 )
-from app.services import reading_progress_service
+from app.schemas.sync import SyncBatchResponse
+from app.services import reading_progress_service, sync_service
+from app.services.reading_progress_buffer import progress_buffer
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
-@router.post("/", response_model=ReadingProgress, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    response_model=ReadingProgress,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit(settings.RATE_LIMIT_PROGRESS_WRITES_PER_MINUTE))]
+)
 def create_or_update_progress(
     progress_in: ReadingProgressCreate,
     db: Session = Depends(get_db),
@@ -31,12 +43,64 @@ def create_or_update_progress(
     
     If progress already exists for this book, it will be updated.
     """
+    # This write supersedes any buffered tick for the same book
+    progress_buffer.discard(current_user.id, progress_in.book_id)
     progress = reading_progress_service.create_or_update_reading_progress(
         db, current_user.id, progress_in
     )
     return progress
 
 
+@router.post("/ticks", response_model=ReadingProgressPending, status_code=status.HTTP_202_ACCEPTED)
+def track_progress(
+    progress_in: ReadingProgressCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Report reading progress at high frequency (e.g. while scrolling)
+    
+    - **book_id**: ID of the book being read
+    - **chapter_id**: ID of the current chapter
+    - **progress_percentage**: Reading progress (0-100%)
+    
+    Updates are buffered and coalesced per book; only the latest position is
+    written, within a few seconds. Reads from this API already include it.
+    """
+    return progress_buffer.add(current_user.id, progress_in)
+
+
+@router.post(
+    "/batch",
+    response_model=SyncBatchResponse,
+    dependencies=[Depends(rate_limit(settings.RATE_LIMIT_PROGRESS_WRITES_PER_MINUTE))]
+)
+def sync_progress(
+    batch: ReadingProgressSyncBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Apply queued reading progress updates from an offline client in one request
+    
+    - **items**: Array (max 1000) of:
+      - **book_id**: ID of the book being read
+      - **chapter_id**: ID of the current chapter
+      - **progress_percentage**: Reading progress (0-100%)
+      - **client_timestamp**: When the update happened on the client
+    
+    Conflicts are resolved last-writer-wins per book. Returns a result per item
+    (applied, superseded or invalid), in request order.
+    """
+    # Buffered ticks are live updates and take part in conflict resolution
+    if progress_buffer.has_pending_for_user(current_user.id):
+        progress_buffer.flush(db, user_id=current_user.id)
+    
+    results = reading_progress_service.sync_reading_progress(
+        db, current_user.id, batch.items
+    )
+    return sync_service.build_batch_response(results)
+
+
 @router.get("/", response_model=List[ReadingProgress])
 def get_my_reading_progress(
     page: int = Query(1, ge=1, description="Page number"),
@@ -47,6 +111,10 @@ def get_my_reading_progress(
     """
     Get all reading progress for the current user
     """
+    # Write buffered ticks first so they are included and ordered correctly
+    if progress_buffer.has_pending_for_user(current_user.id):
+        progress_buffer.flush(db, user_id=current_user.id)
+    
     skip = (page - 1) * page_size
     progress_list = reading_progress_service.get_user_reading_progress(
         db, current_user.id, skip=skip, limit=page_size
@@ -63,10 +131,21 @@ def get_book_progress(
     """
     Get reading progress for a specific book
     """
+    pending = progress_buffer.get(current_user.id, book_id)
     progress = reading_progress_service.get_reading_progress_by_user_and_book(
         db, current_user.id, book_id
     )
     
+    if pending:
+        if progress:
+            progress = reading_progress_service.apply_pending_progress(db, progress, pending)
+        else:
+            # First progress for this book is still buffered: write it now
+            progress_buffer.flush(db, user_id=current_user.id)
+            progress = reading_progress_service.get_reading_progress_by_user_and_book(
+                db, current_user.id, book_id
+            )
+    
     if not progress:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -96,6 +175,7 @@ def update_progress(
             detail="Reading progress not found"
         )
     
+    progress_buffer.discard(current_user.id, progress.book_id)
     updated_progress = reading_progress_service.update_reading_progress(
         db, progress, progress_update
     )
@@ -121,6 +201,7 @@ def delete_progress(
             detail="Reading progress not found"
         )
     
+    progress_buffer.discard(current_user.id, progress.book_id)
     reading_progress_service.delete_reading_progress(db, progress)
     return None
 
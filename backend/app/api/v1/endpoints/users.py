@@ -1,14 +1,16 @@
 """
 User profile endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from app.core.deps import get_db, get_current_user
+from app.core.instrumentation import InstrumentedRoute
 from app.models.user import User
+from app.schemas.book import Book as BookSchema, RecommendedBook, RecommendationListResponse
 from app.schemas.user import User as UserSchema, UserUpdate, UserPasswordUpdate
-from app.services import user_service
+from app.services import user_service, recommendation_service
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.get("/me", response_model=UserSchema)
@@ -78,6 +80,26 @@ def change_my_password(
         )
 
 
+@router.get("/me/recommendations", response_model=RecommendationListResponse)
+def get_my_recommendations(
+    limit: int = Query(20, ge=1, le=100, description="Number of books"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get books recommended from the current user's recent reading, bookmarks and ratings
+    
+    Requires authentication
+    """
+    books = recommendation_service.get_user_recommendations(db, current_user.id, limit)
+    return {
+        "books": [
+            RecommendedBook(**BookSchema.model_validate(book).model_dump(), score=round(score, 4))
+            for book, score in books
+        ]
+    }
+
+
 @router.get("/{user_id}", response_model=UserSchema)
 def get_user_profile(
     user_id: int,
@@ -0,0 +1,416 @@
+"""
+Read-through cache for hot lookups - per-process LRU over a shared tier
+
+Service functions opt in with the cached decorator:
+
+    @cached("books", key="{book_id}", tags=("book:{book_id}",), model=Book)
+    def get_book_by_id(db: Session, book_id: int) -> Optional[Book]: ...
+
+and the functions changing the data call invalidate_tags("book:42") after
+committing. A lookup goes through two tiers:
+    - local: an LRU of up to CACHE_LOCAL_MAX_ENTRIES entries per process,
+      kept CACHE_LOCAL_TTL_SECONDS
+    - shared: the CACHE_BACKEND_URL backend (Redis, or "memory://" - a
+      per-process stand-in for tests and single-process deployments), entries
+      kept CACHE_TTL_SECONDS
+and on a miss in both, the first caller of a key loads it from the database
+while concurrent callers of the same key wait for its result (single-flight).
+
+Invalidation is by tag. Each tag has a version number in the shared backend;
+shared entries record the versions of their tags when loading started and
+are ignored once one of them moves on. Local entries of the invalidating
+process are dropped at once; other processes may serve theirs for up to
+CACHE_LOCAL_TTL_SECONDS. With the memory backend every process has its own
+shared tier, so run Redis when there are several API processes.
+
+ORM results (`model`) are cached as column snapshots and rebuilt as detached
+instances merged into the caller's session without a query; the instance
+already in the session, if any, is returned instead. Only lookups on the
+primary are stored - a lagging replica could cache data older than the last
+invalidation - and None results are not cached. Counters that change on
+every read (book views) do not invalidate, so cached copies may lag them by
+up to CACHE_TTL_SECONDS.
+
+Hits and misses per cache and tier are exported as cache_requests_total.
+"""
+import functools
+import hashlib
+import inspect
+import logging
+import pickle
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from prometheus_client import Counter
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.core.config import settings
+from app.db.session import replica_set
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache, tier (local, shared) and result (hit, miss)",
+    ["cache", "tier", "result"]
+)
+
+
+class CacheBackend(ABC):
+    """Shared tier storage: bytes values with a TTL, and integer counters"""
+
+    @abstractmethod
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """Values of the keys, None for missing or expired ones"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Store a value for ttl seconds"""
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Increment a counter that never expires (missing: 0) and return its new value"""
+
+
+class MemoryBackend(CacheBackend):
+    """In-process backend, for tests and single-process deployments"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, Tuple[bytes, Optional[float]]] = {}
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                item = self._values.get(key)
+                if item is not None and item[1] is not None and item[1] <= now:
+                    del self._values[key]
+                    item = None
+                values.append(item[0] if item else None)
+        return values
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._values[key] = (value, time.monotonic() + ttl)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._values.get(key, (b"0", None))[0]) + 1
+            self._values[key] = (str(value).encode(), None)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class RedisBackend(CacheBackend):
+    """Redis backend; connection errors count as misses (and are logged)"""
+
+    def __init__(self, url: str):
+        import redis  # Only needed when configured
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        try:
+            return self._client.mget(keys)
+        except self._errors:
+            logger.warning("Cache backend unavailable, reading through", exc_info=True)
+            return [None] * len(keys)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            self._client.set(key, value, px=int(ttl * 1000))
+        except self._errors:
+            logger.warning("Cache backend unavailable, entry not stored", exc_info=True)
+
+    def incr(self, key: str) -> int:
+        return self._client.incr(key)
+
+
+def create_backend(url: str) -> CacheBackend:
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported cache backend: {url}")
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers of a key share its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, "_Call"] = {}
+
+    def do(self, key: Any, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Result of func() (or of the call already running for key), and whether it was shared"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class _LocalTier:
+    """LRU of pickled values with a TTL, and the keys stored under each tag"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[bytes, float, Tuple[str, ...]]]" = OrderedDict()
+        self._keys_by_tag: Dict[str, set] = {}
+        self.generation = 0  # Bumped by every invalidation
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: bytes, tags: Tuple[str, ...], generation: int) -> None:
+        """Store a value loaded during `generation` (not if there was an invalidation since)"""
+        with self._lock:
+            if generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, tags)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            self.generation += 1
+            for tag in tags:
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def _remove(self, key: str) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+class CacheLayer:
+    """The local and shared tiers of all caches in this process"""
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend or create_backend(settings.CACHE_BACKEND_URL)
+        self.local = _LocalTier(settings.CACHE_LOCAL_MAX_ENTRIES, settings.CACHE_LOCAL_TTL_SECONDS)
+        self.single_flight = SingleFlight()
+
+    def get_or_load(self, name: str, key: str, tags: Tuple[str, ...], load: Callable[[], Any],
+                    store: bool = True, ttl: Optional[float] = None) -> Any:
+        """
+        Cached value of key, loaded on a miss and stored (unless store is False)
+        for ttl seconds (default CACHE_TTL_SECONDS)
+        """
+        full_key = f"{settings.CACHE_KEY_PREFIX}{name}:{key}"
+        value = self._get_local(name, full_key)
+        if value is not None:
+            return pickle.loads(value)
+        generation = self.local.generation
+
+        def load_shared() -> bytes:
+            value, versions = self._get_shared(name, full_key, tags)
+            if value is not None:
+                return value
+            loaded = load()
+            value = pickle.dumps(loaded, protocol=pickle.HIGHEST_PROTOCOL)
+            if store and loaded is not None:
+                self.backend.set(
+                    full_key, pickle.dumps((versions, value), protocol=pickle.HIGHEST_PROTOCOL),
+                    ttl or settings.CACHE_TTL_SECONDS
+                )
+            return value
+
+        value, _ = self.single_flight.do(full_key, load_shared)
+        result = pickle.loads(value)
+        if store and result is not None:
+            self.local.set(full_key, value, tags, generation)
+        return result
+
+    def get(self, name: str, key: str, tags: Tuple[str, ...]) -> Any:
+        """Cached value of key, or None (nothing is loaded)"""
+        full_key = f"{settings.CACHE_KEY_PREFIX}{name}:{key}"
+        value = self._get_local(name, full_key)
+        if value is None:
+            generation = self.local.generation
+            value, _ = self._get_shared(name, full_key, tags)
+            if value is None:
+                return None
+            self.local.set(full_key, value, tags, generation)
+        return pickle.loads(value)
+
+    def _get_local(self, name: str, full_key: str) -> Optional[bytes]:
+        value = self.local.get(full_key)
+        CACHE_REQUESTS.labels(name, "local", "miss" if value is None else "hit").inc()
+        return value
+
+    def _get_shared(self, name: str, full_key: str, tags: Tuple[str, ...]) -> Tuple[Optional[bytes], tuple]:
+        """Pickled value of a shared entry still valid for its tags (or None), and the tags' versions"""
+        entry, *versions = self.backend.get_many([full_key, *(self._tag_key(tag) for tag in tags)])
+        versions = tuple(int(version or 0) for version in versions)
+        if entry is not None:
+            entry_versions, value = pickle.loads(entry)
+            if entry_versions == versions:
+                CACHE_REQUESTS.labels(name, "shared", "hit").inc()
+                return value, versions
+        CACHE_REQUESTS.labels(name, "shared", "miss").inc()
+        return None, versions
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        tags = list(tags)
+        self.local.invalidate(tags)
+        for tag in tags:
+            try:
+                self.backend.incr(self._tag_key(tag))
+            except Exception:
+                logger.exception("Could not invalidate cache tag %s; entries may be stale until they expire", tag)
+
+    def clear_local(self) -> None:
+        self.local.clear()
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"{settings.CACHE_KEY_PREFIX}tag:{tag}"
+
+
+_layer: Optional[CacheLayer] = None
+_layer_lock = threading.Lock()
+
+
+def get_cache_layer() -> CacheLayer:
+    global _layer
+    if _layer is None:
+        with _layer_lock:
+            if _layer is None:
+                _layer = CacheLayer()
+    return _layer
+
+
+def set_cache_backend(backend: CacheBackend) -> CacheLayer:
+    """Replace the cache layer with one on `backend` (e.g. a fresh MemoryBackend in tests)"""
+    global _layer
+    with _layer_lock:
+        _layer = CacheLayer(backend)
+    return _layer
+
+
+def invalidate_tags(*tags: str) -> None:
+    """Drop the cached entries under any of `tags` (call after committing the change)"""
+    if settings.CACHE_ENABLED and tags:
+        get_cache_layer().invalidate_tags(tags)
+
+
+def cached(name: str, key: str, tags: Sequence[str] = (), model: Optional[type] = None):
+    """
+    Cache a service lookup taking the session as its first argument
+
+    `key` and `tags` are format strings over the other arguments, by name
+    (defaults included). `model` marks results that are instances of an ORM
+    model, or lists of them.
+    """
+    def decorate(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        key_prefix = ""
+        if model is not None:
+            # Snapshots of an older set of columns are not rebuilt after a migration
+            columns = ",".join(sorted(model.__table__.columns.keys()))
+            key_prefix = hashlib.sha1(columns.encode()).hexdigest()[:8] + ":"
+
+        @functools.wraps(func)
+        def wrapper(db: Session, *args, **kwargs):
+            if not settings.CACHE_ENABLED or db.new or db.dirty or db.deleted:
+                return func(db, *args, **kwargs)
+            bound = signature.bind(db, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            entry_key = key_prefix + key.format(**arguments)
+            entry_tags = tuple(tag.format(**arguments) for tag in tags)
+
+            def load():
+                result = func(db, *args, **kwargs)
+                return _snapshot(result) if model is not None else result
+
+            value = get_cache_layer().get_or_load(
+                name=name, key=entry_key, tags=entry_tags, load=load,
+                store=db.get_bind() not in replica_set.engines
+            )
+            return _restore(db, model, value) if model is not None else value
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorate
+
+
+def _snapshot(result: Any) -> Any:
+    """Column values of an ORM instance (or list of instances)"""
+    if result is None:
+        return None
+    if isinstance(result, list):
+        return [_snapshot(item) for item in result]
+    state = sa_inspect(result)
+    return {attr.key: getattr(result, attr.key) for attr in state.mapper.column_attrs}
+
+
+def _restore(db: Session, model: type, value: Any) -> Any:
+    """Instances for snapshots, attached to db without querying"""
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return [_restore(db, model, item) for item in value]
+    instance = model(**value)
+    make_transient_to_detached(instance)
+    existing = db.identity_map.get(sa_inspect(instance).key)
+    if existing is not None:
+        return existing
+    return db.merge(instance, load=False)
@@ -0,0 +1,227 @@
+"""
+Request coalescing - identical concurrent public reads share one response
+
+When a popular chapter is released, thousands of readers ask for the same
+URL within a second. Routes declaring a coalescing policy:
+
+    @router.get("/chapters/{chapter_id}", dependencies=[Depends(coalesce_requests())])
+
+run their handler once per distinct request (method, path and query string)
+at a time: requests arriving while it runs wait for its response, and the
+response is then kept for the route's micro-cache window
+(COALESCING_MICRO_CACHE_SECONDS by default; 0 shares in-flight responses
+only). Each encoding of a shared body is compressed once and sent as a
+precompressed response, which CompressionMiddleware passes through.
+
+Only declare it on routes whose response does not depend on who asks. Not
+coalesced: clients reading their own writes (READ_YOUR_WRITES_SECONDS),
+requests sent with Cache-Control: no-cache, streamed or file responses,
+responses setting cookies or already compressed for the client, and bodies
+over COALESCING_MAX_BODY_SIZE. An
+HTTPException raised by the shared handler is raised for every waiting
+request; on any other error each waiting request runs the handler itself.
+
+Each process coalesces its own requests; the micro-cache is not invalidated,
+so a change may take up to its window to show.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlencode
+from fastapi.routing import APIRoute
+from prometheus_client import Counter
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from app.core.compression import POLICY_SCOPE_KEY, compress_async, mark_encoded, negotiate_encoding
+from app.core.config import settings
+from app.db.session import read_your_writes
+
+COALESCED_REQUESTS = Counter(
+    "http_coalesced_requests_total",
+    "Requests to coalescing routes by outcome (executed, in_flight, micro_cache)",
+    ["route", "result"]
+)
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class CoalescingPolicy:
+    """Per-route coalescing settings (None: use the app-wide setting)"""
+
+    __slots__ = ("micro_cache_seconds",)
+
+    def __init__(self, micro_cache_seconds: Optional[float] = None):
+        self.micro_cache_seconds = micro_cache_seconds
+
+
+def coalesce_requests(micro_cache_seconds: Optional[float] = None):
+    """Route dependency declaring that identical concurrent requests share one response"""
+    def coalesce() -> None:
+        pass  # Read by InstrumentedRoute when it builds the route's handler
+
+    coalesce.coalescing_policy = CoalescingPolicy(micro_cache_seconds)
+    return coalesce
+
+
+def get_coalescing_policy(route: APIRoute) -> Optional[CoalescingPolicy]:
+    for dependency in route.dependencies:
+        policy = getattr(dependency.dependency, "coalescing_policy", None)
+        if policy is not None:
+            return policy
+    return None
+
+
+class _SharedResponse:
+    """A response handed to every coalesced request, compressed once per encoding"""
+
+    __slots__ = ("status_code", "raw_headers", "body", "compression_policy", "expires_at", "_encoded")
+
+    def __init__(self, response: Response, scope: dict):
+        self.status_code = response.status_code
+        self.raw_headers = [header for header in response.raw_headers if header[0] != b"content-length"]
+        self.body = response.body
+        self.compression_policy = scope.get(POLICY_SCOPE_KEY)
+        self.expires_at = 0.0
+        self._encoded: Dict[str, asyncio.Future] = {}
+
+    async def respond(self, request: Request) -> Response:
+        """A copy of the response, compressed for the request if it accepts it"""
+        if self.compression_policy is not None:
+            request.scope[POLICY_SCOPE_KEY] = self.compression_policy
+        encoding = None
+        if settings.COMPRESSION_ENABLED:
+            encoding = negotiate_encoding(
+                request.scope, request.headers.get("accept-encoding"), self.status_code,
+                Headers(raw=self.raw_headers), len(self.body)
+            )
+        body = self.body if encoding is None else await self._encode(encoding)
+
+        response = Response(body, status_code=self.status_code)
+        response.raw_headers = self.raw_headers + [(b"content-length", str(len(body)).encode())]
+        if encoding is not None:
+            mark_encoded(response.headers, encoding)
+        return response
+
+    async def _encode(self, encoding: str) -> bytes:
+        task = self._encoded.get(encoding)
+        if task is None:
+            task = self._encoded[encoding] = asyncio.ensure_future(compress_async(self.body, encoding))
+        return await asyncio.shield(task)  # A cancelled request must not cancel it for the others
+
+
+# What waiting requests get from the one running the handler
+_Outcome = Union[_SharedResponse, HTTPException, None]
+
+
+class RequestCoalescer:
+    """In-flight and recently finished shared responses of this process, by request key"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._entries: "OrderedDict[str, _SharedResponse]" = OrderedDict()
+
+    async def handle(self, key: str, request: Request, handler: Handler, route: str,
+                     micro_cache_seconds: float) -> Response:
+        entry = self._get_entry(key)
+        if entry is not None:
+            COALESCED_REQUESTS.labels(route, "micro_cache").inc()
+            return await entry.respond(request)
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            outcome = await asyncio.shield(in_flight)
+            if isinstance(outcome, HTTPException):
+                COALESCED_REQUESTS.labels(route, "in_flight").inc()
+                raise outcome
+            if outcome is not None:
+                COALESCED_REQUESTS.labels(route, "in_flight").inc()
+                return await outcome.respond(request)
+            COALESCED_REQUESTS.labels(route, "executed").inc()
+            return await handler(request)  # Its response could not be shared
+
+        COALESCED_REQUESTS.labels(route, "executed").inc()
+        in_flight = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        outcome: _Outcome = None
+        try:
+            response = await handler(request)
+            outcome = _share(response, request.scope)
+        except HTTPException as exc:
+            outcome = exc
+            raise
+        finally:
+            del self._in_flight[key]
+            in_flight.set_result(outcome)
+
+        if outcome is None:
+            return response
+        if micro_cache_seconds > 0:
+            outcome.expires_at = time.monotonic() + micro_cache_seconds
+            self._store(key, outcome)
+        shared = await outcome.respond(request)
+        shared.background = response.background
+        return shared
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _get_entry(self, key: str) -> Optional[_SharedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def _store(self, key: str, entry: _SharedResponse) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+request_coalescer = RequestCoalescer(max_entries=settings.COALESCING_MAX_ENTRIES)
+
+
+def coalesced(handler: Handler, policy: CoalescingPolicy, route: str) -> Handler:
+    """Wrap a route handler so identical concurrent requests share its response"""
+    async def coalescing_handler(request: Request) -> Response:
+        if not settings.COALESCING_ENABLED or not _is_coalescable(request):
+            return await handler(request)
+        micro_cache_seconds = policy.micro_cache_seconds
+        if micro_cache_seconds is None:
+            micro_cache_seconds = settings.COALESCING_MICRO_CACHE_SECONDS
+        return await request_coalescer.handle(_request_key(request), request, handler, route, micro_cache_seconds)
+
+    return coalescing_handler
+
+
+def _is_coalescable(request: Request) -> bool:
+    if request.method != "GET":
+        return False
+    if "no-cache" in request.headers.get("cache-control", ""):
+        return False
+    return not read_your_writes.is_sticky(request)
+
+
+def _request_key(request: Request) -> str:
+    """Method, path and query string with its parameters in a canonical order"""
+    query: List[Tuple[str, str]] = parse_qsl(
+        request.scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True
+    )
+    return f"{request.method} {request.url.path}?{urlencode(sorted(query))}"
+
+
+def _share(response: Response, scope: dict) -> Optional[_SharedResponse]:
+    """The response as a _SharedResponse, or None if it cannot be shared"""
+    body: Any = getattr(response, "body", None)
+    if (
+        isinstance(response, StreamingResponse)
+        or not isinstance(body, bytes)
+        or len(body) > settings.COALESCING_MAX_BODY_SIZE
+        or any(name in (b"set-cookie", b"content-encoding") for name, _ in response.raw_headers)
+    ):
+        return None
+    return _SharedResponse(response, scope)
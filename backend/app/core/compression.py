@@ -0,0 +1,265 @@
+"""
+Response compression - gzip, brotli and zstd negotiated per request
+
+CompressionMiddleware compresses the bodies of compressible responses (JSON,
+text, HTML, NDJSON...) with the best encoding the client accepts, in the
+server's order of preference COMPRESSION_ENCODINGS:
+    - single-body responses of at least COMPRESSION_MIN_SIZE bytes are
+      compressed whole; bodies of COMPRESSION_THREAD_MIN_SIZE bytes or more
+      are compressed in a worker thread so the event loop keeps serving
+    - streaming responses (book exports) are compressed chunk by chunk, each
+      chunk flushed so the client receives it without waiting for the rest
+
+Responses that already carry a Content-Encoding pass through untouched, so
+a cache can serve bodies it compressed ahead of time with compress() and
+choose_encoding(). Server-sent events are never compressed.
+
+Routes override the defaults with a dependency:
+
+    @router.get("/...", dependencies=[Depends(compression_policy(min_size=256))])
+    @router.get("/...", dependencies=[Depends(compression_policy(enabled=False))])
+
+brotli and zstd need the brotli and zstandard packages; without them only
+gzip is offered.
+"""
+import gzip
+import zlib
+from typing import Optional, Sequence, List, Dict
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Media types worth compressing (prefixes); images, archives and event streams are not
+COMPRESSIBLE_TYPES = (
+    "text/html", "text/plain", "text/css", "text/csv", "text/xml", "text/javascript",
+    "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "application/xhtml+xml", "image/svg+xml",
+)
+
+# Request scope key holding the matched route's CompressionPolicy
+POLICY_SCOPE_KEY = "compression_policy"
+
+
+class CompressionPolicy:
+    """Per-route compression settings (None: use the app-wide setting)"""
+
+    __slots__ = ("enabled", "min_size", "encodings")
+
+    def __init__(self, enabled: bool = True, min_size: Optional[int] = None,
+                 encodings: Optional[Sequence[str]] = None):
+        self.enabled = enabled
+        self.min_size = min_size
+        self.encodings = tuple(encodings) if encodings else None
+
+
+DEFAULT_POLICY = CompressionPolicy()
+
+
+def compression_policy(enabled: bool = True, min_size: Optional[int] = None,
+                       encodings: Optional[Sequence[str]] = None):
+    """Route dependency overriding how the route's responses are compressed"""
+    policy = CompressionPolicy(enabled, min_size, encodings)
+
+    def set_compression_policy(request: Request) -> None:
+        request.scope[POLICY_SCOPE_KEY] = policy
+
+    return set_compression_policy
+
+
+def get_supported_encodings() -> List[str]:
+    """COMPRESSION_ENCODINGS whose libraries are installed, in order of preference"""
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    return [encoding for encoding in settings.COMPRESSION_ENCODINGS if installed.get(encoding)]
+
+
+def choose_encoding(accept_encoding: Optional[str], encodings: Sequence[str]) -> Optional[str]:
+    """
+    Best of `encodings` for an Accept-Encoding header value (None: send it uncompressed)
+    The client's highest q-value wins; ties go to the earlier of `encodings`.
+    """
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a whole body with gzip, br or zstd"""
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compress(body)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+class StreamCompressor:
+    """Incremental compressor whose output can be decoded up to each chunk"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+
+    def chunk(self, data: bytes, final: bool = False) -> bytes:
+        """Compress a chunk, flushing it (or ending the stream if final)"""
+        if self.encoding == "br":
+            output = self._compressor.process(data)
+            return output + (self._compressor.finish() if final else self._compressor.flush())
+        output = self._compressor.compress(data)
+        if final:
+            return output + self._compressor.flush()
+        if self.encoding == "gzip":
+            return output + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return output + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def negotiate_encoding(scope: Scope, accept_encoding: Optional[str], status_code: int,
+                       headers: Headers, body_size: Optional[int]) -> Optional[str]:
+    """
+    Encoding for a response under the route's policy (None: send it as is)
+    body_size is None for a streamed body, which is compressed at any size.
+    """
+    policy = scope.get(POLICY_SCOPE_KEY, DEFAULT_POLICY)
+    if (
+        not policy.enabled
+        or status_code < 200 or status_code in (204, 304)
+        or "content-encoding" in headers
+        or not is_compressible(headers.get("content-type"))
+    ):
+        return None
+    min_size = policy.min_size if policy.min_size is not None else settings.COMPRESSION_MIN_SIZE
+    if body_size is not None and body_size < min_size:
+        return None
+    return choose_encoding(accept_encoding, policy.encodings or get_supported_encodings())
+
+
+def mark_encoded(headers: MutableHeaders, encoding: str) -> None:
+    """Set the headers of a response whose body is now encoded"""
+    headers["Content-Encoding"] = encoding
+    headers.add_vary_header("Accept-Encoding")
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"  # Not byte-identical to the uncompressed body any more
+
+
+async def compress_async(body: bytes, encoding: str) -> bytes:
+    """compress(), in a worker thread for bodies of COMPRESSION_THREAD_MIN_SIZE or more"""
+    return await _run(compress, body, encoding)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses the client accepts compressed"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding")
+        if not accept_encoding:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(scope, accept_encoding, send).run(self.app, receive)
+
+
+class _CompressedResponder:
+    """Holds back the response start until the first body chunk decides the encoding"""
+
+    def __init__(self, scope: Scope, accept_encoding: str, send: Send):
+        self.scope = scope
+        self.accept_encoding = accept_encoding
+        self.send = send
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    async def run(self, app: ASGIApp, receive: Receive) -> None:
+        await app(self.scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            encoding = negotiate_encoding(
+                self.scope, self.accept_encoding, self.start_message["status"],
+                Headers(raw=self.start_message["headers"]), None if more_body else len(body)
+            )
+            if encoding is None:
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+
+            headers = MutableHeaders(scope=self.start_message)
+            mark_encoded(headers, encoding)
+
+            if not more_body:
+                compressed = await _run(compress, body, encoding)
+                headers["Content-Length"] = str(len(compressed))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            del headers["Content-Length"]
+            self.compressor = StreamCompressor(encoding)
+            await self.send(self.start_message)
+
+        data = await _run(self.compressor.chunk, body, not more_body)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+
+async def _run(func, data: bytes, *args):
+    """Call a compression function, in a worker thread for large inputs"""
+    if len(data) >= settings.COMPRESSION_THREAD_MIN_SIZE:
+        return await anyio.to_thread.run_sync(func, data, *args)
+    return func(data, *args)
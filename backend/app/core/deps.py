@@ -2,14 +2,16 @@
 Dependency functions for FastAPI endpoints
 """
 from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, replica_set, read_your_writes
 from app.models.user import User
 from app.schemas.user import TokenPayload
+from app.services import user_service
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
@@ -26,12 +28,28 @@ def get_db() -> Generator:
         db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> User:
+def get_read_db(request: Request) -> Generator:
     """
-    Get current authenticated user from JWT token
+    Dependency for read-only endpoints: a session on a healthy read replica
+    
+    Uses the primary when no replica is configured or healthy, and for
+    clients that wrote within READ_YOUR_WRITES_SECONDS. Never write with it.
+    """
+    replica = None if read_your_writes.is_sticky(request) else replica_set.choose()
+    db = SessionLocal(bind=replica) if replica is not None else SessionLocal()
+    try:
+        yield db
+    except OperationalError:
+        if replica is not None:
+            replica_set.mark_down(replica)
+        raise
+    finally:
+        db.close()
+
+
+def decode_access_token(token: str) -> int:
+    """
+    Get the user ID of a valid access token (raises 401 otherwise)
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -57,14 +75,28 @@ def get_current_user(
             )
             
         # Convert sub from string to int (JWT stores as string)
-        user_id: int = int(token_data.sub)
+        return int(token_data.sub)
         
     except JWTError:
         raise credentials_exception
+
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+) -> User:
+    """
+    Get current authenticated user from JWT token
+    """
+    user_id = decode_access_token(token)
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = user_service.get_user_by_id(db, user_id)
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
     return user
 
@@ -0,0 +1,263 @@
+"""
+Request instrumentation - Latency, SQL and serialization metrics per route
+
+RequestInstrumentationMiddleware tracks each HTTP request in a context
+variable that the SQLAlchemy cursor hooks (installed by install_query_hooks)
+add every statement to. When the request ends it records, per route:
+    - latency, SQL statement count, DB time and response serialization time
+      (Prometheus histograms, served by GET /metrics)
+    - a Server-Timing header with the same numbers, for browser dev tools
+    - an "N+1" warning for each statement run more than N_PLUS_ONE_THRESHOLD
+      times, e.g. a lazy-loaded relationship read in a loop
+
+Statements slower than SLOW_QUERY_MS are logged to the "app.slow_queries"
+logger with the route that issued them ("background" outside requests).
+
+Serialization is timed by InstrumentedRoute, the route class of every API
+router: it is the time from the endpoint returning to the response being built,
+plus any response an endpoint encoded itself (record_serialization).
+
+Run several worker processes with PROMETHEUS_MULTIPROC_DIR set (see the
+prometheus_client docs) so /metrics aggregates all of them.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+from time import perf_counter
+from typing import Optional, Dict, Callable
+from fastapi.routing import APIRoute
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest, REGISTRY
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+from app.core.coalescing import coalesced, get_coalescing_policy
+from app.core.rate_limit import get_rate_limit_policy, rate_limited
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+# Longest statement text written to the logs
+MAX_LOGGED_STATEMENT_LENGTH = 1000
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to handle a request, until the response starts",
+    ["method", "route", "status"]
+)
+REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements", "SQL statements run per request",
+    ["method", "route"], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request",
+    ["method", "route"]
+)
+RESPONSE_SERIALIZATION_SECONDS = Histogram(
+    "http_response_serialization_seconds", "Time to validate and serialize the endpoint's return value",
+    ["method", "route"], buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+SLOW_QUERIES = Counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_MS", ["route"])
+N_PLUS_ONE = Counter("db_n_plus_one_total", "Statements repeated more than N_PLUS_ONE_THRESHOLD times in a request", ["route"])
+
+
+class RequestStats:
+    """Timings of one request, filled in by the hooks as it runs"""
+
+    __slots__ = ("scope", "query_count", "db_seconds", "statements", "endpoint_done_at", "serialize_seconds")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope  # Routing adds the matched route to it
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.statements: Dict[str, int] = {}
+        self.endpoint_done_at: Optional[float] = None
+        self.serialize_seconds: Optional[float] = None
+
+    @property
+    def route(self) -> str:
+        """Path template of the matched route"""
+        return getattr(self.scope.get("route"), "path", None) or "unmatched"
+
+    def record_query(self, statement: str, seconds: float) -> None:
+        self.query_count += 1
+        self.db_seconds += seconds
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def server_timing(self, total_seconds: float) -> str:
+        """Server-Timing header value (durations in milliseconds)"""
+        metrics = [f'db;dur={self.db_seconds * 1000:.1f};desc="{self.query_count} queries"']
+        if self.serialize_seconds is not None:
+            metrics.append(f"serialize;dur={self.serialize_seconds * 1000:.1f}")
+        metrics.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+_current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request_stats", default=None
+)
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    API route that times response serialization apart from the endpoint
+    (and coalesces identical requests if it declares coalesce_requests(), after
+    rejecting clients over its rate_limit())
+    """
+
+    def get_route_handler(self) -> Callable:
+        call = self.dependant.call
+
+        if asyncio.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def timed_call(**kwargs):
+                try:
+                    return await call(**kwargs)
+                finally:
+                    _mark_endpoint_done()
+        else:
+            @functools.wraps(call)
+            def timed_call(**kwargs):
+                try:
+                    return call(**kwargs)
+                finally:
+                    _mark_endpoint_done()
+
+        self.dependant.call = timed_call
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            stats = _current_request.get()
+            if stats is not None and stats.endpoint_done_at is not None:
+                stats.serialize_seconds = (stats.serialize_seconds or 0.0) + perf_counter() - stats.endpoint_done_at
+            return response
+
+        route_handler = timed_handler
+        policy = get_coalescing_policy(self)
+        if policy is not None:
+            route_handler = coalesced(route_handler, policy, self.path)
+        limit = get_rate_limit_policy(self)
+        if limit is not None:
+            route_handler = rate_limited(route_handler, limit, self.path)
+        return route_handler
+
+
+class RequestInstrumentationMiddleware:
+    """ASGI middleware recording the metrics of every HTTP request"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current_request.set(stats)
+        start = perf_counter()
+        response_started_at: Optional[float] = None
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal response_started_at, status_code
+            if message["type"] == "http.response.start":
+                response_started_at = perf_counter()
+                status_code = message["status"]
+                if settings.SERVER_TIMING_ENABLED:
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing", stats.server_timing(response_started_at - start)
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_request.reset(token)
+            duration = (response_started_at or perf_counter()) - start
+            _record_request(stats, status_code, duration)
+
+
+def install_query_hooks() -> None:
+    """Time every SQL statement of every engine (idempotent)"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def render_metrics() -> tuple:
+    """
+    Current metrics in the Prometheus text format
+
+    Returns:
+        (body, content type)
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def record_serialization(seconds: float) -> None:
+    """Add serialization done inside the endpoint (see app.core.responses.model_response)"""
+    stats = _current_request.get()
+    if stats is not None:
+        stats.serialize_seconds = (stats.serialize_seconds or 0.0) + seconds
+
+
+def _mark_endpoint_done() -> None:
+    stats = _current_request.get()
+    if stats is not None:
+        stats.endpoint_done_at = perf_counter()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started_at = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at = getattr(context, "_query_started_at", None)
+    if started_at is None:
+        return
+    seconds = perf_counter() - started_at
+
+    stats = _current_request.get()
+    if stats is not None:
+        stats.record_query(statement, seconds)
+
+    if seconds * 1000 >= settings.SLOW_QUERY_MS:
+        route = stats.route if stats is not None else "background"
+        SLOW_QUERIES.labels(route=route).inc()
+        slow_query_logger.warning(
+            "Slow query (%.0f ms) on %s: %s",
+            seconds * 1000, route, statement[:MAX_LOGGED_STATEMENT_LENGTH]
+        )
+
+
+def _record_request(stats: RequestStats, status_code: int, duration: float) -> None:
+    """Observe a finished request's metrics and report repeated statements"""
+    route = stats.route
+    method = stats.scope["method"]
+
+    REQUEST_SECONDS.labels(method=method, route=route, status=str(status_code)).observe(duration)
+    REQUEST_DB_STATEMENTS.labels(method=method, route=route).observe(stats.query_count)
+    REQUEST_DB_SECONDS.labels(method=method, route=route).observe(stats.db_seconds)
+    if stats.serialize_seconds is not None:
+        RESPONSE_SERIALIZATION_SECONDS.labels(method=method, route=route).observe(stats.serialize_seconds)
+
+    for statement, count in stats.statements.items():
+        if count > settings.N_PLUS_ONE_THRESHOLD:
+            N_PLUS_ONE.labels(route=route).inc()
+            logger.warning(
+                "Possible N+1 on %s %s: statement ran %d times: %s",
+                method, route, count, statement[:MAX_LOGGED_STATEMENT_LENGTH]
+            )
@@ -0,0 +1,222 @@
+"""
+Rate limiting - token buckets per client and route
+
+Routes declare a policy with a dependency:
+
+    @router.get("/chapters/{chapter_id}", dependencies=[Depends(rate_limit(120, per_seconds=60))])
+
+Each client gets a bucket per route and method holding up to `burst` tokens
+(`limit` by default), refilled at limit / per_seconds tokens a second; a
+request takes one token, and a request finding the bucket empty gets 429 Too
+Many Requests with a Retry-After header. Clients are identified by the user
+ID of their access token, or by IP address when they send none (or an
+invalid one).
+
+InstrumentedRoute checks the policy before anything else runs for the
+request - body parsing, dependencies (database sessions, get_current_user)
+and request coalescing - so rejected requests cost one bucket lookup.
+
+Buckets live in RATE_LIMIT_STORE_URL: "memory://" (per process: each API
+process enforces the limits on its own) or Redis, shared by every process.
+If Redis is unreachable, requests are let through (and the error logged).
+Rejections per route are exported as http_rate_limited_requests_total.
+"""
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+from fastapi.routing import APIRoute
+from prometheus_client import Counter
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+from app.core.config import settings
+from app.core.deps import decode_access_token
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED_REQUESTS = Counter(
+    "http_rate_limited_requests_total", "Requests rejected with 429 by route", ["route"]
+)
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class RateLimitPolicy:
+    """Per-route token bucket: `burst` tokens, refilled at `limit` per `per_seconds`"""
+
+    __slots__ = ("limit", "per_seconds", "burst")
+
+    def __init__(self, limit: int, per_seconds: float = 60.0, burst: Optional[int] = None):
+        self.limit = limit
+        self.per_seconds = per_seconds
+        self.burst = burst if burst is not None else limit
+
+    @property
+    def rate(self) -> float:
+        """Tokens added per second"""
+        return self.limit / self.per_seconds
+
+
+def rate_limit(limit: int, per_seconds: float = 60.0, burst: Optional[int] = None):
+    """Route dependency limiting each client to `limit` requests per `per_seconds` (0: unlimited)"""
+    def limit_rate() -> None:
+        pass  # Checked by InstrumentedRoute before the route's dependencies run
+
+    limit_rate.rate_limit_policy = RateLimitPolicy(limit, per_seconds, burst)
+    return limit_rate
+
+
+def get_rate_limit_policy(route: APIRoute) -> Optional[RateLimitPolicy]:
+    for dependency in route.dependencies:
+        policy = getattr(dependency.dependency, "rate_limit_policy", None)
+        if policy is not None:
+            return policy
+    return None
+
+
+class RateLimitStore(ABC):
+    """Token buckets by key"""
+
+    # Whether take() does network I/O (and so runs in a worker thread)
+    blocking = False
+
+    @abstractmethod
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """Take a token from the bucket: 0 if there was one, else seconds until there is"""
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """This process's buckets; the least recently used are dropped beyond max_keys"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # key -> [tokens, monotonic time]
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(burst), now]
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(float(burst), bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                return 0.0
+            return (1.0 - bucket[0]) / rate
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+# Refill, take a token and expire idle buckets atomically, on the Redis clock
+_TAKE_SCRIPT = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(bucket[1]) or burst
+local at = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - at) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """Buckets shared by every process; requests are allowed while Redis is unavailable"""
+
+    blocking = True
+
+    def __init__(self, url: str):
+        import redis  # Only needed when configured
+        self._errors = redis.RedisError
+        client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._take = client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        try:
+            return float(self._take(keys=[key], args=[burst, rate]))
+        except self._errors:
+            logger.warning("Rate limit store unavailable, request allowed", exc_info=True)
+            return 0.0
+
+
+def create_store(url: str) -> RateLimitStore:
+    if url.startswith("memory://"):
+        return MemoryRateLimitStore(settings.RATE_LIMIT_MAX_KEYS)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRateLimitStore(url)
+    raise ValueError(f"Unsupported rate limit store: {url}")
+
+
+_store: Optional[RateLimitStore] = None
+_store_lock = threading.Lock()
+
+
+def get_rate_limit_store() -> RateLimitStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_store(settings.RATE_LIMIT_STORE_URL)
+    return _store
+
+
+def set_rate_limit_store(store: RateLimitStore) -> RateLimitStore:
+    """Replace the bucket store (e.g. with a fresh MemoryRateLimitStore in tests)"""
+    global _store
+    with _store_lock:
+        _store = store
+    return _store
+
+
+def rate_limited(handler: Handler, policy: RateLimitPolicy, route: str) -> Handler:
+    """Wrap a route handler so clients over the route's limit get 429 without running it"""
+    async def rate_limited_handler(request: Request) -> Response:
+        if settings.RATE_LIMIT_ENABLED and policy.limit > 0:
+            store = get_rate_limit_store()
+            key = f"{settings.CACHE_KEY_PREFIX}ratelimit:{request.method} {route}:{client_key(request)}"
+            if store.blocking:
+                wait = await run_in_threadpool(store.take, key, policy.rate, policy.burst)
+            else:
+                wait = store.take(key, policy.rate, policy.burst)
+            if wait > 0:
+                RATE_LIMITED_REQUESTS.labels(route).inc()
+                raise HTTPException(
+                    status_code=429, detail="Too many requests",
+                    headers={"Retry-After": str(math.ceil(wait))}
+                )
+        return await handler(request)
+
+    return rate_limited_handler
+
+
+def client_key(request: Request) -> str:
+    """user:<id> for a valid access token, else ip:<address>"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if token and scheme.lower() == "bearer":
+        try:
+            return f"user:{decode_access_token(token)}"
+        except (HTTPException, ValueError):
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
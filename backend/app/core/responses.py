@@ -0,0 +1,133 @@
+"""
+Fast JSON responses - orjson encoding and trusted ORM serialization
+
+ORJSONResponse is the app's default response class while
+FAST_JSON_RESPONSES is on: FastAPI still validates and serializes each
+endpoint's return value against its response_model, but the final encoding
+to bytes is done by orjson instead of the stdlib json module.
+
+For large payloads read straight from our own tables, model_response()
+skips the validation pass as well: it reads the schema's fields off the ORM
+objects (or result rows) and encodes them in a single orjson call. Use it
+only where the rows already satisfy the schema - every field a column or
+attribute of the right type, no validators or custom serializers - and keep
+response_model on the route so the OpenAPI docs are unchanged.
+"""
+import functools
+import inspect
+import types
+from collections.abc import Mapping
+from time import perf_counter
+from typing import Any, Callable, Optional, Union, get_args, get_origin
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+from starlette.background import BackgroundTask
+from app.core.config import settings
+from app.core.instrumentation import record_serialization
+
+# Non-string keys appear in some JSON columns; "Z" for UTC matches Pydantic's output
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response encoded with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def get_default_response_class() -> type:
+    return ORJSONResponse if settings.FAST_JSON_RESPONSES else JSONResponse
+
+
+def model_response(
+    annotation: Any,
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Mapping] = None,
+    background: Optional[BackgroundTask] = None,
+) -> Response:
+    """
+    Response with `content` encoded as `annotation` (a schema, or e.g. List[schema])
+
+    Fields are read from ORM objects, rows or dicts without validation. With
+    FAST_JSON_RESPONSES off, the content is validated like a response_model.
+
+    Pass the endpoint's injected Response headers in `headers`: FastAPI does
+    not merge them into a response the endpoint returns itself.
+    """
+    start = perf_counter()
+    if settings.FAST_JSON_RESPONSES:
+        body = orjson.dumps(_get_converter(annotation)(content), option=ORJSON_OPTIONS)
+    else:
+        adapter = _get_adapter(annotation)
+        body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+    record_serialization(perf_counter() - start)
+    response = Response(body, status_code=status_code, media_type="application/json", background=background)
+    if headers:
+        for key, value in headers.items():
+            if key.lower() not in ("content-length", "content-type"):
+                response.headers.append(key, value)
+    return response
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def _get_adapter(annotation: Any) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_converter(annotation: Any) -> Callable[[Any], Any]:
+    """Function turning a value of `annotation` into orjson-encodable data"""
+    origin = get_origin(annotation)
+    if origin is list or origin is tuple or origin is set:
+        item = _get_converter(get_args(annotation)[0])
+        if item is _identity:
+            return _identity
+        return lambda values: None if values is None else [item(value) for value in values]
+    if origin is Union or origin is types.UnionType:
+        converters = [_get_converter(arg) for arg in get_args(annotation) if arg is not type(None)]
+        if all(converter is _identity for converter in converters):
+            return _identity
+        if len(converters) != 1:
+            raise TypeError(f"Unions of several schemas are not supported: {annotation}")
+        converter = converters[0]
+        return lambda value: None if value is None else converter(value)
+    if inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+        return _model_converter(annotation)
+    return _identity
+
+
+def _model_converter(model: type) -> Callable[[Any], Any]:
+    # Built lazily so self-referencing schemas (comment replies) resolve to this converter
+    fields = None
+
+    def convert(obj: Any) -> Optional[dict]:
+        nonlocal fields
+        if obj is None:
+            return None
+        if fields is None:
+            fields = [
+                (field.serialization_alias or field.alias or name, name, _get_converter(field.annotation), field)
+                for name, field in model.model_fields.items()
+            ]
+        data = {}
+        if isinstance(obj, Mapping):
+            for key, name, converter, field in fields:
+                value = obj[name] if name in obj else field.get_default(call_default_factory=True)
+                data[key] = converter(value)
+        else:
+            for key, name, converter, field in fields:
+                try:
+                    value = getattr(obj, name)
+                except AttributeError:
+                    value = field.get_default(call_default_factory=True)
+                data[key] = converter(value)
+        return data
+
+    return convert
@@ -101,23 +101,27 @@ class FileStorage:
     @classmethod
     async def save_cover_image(cls, file, filename: str) -> dict:
         """
-        Save book cover image and create thumbnail
+        Save book cover image
+        The thumbnail is created separately (see create_cover_thumbnail)
         Returns: dict with image_url and thumbnail_url
         """
         # Save original image
         image_path = cls.COVERS_DIR / filename
         await cls.save_upload_file(file, image_path)
         
-        # Create thumbnail
-        thumbnail_filename = f"thumb_{filename}"
-        thumbnail_path = cls.THUMBNAILS_DIR / thumbnail_filename
-        cls.create_thumbnail(image_path, thumbnail_path)
-        
         return {
             "image_url": f"/uploads/images/covers/{filename}",
-            "thumbnail_url": f"/uploads/images/thumbnails/{thumbnail_filename}"
+            "thumbnail_url": f"/uploads/images/thumbnails/thumb_{filename}"
         }
     
+    @classmethod
+    def create_cover_thumbnail(cls, filename: str) -> str:
+        """
+        Create the thumbnail of a saved cover image
+        Returns: thumbnail path
+        """
+        return cls.create_thumbnail(cls.COVERS_DIR / filename, cls.THUMBNAILS_DIR / f"thumb_{filename}")
+    
     @classmethod
     async def save_chapter_image(cls, file, filename: str) -> dict:
         """
@@ -132,6 +136,30 @@ class FileStorage:
             "image_url": f"/uploads/images/chapters/{filename}"
         }
     
+    @classmethod
+    def resolve_upload_url(cls, file_url: str) -> Optional[Path]:
+        """
+        Convert an /uploads/... URL to its filesystem path
+        Returns None for other URLs or paths outside the upload directory
+        """
+        if not file_url.startswith("/uploads/"):
+            return None
+        
+        upload_root = cls.UPLOAD_DIR.resolve()
+        full_path = (upload_root / file_url[len("/uploads/"):]).resolve()
+        if upload_root not in full_path.parents:
+            return None
+        return full_path
+    
+    @classmethod
+    def get_file_size(cls, file_url: str) -> Optional[int]:
+        """Get the size in bytes of an uploaded file by URL (None if not stored here)"""
+        full_path = cls.resolve_upload_url(file_url)
+        try:
+            return full_path.stat().st_size if full_path else None
+        except OSError:
+            return None
+    
     @classmethod
     def delete_file(cls, file_path: str) -> bool:
         """Delete a file from storage"""
@@ -8,9 +8,14 @@ from app.db.base_class import Base
 from app.models.user import User
 from app.models.book import Book
 from app.models.chapter import Chapter
+from app.models.chapter_revision import ChapterRevision
 from app.models.chapter_template import ChapterTemplate
 from app.models.reading_progress import ReadingProgress
 from app.models.bookmark import Bookmark
 from app.models.rating import Rating
 from app.models.comment import Comment
+from app.models.job import Job
+from app.models.outbox_event import OutboxEvent
 
+from app.models.book_activity import BookActivityBucket, BookTrendingScore
+from app.models.book_recommendation import BookRecommendation
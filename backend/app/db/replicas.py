@@ -0,0 +1,172 @@
+"""
+Read replica routing - Healthy-replica selection and read-your-writes stickiness
+
+Read-only endpoints take their session from get_read_db (app.core.deps),
+which binds it to a replica chosen round-robin among the healthy ones. A
+background thread checks every replica each REPLICA_HEALTH_CHECK_SECONDS:
+replicas that fail the check, or lag more than REPLICA_MAX_LAG_SECONDS
+behind the primary, leave the rotation until a later check passes. With no
+healthy replica, reads go to the primary.
+
+A client that just wrote (a successful POST/PUT/PATCH/DELETE) reads from the
+primary for READ_YOUR_WRITES_SECONDS, so it never sees a replica that has not
+caught up with its own change yet. The write is remembered in a cookie (for
+any process serving the client's next request) and, for clients that do not
+keep cookies, by bearer token in this process.
+"""
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from typing import Optional, List, Dict
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+# Seconds a replica is behind the primary (0 when it has replayed everything it received)
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+STICKY_COOKIE = "db_primary_until"
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReplicaSet:
+    """Replica engines with their health, checked in the background"""
+
+    def __init__(self, engines: List[Engine], max_lag_seconds: float, check_interval_seconds: float):
+        self.engines = engines
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self._lock = threading.Lock()
+        self._healthy: List[Engine] = []  # Replicas start out of rotation until checked
+        self._cycle = itertools.cycle([])
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def choose(self) -> Optional[Engine]:
+        """Next healthy replica, or None to use the primary"""
+        with self._lock:
+            if not self._healthy:
+                return None
+            return next(self._cycle)
+
+    def mark_down(self, replica: Engine) -> None:
+        """Take a replica out of rotation until its next successful check"""
+        with self._lock:
+            if replica not in self._healthy:
+                return
+            self._set_healthy([engine for engine in self._healthy if engine is not replica])
+        logger.warning("Read replica %s taken out of rotation after an error", _describe(replica))
+
+    def check(self) -> None:
+        """Check every replica's connection and lag, and update the rotation"""
+        healthy = []
+        for replica in self.engines:
+            try:
+                with replica.connect() as connection:
+                    lag = float(connection.execute(LAG_QUERY).scalar() or 0)
+            except Exception as e:
+                logger.warning("Read replica %s is unreachable: %s", _describe(replica), e)
+                continue
+            if lag > self.max_lag_seconds:
+                logger.warning("Read replica %s is %.1fs behind; reading from others", _describe(replica), lag)
+                continue
+            healthy.append(replica)
+        with self._lock:
+            if healthy != self._healthy:
+                self._set_healthy(healthy)
+
+    def start(self) -> None:
+        """Check the replicas, then keep checking them in the background"""
+        if not self.engines or (self._thread and self._thread.is_alive()):
+            return
+        self.check()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.check_interval_seconds + 5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.check_interval_seconds):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Failed to check read replicas")
+
+    def _set_healthy(self, healthy: List[Engine]) -> None:
+        """Replace the rotation (caller must hold the lock)"""
+        self._healthy = healthy
+        self._cycle = itertools.cycle(healthy)
+
+
+class ReadYourWrites:
+    """Remembers clients that wrote recently so their reads go to the primary"""
+
+    # Tokens remembered before expired entries are pruned
+    PRUNE_THRESHOLD = 10000
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._recent_writers: Dict[str, float] = {}  # token digest -> monotonic expiry
+
+    def mark_write(self, request: Request, response: Response) -> None:
+        """Record a successful write by the request's client"""
+        if request.method in SAFE_METHODS or response.status_code >= 400 or self.window_seconds <= 0:
+            return
+
+        until = time.time() + self.window_seconds
+        response.set_cookie(
+            STICKY_COOKIE, str(int(until) + 1), max_age=int(self.window_seconds) + 1,
+            httponly=True, samesite="lax"
+        )
+        token = _token_digest(request)
+        if token:
+            now = time.monotonic()
+            with self._lock:
+                if len(self._recent_writers) >= self.PRUNE_THRESHOLD:
+                    self._recent_writers = {
+                        key: expiry for key, expiry in self._recent_writers.items() if expiry > now
+                    }
+                self._recent_writers[token] = now + self.window_seconds
+
+    def is_sticky(self, request: Request) -> bool:
+        """Check if the request's client wrote within the window"""
+        cookie = request.cookies.get(STICKY_COOKIE)
+        if cookie:
+            try:
+                if float(cookie) > time.time():
+                    return True
+            except ValueError:
+                pass
+        token = _token_digest(request)
+        if token:
+            with self._lock:
+                expiry = self._recent_writers.get(token)
+            if expiry is not None and expiry > time.monotonic():
+                return True
+        return False
+
+
+def _token_digest(request: Request) -> Optional[str]:
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()
+
+
+def _describe(replica: Engine) -> str:
+    return replica.url.render_as_string(hide_password=True)
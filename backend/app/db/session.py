@@ -4,6 +4,7 @@ Database session configuration
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.replicas import ReplicaSet, ReadYourWrites
 
 # Create database engine
 engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
@@ -11,6 +12,14 @@ engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read replicas (read-only endpoints only; see app.db.replicas)
+replica_set = ReplicaSet(
+    engines=[create_engine(url, pool_pre_ping=True) for url in settings.DATABASE_REPLICA_URLS],
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval_seconds=settings.REPLICA_HEALTH_CHECK_SECONDS,
+)
+read_your_writes = ReadYourWrites(window_seconds=settings.READ_YOUR_WRITES_SECONDS)
+
 
 def get_db():
     """
@@ -22,4 +31,3 @@ def get_db():
         yield db
     finally:
         db.close()
-
@@ -0,0 +1,54 @@
+"""
+Book activity models - Bucketed engagement counters and trending scores
+"""
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+
+class BookActivityBucket(Base):
+    """
+    Engagement counts for one book over one hour
+
+    Written in bulk by the trending tracker's buffer; the durable time series
+    trending scores can be rebuilt from.
+    """
+    __tablename__ = "book_activity_buckets"
+    __table_args__ = (
+        UniqueConstraint("book_id", "bucket_start", name="uq_book_activity_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False, index=True)
+    bucket_start = Column(DateTime(timezone=True), nullable=False, index=True)
+    views = Column(Integer, default=0, nullable=False)
+    likes = Column(Integer, default=0, nullable=False)
+    ratings = Column(Integer, default=0, nullable=False)
+    bookmarks = Column(Integer, default=0, nullable=False)
+    comments = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<BookActivityBucket book_id={self.book_id} at {self.bucket_start}>"
+
+
+class BookTrendingScore(Base):
+    """
+    Time-decayed engagement score of a book
+
+    log_score is the log of the forward-decayed sum of weighted activity: each
+    activity counts exp(rate * (time - epoch)), so newer activity always counts
+    more and scores only grow. Ordering by log_score is the same as ordering by
+    the conventionally decayed score at any moment, which never has to be
+    recomputed as time passes.
+    """
+    __tablename__ = "book_trending_scores"
+
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+    log_score = Column(Float, nullable=False)
+    last_activity_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, index=True
+    )
+
+    def __repr__(self):
+        return f"<BookTrendingScore book_id={self.book_id} log_score={self.log_score}>"
@@ -0,0 +1,23 @@
+"""
+Book recommendation model
+"""
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, ARRAY
+from app.db.base_class import Base
+
+
+class BookRecommendation(Base):
+    """
+    Precomputed "readers of this book also read" list of a book
+
+    Written by the recommendation batch job; similar_book_ids and scores are
+    parallel arrays, most similar first.
+    """
+    __tablename__ = "book_recommendations"
+
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+    similar_book_ids = Column(ARRAY(Integer), nullable=False)
+    scores = Column(ARRAY(Float), nullable=False)  # Cosine similarity of the books' reader vectors
+    computed_at = Column(DateTime(timezone=True), nullable=False, index=True)  # Start of the run that wrote it
+
+    def __repr__(self):
+        return f"<BookRecommendation book_id={self.book_id} ({len(self.similar_book_ids or [])} books)>"
@@ -1,7 +1,7 @@
 """
 Bookmark model
 """
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base_class import Base
@@ -10,6 +10,10 @@ from app.db.base_class import Base
 class Bookmark(Base):
     """Bookmark model for users to save books"""
     __tablename__ = "bookmarks"
+    __table_args__ = (
+        # One bookmark per user per book (target of bulk upserts)
+        UniqueConstraint("user_id", "book_id", name="uq_bookmarks_user_book"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
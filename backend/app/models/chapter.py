@@ -1,7 +1,7 @@
 """
 Chapter model
 """
-from sqlalchemy import Column, Integer, String, Text, Enum as SQLEnum, ForeignKey, Boolean, JSON, DateTime
+from sqlalchemy import Column, Integer, String, Text, Enum as SQLEnum, ForeignKey, Boolean, JSON, DateTime, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -17,6 +17,12 @@ class ContentType(str, enum.Enum):
 class Chapter(Base):
     """Chapter model for storing book chapters"""
     __tablename__ = "chapters"
+    __table_args__ = (
+        # One chapter per number in a book (reorders park rows on negative numbers)
+        UniqueConstraint("book_id", "chapter_number", name="uq_chapters_book_chapter_number"),
+        # Chapters waiting for their scheduled release, by release time
+        Index("ix_chapters_publish_at", "publish_at", postgresql_where=text("publish_at IS NOT NULL")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -24,9 +30,16 @@ class Chapter(Base):
     title = Column(String(200), nullable=False)
     content_type = Column(SQLEnum(ContentType), default=ContentType.SIMPLE, nullable=False)
     content_data = Column(JSON, nullable=False)  # Stores either plain text or interactive JSON
+    compiled_graph = Column(JSON, nullable=True)  # Node index and adjacency for interactive chapters
+    asset_manifest = Column(JSON, nullable=True)  # Assets of interactive chapters by first use
     word_count = Column(Integer, default=0, nullable=False)
+    character_count = Column(Integer, default=0, nullable=False)
+    reading_time_minutes = Column(Integer, default=0, nullable=False)
+    text_stats = Column(JSON, nullable=True)  # Totals plus per-node counts keyed by content hash
+    version = Column(Integer, default=1, nullable=False)  # Bumped on every content save
     is_published = Column(Boolean, default=False, nullable=False, index=True)
     published_at = Column(DateTime(timezone=True), nullable=True)
+    publish_at = Column(DateTime(timezone=True), nullable=True)  # Scheduled release of an unpublished chapter
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
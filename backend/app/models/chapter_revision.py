@@ -0,0 +1,35 @@
+"""
+Chapter revision model
+"""
+from sqlalchemy import Column, Integer, Boolean, LargeBinary, Enum as SQLEnum, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+from app.models.chapter import ContentType
+
+
+class ChapterRevision(Base):
+    """
+    Saved version of a chapter's content
+    
+    Keyframes store the full content_data; other revisions store the delta
+    from the previous revision. Both are zlib-compressed JSON.
+    """
+    __tablename__ = "chapter_revisions"
+    __table_args__ = (
+        # One revision per chapter version (also used to seek keyframes)
+        UniqueConstraint("chapter_id", "version", name="uq_chapter_revisions_chapter_version"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    chapter_id = Column(Integer, ForeignKey("chapters.id", ondelete="CASCADE"), nullable=False, index=True)
+    version = Column(Integer, nullable=False)
+    content_type = Column(SQLEnum(ContentType), nullable=False)
+    is_keyframe = Column(Boolean, default=False, nullable=False)
+    depth = Column(Integer, default=0, nullable=False)  # Deltas since the last keyframe
+    data = Column(LargeBinary, nullable=False)
+    word_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # No relationship to Chapter: revisions are removed by the ON DELETE CASCADE
+    
+    def __repr__(self):
+        return f"<ChapterRevision chapter_id={self.chapter_id} version={self.version}>"
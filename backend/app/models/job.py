@@ -0,0 +1,53 @@
+"""
+Background job model
+"""
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, Enum as SQLEnum, Index, text
+from sqlalchemy.sql import func
+import enum
+from app.db.base_class import Base
+
+
+class JobStatus(str, enum.Enum):
+    """Job status enumeration"""
+    QUEUED = "queued"  # Waiting to run (or to be retried at run_at)
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"  # Gave up after max_attempts
+
+
+class Job(Base):
+    """
+    Deferred unit of work, run by a worker outside the request that enqueued it
+
+    Workers claim queued jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any
+    number of workers can poll the same table without handing out a job twice.
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Claim order of waiting jobs: most urgent first, then oldest
+        Index(
+            "ix_jobs_claim",
+            "queue", text("priority DESC"), "run_at",
+            postgresql_where=text("status = 'QUEUED'")
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    queue = Column(String(50), default="default", nullable=False)
+    task = Column(String(100), nullable=False, index=True)  # Name of a registered task handler
+    payload = Column(JSON, nullable=False)
+    priority = Column(Integer, default=0, nullable=False)  # Higher runs first
+    status = Column(SQLEnum(JobStatus), default=JobStatus.QUEUED, nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    idempotency_key = Column(String(200), unique=True, nullable=True)  # Enqueueing the same key again is a no-op
+    last_error = Column(Text, nullable=True)
+    run_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    locked_by = Column(String(100), nullable=True)  # Worker id while running
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.task} ({self.status})>"
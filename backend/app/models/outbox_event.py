@@ -0,0 +1,34 @@
+"""
+Outbox event model
+"""
+from sqlalchemy import Column, BigInteger, Integer, String, JSON, DateTime, Index, text
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+
+class OutboxEvent(Base):
+    """
+    Change event written in the same transaction as the change it describes
+
+    log_offset is assigned by the relay once the event is committed, in relay
+    order, so consumers reading the log by offset never skip an event that
+    committed after a later one.
+    """
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # Events still waiting for the relay
+        Index("ix_outbox_events_pending", "id", postgresql_where=text("log_offset IS NULL")),
+    )
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    event_type = Column(String(100), nullable=False, index=True)  # e.g. "chapter.updated"
+    aggregate_type = Column(String(50), nullable=False)  # "book", "chapter", "comment" or "rating"
+    aggregate_id = Column(Integer, nullable=False)
+    payload = Column(JSON, nullable=False)
+    log_offset = Column(BigInteger, unique=True, nullable=True)  # Position in the change log, once relayed
+    published_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<OutboxEvent {self.id} {self.event_type} {self.aggregate_type}={self.aggregate_id}>"
@@ -1,7 +1,7 @@
 """
 Reading Progress model
 """
-from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base_class import Base
@@ -10,6 +10,10 @@ from app.db.base_class import Base
 class ReadingProgress(Base):
     """Reading Progress model for tracking user reading progress"""
     __tablename__ = "reading_progress"
+    __table_args__ = (
+        # One progress row per user per book (target of bulk upserts)
+        UniqueConstraint("user_id", "book_id", name="uq_reading_progress_user_book"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
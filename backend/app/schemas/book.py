@@ -75,6 +75,32 @@ class BookListResponse(BaseModel):
     total_pages: int
 
 
+# Book in a trending ranking
+class TrendingBook(Book):
+    """Schema for a trending book with its current score"""
+    trending_score: float  # Weighted activity, each activity counting half per half-life
+
+
+# Schema for trending books response
+class TrendingBookListResponse(BaseModel):
+    """Schema for a trending ranking"""
+    books: List[TrendingBook]
+    genre: Optional[str] = None
+    tag: Optional[str] = None
+
+
+# Recommended book
+class RecommendedBook(Book):
+    """Schema for a recommended book with its relevance score"""
+    score: float
+
+
+# Schema for recommendations response
+class RecommendationListResponse(BaseModel):
+    """Schema for a list of recommended books, most relevant first"""
+    books: List[RecommendedBook]
+
+
 # Schema for comprehensive book statistics
 class BookStatistics(BaseModel):
     """Schema for comprehensive book statistics"""
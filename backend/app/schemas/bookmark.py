@@ -2,7 +2,7 @@
 Bookmark Pydantic schemas for request/response validation
 """
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 
@@ -18,6 +18,19 @@ class BookmarkCreate(BookmarkBase):
     pass
 
 
+# Single queued bookmark toggle from an offline client
+class BookmarkSyncItem(BookmarkBase):
+    """Schema for a bookmark add/remove replayed by an offline client"""
+    bookmarked: bool = Field(..., description="True to add the bookmark, False to remove it")
+    client_timestamp: datetime = Field(..., description="When the toggle happened on the client")
+
+
+# Batch of queued bookmark toggles from an offline client
+class BookmarkSyncBatch(BaseModel):
+    """Schema for a batch of bookmark toggles"""
+    items: List[BookmarkSyncItem] = Field(..., min_length=1, max_length=1000)
+
+
 # Properties shared by models stored in DB
 class BookmarkInDBBase(BookmarkBase):
     """Base schema for bookmark data from database"""
@@ -1,10 +1,11 @@
 """
 Chapter Pydantic schemas for request/response validation
 """
-from pydantic import BaseModel, Field, ConfigDict, field_validator
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
+from typing import Optional, List, Dict, Any, Literal
+from datetime import datetime, timezone
 from app.models.chapter import ContentType
+from app.utils.chapter_graph import compile_chapter_graph
 
 
 # Shared properties
@@ -15,6 +16,18 @@ class ChapterBase(BaseModel):
     content_type: ContentType = ContentType.SIMPLE
     content_data: Dict[str, Any] = Field(..., description="Chapter content (text or interactive JSON)")
     is_published: bool = False
+    publish_at: Optional[datetime] = Field(None, description="Scheduled release time of an unpublished chapter")
+
+
+def check_publish_at(value: Optional[datetime]) -> Optional[datetime]:
+    """Check a scheduled release time is in the future (times without a zone are UTC)"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    if value <= datetime.now(timezone.utc):
+        raise ValueError("publish_at must be in the future")
+    return value
 
 
 # Properties to receive via API on creation
@@ -43,8 +56,22 @@ class ChapterCreate(ChapterBase):
                 raise ValueError("Interactive chapters must have 'nodes' field in content_data")
             if not isinstance(v['nodes'], list):
                 raise ValueError("'nodes' field must be a list")
+            # Check ids and next/choice targets (raises ChapterGraphError)
+            compile_chapter_graph(v['nodes'])
         
         return v
+    
+    @field_validator('publish_at')
+    @classmethod
+    def validate_publish_at(cls, v):
+        return check_publish_at(v)
+    
+    @model_validator(mode='after')
+    def check_schedule(self):
+        """A chapter is either published now or scheduled"""
+        if self.is_published and self.publish_at is not None:
+            raise ValueError("A published chapter cannot have a publish_at time")
+        return self
 
 
 # Properties to receive via API on update
@@ -55,6 +82,65 @@ class ChapterUpdate(BaseModel):
     content_type: Optional[ContentType] = None
     content_data: Optional[Dict[str, Any]] = None
     is_published: Optional[bool] = None
+    publish_at: Optional[datetime] = Field(None, description="Schedule the release (null: cancel the schedule)")
+    
+    @field_validator('publish_at')
+    @classmethod
+    def validate_publish_at(cls, v):
+        return check_publish_at(v)
+    
+    @model_validator(mode='after')
+    def check_schedule(self):
+        """A chapter is either published now or scheduled"""
+        if self.is_published and self.publish_at is not None:
+            raise ValueError("A published chapter cannot have a publish_at time")
+        return self
+
+
+# A single JSON Patch (RFC 6902) operation on content_data
+class JsonPatchOperation(BaseModel):
+    """Schema for a JSON Patch operation"""
+    op: Literal["add", "remove", "replace", "move", "copy", "test"]
+    path: str = Field(..., description="JSON Pointer into content_data, e.g. /nodes/3/text")
+    value: Any = None  # add, replace, test
+    from_: Optional[str] = Field(None, alias="from")  # move, copy
+    
+    model_config = ConfigDict(populate_by_name=True)
+
+
+# A text splice inside a string of content_data
+class ChapterTextEdit(BaseModel):
+    """Schema for a text edit (replace `delete` characters at `offset` with `insert`)"""
+    path: str = Field("/text", description="JSON Pointer to a string in content_data")
+    offset: int = Field(..., ge=0, description="Position in Unicode code points")
+    delete: int = Field(0, ge=0)
+    insert: str = ""
+
+
+# Properties to receive via API on delta save (autosave)
+class ChapterPatch(BaseModel):
+    """Schema for a delta update of chapter content"""
+    base_version: int = Field(..., ge=1, description="Version the edits were made against")
+    operations: List[JsonPatchOperation] = Field(default=[], max_length=1000)  # Applied first
+    text_edits: List[ChapterTextEdit] = Field(default=[], max_length=1000)  # Applied in order
+    
+    @model_validator(mode='after')
+    def check_not_empty(self):
+        """Require at least one edit"""
+        if not self.operations and not self.text_edits:
+            raise ValueError("Patch must contain operations or text_edits")
+        return self
+
+
+# Properties to return after a delta save
+class ChapterPatchResult(BaseModel):
+    """Schema for the result of a delta update (content is not echoed back)"""
+    id: int
+    version: int
+    word_count: int
+    character_count: int
+    reading_time_minutes: int
+    updated_at: datetime
 
 
 # Properties for chapter reordering
@@ -64,12 +150,35 @@ class ChapterReorder(BaseModel):
     new_chapter_number: int = Field(..., ge=1)
 
 
+# Properties for applying several chapter moves at once
+class ChapterMoveBatch(BaseModel):
+    """Schema for a batch of chapter moves, applied in order"""
+    moves: List[ChapterReorder] = Field(..., min_length=1, max_length=1000)
+
+
+# New position of a chapter after a move
+class ChapterPosition(BaseModel):
+    """Schema for a chapter's new chapter number"""
+    id: int
+    chapter_number: int
+
+
+# Schema for chapter move batch response
+class ChapterMoveResponse(BaseModel):
+    """Schema for the chapters whose number changed"""
+    chapters: List[ChapterPosition]
+    total: int
+
+
 # Properties shared by models stored in DB
 class ChapterInDBBase(ChapterBase):
     """Base schema for chapter data from database"""
     id: int
     book_id: int
     word_count: int = 0
+    character_count: int = 0
+    reading_time_minutes: int = 0
+    version: int = 1
     published_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
@@ -92,8 +201,11 @@ class ChapterSummary(BaseModel):
     title: str
     content_type: ContentType
     word_count: int
+    character_count: int = 0
+    reading_time_minutes: int = 0
     is_published: bool
     published_at: Optional[datetime] = None
+    publish_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
     
@@ -106,3 +218,96 @@ class ChapterListResponse(BaseModel):
     chapters: List[ChapterSummary]
     total: int
 
+
+# Schema for a lookahead window of interactive nodes
+class ChapterNodeWindow(BaseModel):
+    """Schema for a bounded window of interactive nodes"""
+    chapter_id: int
+    start_node: str
+    node_count: int  # Total nodes in the chapter
+    nodes: List[Dict[str, Any]]  # Start node first, then breadth-first
+    frontier: List[str]  # Linked from the window but not included: fetch these next
+
+
+# Schema for interactive nodes fetched by id
+class ChapterNodeBatch(BaseModel):
+    """Schema for interactive nodes fetched by id"""
+    chapter_id: int
+    nodes: List[Dict[str, Any]]
+    missing: List[str]  # Requested ids that do not exist
+
+
+# Schema for a single asset in a chapter's asset manifest
+class ChapterAsset(BaseModel):
+    """Schema for an asset referenced by an interactive chapter"""
+    url: str
+    kind: str  # image, audio or video
+    first_node: str  # Id of the first node (by reading order) that uses it
+    size: Optional[int] = None  # Bytes, if the file is stored on this server
+
+
+# Schema for a chapter's asset manifest
+class ChapterAssetManifest(BaseModel):
+    """Schema for the assets of an interactive chapter, ordered by first use"""
+    chapter_id: int
+    total_size: int
+    assets: List[ChapterAsset]
+
+
+# Schema for text statistics of one interactive node
+class ChapterNodeTextStats(BaseModel):
+    """Schema for text statistics of an interactive node"""
+    id: str
+    word_count: int
+    character_count: int
+
+
+# Schema for chapter text statistics
+class ChapterTextStats(BaseModel):
+    """Schema for chapter text statistics"""
+    chapter_id: int
+    word_count: int
+    character_count: int
+    reading_time_minutes: int
+    nodes: List[ChapterNodeTextStats] = []  # Interactive chapters only, in node order
+
+
+# Schema for a chapter revision (without content)
+class ChapterRevisionInfo(BaseModel):
+    """Schema for a saved revision of a chapter"""
+    version: int
+    content_type: ContentType
+    is_keyframe: bool
+    word_count: int
+    size: int  # Stored (compressed) bytes
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Schema for chapter revision list response
+class ChapterRevisionListResponse(BaseModel):
+    """Schema for the revision history of a chapter, newest first"""
+    chapter_id: int
+    current_version: int
+    revisions: List[ChapterRevisionInfo]
+    total: int
+
+
+# Schema for a reconstructed chapter revision
+class ChapterRevisionContent(BaseModel):
+    """Schema for the content of a chapter revision"""
+    chapter_id: int
+    version: int
+    content_type: ContentType
+    content_data: Dict[str, Any]
+
+
+# Schema for the changes between two chapter revisions
+class ChapterRevisionDiff(BaseModel):
+    """Schema for the delta from one revision to another (same format as ChapterPatch)"""
+    chapter_id: int
+    from_version: int
+    to_version: int
+    operations: List[Dict[str, Any]]
+    text_edits: List[Dict[str, Any]]
@@ -0,0 +1,23 @@
+"""
+Change event Pydantic schemas for response validation
+"""
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+
+
+# Properties to return to client
+class ChangeEvent(BaseModel):
+    """Schema for an entry of the change log"""
+    offset: int
+    type: str
+    aggregate_type: str
+    aggregate_id: int
+    payload: Dict[str, Any]
+    created_at: Optional[datetime] = None
+
+
+class ChangeEventListResponse(BaseModel):
+    """Schema for a page of the change log"""
+    events: List[ChangeEvent]
+    next_offset: int  # Pass as `after` to continue reading
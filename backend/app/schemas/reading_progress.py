@@ -2,7 +2,7 @@
 Reading Progress Pydantic schemas for request/response validation
 """
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 
@@ -27,6 +27,18 @@ class ReadingProgressUpdate(BaseModel):
     progress_percentage: Optional[float] = Field(None, ge=0.0, le=100.0)
 
 
+# Single queued update from an offline client
+class ReadingProgressSyncItem(ReadingProgressBase):
+    """Schema for a reading progress update replayed by an offline client"""
+    client_timestamp: datetime = Field(..., description="When the update happened on the client")
+
+
+# Batch of queued updates from an offline client
+class ReadingProgressSyncBatch(BaseModel):
+    """Schema for a batch of reading progress updates"""
+    items: List[ReadingProgressSyncItem] = Field(..., min_length=1, max_length=1000)
+
+
 # Properties shared by models stored in DB
 class ReadingProgressInDBBase(ReadingProgressBase):
     """Base schema for reading progress data from database"""
@@ -44,6 +56,12 @@ class ReadingProgress(ReadingProgressInDBBase):
     pass
 
 
+# Buffered progress update (accepted but not yet written)
+class ReadingProgressPending(ReadingProgressBase):
+    """Schema for a buffered reading progress update"""
+    last_read_at: datetime
+
+
 # Schema for reading progress with additional details
 class ReadingProgressWithDetails(ReadingProgress):
     """Schema for reading progress with book and chapter details"""
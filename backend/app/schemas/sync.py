@@ -0,0 +1,29 @@
+"""
+Offline sync Pydantic schemas shared by batch write endpoints
+"""
+from pydantic import BaseModel
+from typing import Optional, List
+import enum
+
+
+class SyncItemStatus(str, enum.Enum):
+    """Outcome of a single item in a sync batch"""
+    APPLIED = "applied"  # Written (or already in the requested state)
+    SUPERSEDED = "superseded"  # A newer write for the same key won
+    INVALID = "invalid"  # Referenced book or chapter does not exist
+
+
+class SyncItemResult(BaseModel):
+    """Schema for the result of a single batch item"""
+    index: int  # Position of the item in the request array
+    book_id: int
+    status: SyncItemStatus
+    detail: Optional[str] = None
+
+
+class SyncBatchResponse(BaseModel):
+    """Schema for batch sync response"""
+    results: List[SyncItemResult]
+    applied: int
+    superseded: int
+    invalid: int
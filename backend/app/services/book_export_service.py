@@ -0,0 +1,409 @@
+"""
+Book export service layer - Whole-book downloads as EPUB, HTML or NDJSON
+
+Exports contain the book's published chapters in reading order. Chapters are
+read through a server-side cursor (EXPORT_BATCH_SIZE rows per round trip) and
+rendered one at a time, so memory use does not grow with the size of the book.
+
+Finished exports are cached on disk under EXPORT_CACHE_DIR, keyed by the
+latest published chapter's updated_at (plus the chapter count and the book's
+metadata, so deleting or unpublishing a chapter also changes the key). A
+cached file is only written once its export streamed to the end.
+
+NDJSON exports hold one chapter object per line, in the format accepted by
+the chapter import endpoint.
+"""
+import hashlib
+import html
+import json
+import os
+import re
+import tempfile
+import zipfile
+import zlib
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Iterator, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.book import Book
+from app.models.chapter import Chapter, ContentType
+from app.utils.chapter_graph import CHOICE_KEYS, TERMINAL_TARGETS
+from app.utils.text_stats import extract_node_texts
+
+# Format -> (file extension, media type)
+EXPORT_FORMATS = {
+    "epub": ("epub", "application/epub+zip"),
+    "html": ("html", "text/html; charset=utf-8"),
+    "ndjson": ("ndjson", "application/x-ndjson"),
+}
+
+# Bump when the rendered output changes, so cached exports are rebuilt
+EXPORT_FORMAT_VERSION = 2
+
+# Chapter rows fetched per round trip
+EXPORT_BATCH_SIZE = 20
+
+# Characters not allowed in XML documents (EPUB chapters are XHTML)
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+_STYLE = (
+    "body{font-family:Georgia,serif;line-height:1.6;max-width:40em;margin:0 auto;padding:1em}"
+    "section.node{margin-bottom:1.5em}ul.choices{list-style:none;padding-left:0}"
+    "ul.choices li::before{content:'\\2192  '}"
+)
+
+
+def get_export_key(db: Session, book: Book) -> str:
+    """Cache key (and ETag) of a book's export; changes when any exported content changes"""
+    latest, count = db.query(func.max(Chapter.updated_at), func.count(Chapter.id)).filter(
+        Chapter.book_id == book.id,
+        Chapter.is_published == True
+    ).one()
+
+    digest = hashlib.sha256(json.dumps([
+        EXPORT_FORMAT_VERSION,
+        latest.isoformat() if latest else None,
+        count,
+        book.title,
+        book.description,
+        book.genre,
+        book.tags,
+        book.author.username if book.author else None,
+    ], default=str).encode("utf-8"))
+    return digest.hexdigest()[:24]
+
+
+def get_cached_export(book_id: int, export_format: str, key: str) -> Optional[str]:
+    """Path of a finished export with this key, if cached"""
+    path = _cache_path(book_id, export_format, key)
+    return path if os.path.isfile(path) else None
+
+
+def clear_cached_exports(book_id: int) -> None:
+    """Remove every cached export of a book"""
+    directory = _cache_dir(book_id)
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        _remove_file(os.path.join(directory, name))
+    try:
+        os.rmdir(directory)
+    except OSError:
+        pass
+
+
+def export_book(db: Session, book: Book, export_format: str) -> Iterator[bytes]:
+    """
+    Render a book's published chapters in an export format, chunk by chunk
+
+    Args:
+        export_format: One of EXPORT_FORMATS
+    """
+    chapters = _stream_chapters(db, book.id)
+    if export_format == "epub":
+        return _render_epub(book, chapters)
+    if export_format == "html":
+        return _render_html(book, chapters)
+    if export_format == "ndjson":
+        return _render_ndjson(chapters)
+    raise ValueError(f"Unknown export format '{export_format}'")
+
+
+def cache_export(chunks: Iterator[bytes], book_id: int, export_format: str, key: str) -> Iterator[bytes]:
+    """
+    Pass chunks through while writing them to the export cache
+
+    The file only replaces older exports of the book once every chunk was
+    written; an interrupted export (client gone, error) leaves nothing behind.
+    """
+    directory = _cache_dir(book_id)
+    os.makedirs(directory, exist_ok=True)
+    extension = EXPORT_FORMATS[export_format][0]
+    fd, partial_path = tempfile.mkstemp(dir=directory, prefix=".partial-", suffix=f".{extension}")
+
+    completed = False
+    try:
+        with os.fdopen(fd, "wb") as partial:
+            for chunk in chunks:
+                partial.write(chunk)
+                yield chunk
+        os.replace(partial_path, _cache_path(book_id, export_format, key))
+        completed = True
+    finally:
+        if not completed:
+            _remove_file(partial_path)
+
+    # Drop superseded exports in the same format
+    for name in os.listdir(directory):
+        if name.endswith(f".{extension}") and not name.startswith((key, ".partial-")):
+            _remove_file(os.path.join(directory, name))
+
+
+def _cache_dir(book_id: int) -> str:
+    return os.path.join(settings.EXPORT_CACHE_DIR, f"book-{book_id}")
+
+
+def _cache_path(book_id: int, export_format: str, key: str) -> str:
+    return os.path.join(_cache_dir(book_id), f"{key}.{EXPORT_FORMATS[export_format][0]}")
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _stream_chapters(db: Session, book_id: int) -> Iterator[Any]:
+    """Stream published chapter rows in reading order, EXPORT_BATCH_SIZE at a time"""
+    stmt = select(
+        Chapter.chapter_number,
+        Chapter.title,
+        Chapter.content_type,
+        Chapter.content_data,
+        Chapter.word_count,
+        Chapter.published_at
+    ).where(
+        Chapter.book_id == book_id,
+        Chapter.is_published == True
+    ).order_by(Chapter.chapter_number).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    return iter(db.execute(stmt))
+
+
+def _render_ndjson(chapters: Iterator[Any]) -> Iterator[bytes]:
+    """One chapter object per line (chapter import format)"""
+    for chapter in chapters:
+        yield (json.dumps({
+            "chapter_number": chapter.chapter_number,
+            "title": chapter.title,
+            "content_type": chapter.content_type.value,
+            "content_data": chapter.content_data,
+            "word_count": chapter.word_count,
+            "published_at": chapter.published_at.isoformat() if chapter.published_at else None,
+        }, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _render_html(book: Book, chapters: Iterator[Any]) -> Iterator[bytes]:
+    """A single HTML page; the table of contents follows the chapters (it is built while streaming)"""
+    yield (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\"/>\n"
+        f"<title>{_escape(book.title)}</title>\n<style>{_STYLE}</style>\n</head>\n<body>\n"
+        f"{_render_title_block(book)}"
+    ).encode("utf-8")
+
+    contents: List[Tuple[int, str]] = []
+    for chapter in chapters:
+        contents.append((chapter.chapter_number, chapter.title))
+        yield _render_chapter_body(chapter, anchor_prefix=f"chapter-{chapter.chapter_number}").encode("utf-8")
+
+    items = "".join(
+        f"<li><a href=\"#chapter-{number}\">{_escape(title)}</a></li>\n" for number, title in contents
+    )
+    yield f"<nav id=\"contents\">\n<h2>Contents</h2>\n<ol>\n{items}</ol>\n</nav>\n</body>\n</html>\n".encode("utf-8")
+
+
+def _render_epub(book: Book, chapters: Iterator[Any]) -> Iterator[bytes]:
+    """
+    An EPUB 3 archive, written entry by entry
+
+    The zip is written to a non-seekable buffer, so entry sizes go in data
+    descriptors after each entry instead of being patched into its header.
+    The mimetype entry is the exception: EPUB readers expect it first, stored
+    with its CRC and sizes in the local header, so it is written by hand
+    before zipfile takes over.
+    """
+    buffer = _ChunkBuffer()
+    mimetype = _write_stored_entry(buffer, "mimetype", b"application/epub+zip")
+    archive = zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED)
+    archive.filelist.append(mimetype)
+    archive.NameToInfo[mimetype.filename] = mimetype
+    archive.writestr("META-INF/container.xml", (
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"
+        "<container version=\"1.0\" xmlns=\"urn:oasis:names:tc:opendocument:xmlns:container\">\n"
+        "<rootfiles><rootfile full-path=\"OEBPS/content.opf\" media-type=\"application/oebps-package+xml\"/></rootfiles>\n"
+        "</container>\n"
+    ))
+    archive.writestr("OEBPS/style.css", _STYLE)
+    archive.writestr("OEBPS/title.xhtml", _xhtml_page(book.title, _render_title_block(book)))
+    yield buffer.drain()
+
+    contents: List[Tuple[int, str]] = []
+    latest: Optional[datetime] = None
+    for chapter in chapters:
+        contents.append((chapter.chapter_number, chapter.title))
+        if chapter.published_at and (latest is None or chapter.published_at > latest):
+            latest = chapter.published_at
+        archive.writestr(
+            f"OEBPS/{_epub_chapter_file(chapter.chapter_number)}",
+            _xhtml_page(chapter.title, _render_chapter_body(chapter, anchor_prefix="n"))
+        )
+        yield buffer.drain()
+
+    archive.writestr("OEBPS/nav.xhtml", _xhtml_page("Contents", (
+        "<nav epub:type=\"toc\" id=\"toc\">\n<h2>Contents</h2>\n<ol>\n"
+        "<li><a href=\"title.xhtml\">" + _escape(book.title) + "</a></li>\n"
+        + "".join(
+            f"<li><a href=\"{_epub_chapter_file(number)}\">{_escape(title)}</a></li>\n" for number, title in contents
+        )
+        + "</ol>\n</nav>\n"
+    )))
+    archive.writestr("OEBPS/content.opf", _render_opf(book, contents, latest))
+    archive.close()
+    yield buffer.drain()
+
+
+def _render_opf(book: Book, contents: List[Tuple[int, str]], modified: Optional[datetime]) -> str:
+    """EPUB package document: metadata, manifest and reading order"""
+    modified = modified or datetime.utcnow()
+    author = book.author.username if book.author else ""
+    manifest = "".join(
+        f"<item id=\"c{number}\" href=\"{_epub_chapter_file(number)}\" media-type=\"application/xhtml+xml\"/>\n"
+        for number, _ in contents
+    )
+    spine = "".join(f"<itemref idref=\"c{number}\"/>\n" for number, _ in contents)
+    return (
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"
+        "<package xmlns=\"http://www.idpf.org/2007/opf\" version=\"3.0\" unique-identifier=\"book-id\">\n"
+        "<metadata xmlns:dc=\"http://purl.org/dc/elements/1.1/\">\n"
+        f"<dc:identifier id=\"book-id\">urn:interactive-web-novels:book:{book.id}</dc:identifier>\n"
+        f"<dc:title>{_escape(book.title)}</dc:title>\n"
+        f"<dc:creator>{_escape(author)}</dc:creator>\n"
+        "<dc:language>en</dc:language>\n"
+        f"<meta property=\"dcterms:modified\">{modified.strftime('%Y-%m-%dT%H:%M:%SZ')}</meta>\n"
+        "</metadata>\n<manifest>\n"
+        "<item id=\"nav\" href=\"nav.xhtml\" media-type=\"application/xhtml+xml\" properties=\"nav\"/>\n"
+        "<item id=\"style\" href=\"style.css\" media-type=\"text/css\"/>\n"
+        "<item id=\"title\" href=\"title.xhtml\" media-type=\"application/xhtml+xml\"/>\n"
+        f"{manifest}</manifest>\n<spine>\n<itemref idref=\"title\"/>\n{spine}</spine>\n</package>\n"
+    )
+
+
+def _render_title_block(book: Book) -> str:
+    parts = [f"<header>\n<h1>{_escape(book.title)}</h1>\n"]
+    if book.author:
+        parts.append(f"<p class=\"author\">by {_escape(book.author.username)}</p>\n")
+    if book.description:
+        parts.append(_render_text(book.description))
+    parts.append("</header>\n")
+    return "".join(parts)
+
+
+def _render_chapter_body(chapter: Any, anchor_prefix: str) -> str:
+    """
+    A chapter as an HTML section
+    Interactive chapters list every node in order; choices link to the node they lead to.
+    """
+    parts = [f"<section class=\"chapter\" id=\"chapter-{chapter.chapter_number}\">\n",
+             f"<h2>{_escape(chapter.title)}</h2>\n"]
+    content_data = chapter.content_data if isinstance(chapter.content_data, dict) else {}
+
+    if chapter.content_type == ContentType.INTERACTIVE:
+        nodes = content_data.get("nodes")
+        for position, node in enumerate(nodes if isinstance(nodes, list) else []):
+            if isinstance(node, dict):
+                parts.append(_render_node(node, position, anchor_prefix))
+    else:
+        text = content_data.get("text", "")
+        parts.append(_render_text(text if isinstance(text, str) else str(text)))
+
+    parts.append("</section>\n")
+    return "".join(parts)
+
+
+def _render_node(node: Dict[str, Any], position: int, anchor_prefix: str) -> str:
+    """An interactive node: its text, then its choices as links"""
+    node_id = node.get("id")
+    anchor = f"{anchor_prefix}-{_anchor(node_id if node_id else position)}"
+    body = {key: value for key, value in node.items() if key not in CHOICE_KEYS}
+    parts = [f"<section class=\"node\" id=\"{anchor}\">\n"]
+    speaker = node.get("speaker") or node.get("character")
+    if isinstance(speaker, str) and speaker:
+        parts.append(f"<p class=\"speaker\"><strong>{_escape(speaker)}</strong></p>\n")
+    parts.extend(_render_text(text) for text in extract_node_texts(body))
+
+    choices = []
+    for key in CHOICE_KEYS:
+        options = node.get(key)
+        for option in options if isinstance(options, list) else []:
+            if not isinstance(option, dict):
+                continue
+            label = " ".join(extract_node_texts({k: v for k, v in option.items() if k != "next"})) or "Continue"
+            target = option.get("next")
+            if target is None or target in TERMINAL_TARGETS:
+                choices.append(f"<li>{_escape(label)}</li>\n")
+            else:
+                choices.append(f"<li><a href=\"#{anchor_prefix}-{_anchor(target)}\">{_escape(label)}</a></li>\n")
+    if choices:
+        parts.append("<ul class=\"choices\">\n" + "".join(choices) + "</ul>\n")
+    parts.append("</section>\n")
+    return "".join(parts)
+
+
+def _render_text(text: str) -> str:
+    """Plain text as paragraphs (blank lines separate paragraphs, single newlines break lines)"""
+    return "".join(
+        "<p>" + _escape(paragraph.strip()).replace("\n", "<br/>") + "</p>\n"
+        for paragraph in _PARAGRAPH_BREAK.split(text) if paragraph.strip()
+    )
+
+
+def _xhtml_page(title: str, body: str) -> str:
+    return (
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n<!DOCTYPE html>\n"
+        "<html xmlns=\"http://www.w3.org/1999/xhtml\" xmlns:epub=\"http://www.idpf.org/2007/ops\">\n"
+        f"<head>\n<title>{_escape(title)}</title>\n"
+        "<link rel=\"stylesheet\" type=\"text/css\" href=\"style.css\"/>\n</head>\n"
+        f"<body>\n{body}</body>\n</html>\n"
+    )
+
+
+def _epub_chapter_file(chapter_number: int) -> str:
+    return f"chapter-{chapter_number:04d}.xhtml"
+
+
+def _escape(text: Any) -> str:
+    return html.escape(_INVALID_XML_CHARS.sub("", str(text)))
+
+
+def _anchor(value: Any) -> str:
+    """A node id as an HTML id fragment"""
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", str(value))
+
+
+def _write_stored_entry(buffer: "_ChunkBuffer", name: str, data: bytes) -> zipfile.ZipInfo:
+    """Write an uncompressed zip entry whose local header holds its CRC and sizes (no data descriptor)"""
+    info = zipfile.ZipInfo(name)
+    info.compress_type = zipfile.ZIP_STORED
+    info.header_offset = buffer.tell()
+    info.CRC = zlib.crc32(data)
+    info.file_size = info.compress_size = len(data)
+    buffer.write(info.FileHeader())
+    buffer.write(data)
+    return info
+
+
+class _ChunkBuffer:
+    """Write-only, non-seekable sink collecting the bytes zipfile writes until drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
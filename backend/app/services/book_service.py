@@ -11,10 +11,14 @@ from app.models.comment import Comment
 from app.models.bookmark import Bookmark
 from app.models.rating import Rating
 from app.schemas.book import BookCreate, BookUpdate
+from app.core.cache import cached, invalidate_tags
+from app.services import job_service, outbox_service
+from app.services.trending_tracker import trending_tracker
 
 
+@cached("books", key="{book_id}", tags=("book:{book_id}",), model=Book)
 def get_book_by_id(db: Session, book_id: int) -> Optional[Book]:
-    """Get book by ID"""
+    """Get book by ID (cached)"""
     return db.query(Book).filter(Book.id == book_id).first()
 
 
@@ -75,43 +79,77 @@ def create_book(db: Session, book_in: BookCreate, author_id: int) -> Book:
     )
     
     db.add(db_book)
+    db.flush()
+    outbox_service.record_event(db, "book.created", db_book.id, {"book_id": db_book.id, "author_id": author_id})
     db.commit()
     db.refresh(db_book)
     return db_book
 
 
 def update_book(db: Session, book: Book, book_update: BookUpdate) -> Book:
-    """Update a book"""
+    """Update a book (replaced cover files are deleted in the background)"""
     update_data = book_update.model_dump(exclude_unset=True)
+    changed_fields = [field for field, value in update_data.items() if getattr(book, field) != value]
+    replaced_files = [
+        getattr(book, field) for field in ("cover_image_url", "thumbnail_url")
+        if field in update_data and getattr(book, field) and getattr(book, field) != update_data[field]
+    ]
     
     for field, value in update_data.items():
         setattr(book, field, value)
     
+    _enqueue_file_cleanup(db, replaced_files)
+    if changed_fields:
+        outbox_service.record_event(db, "book.updated", book.id, {
+            "book_id": book.id, "author_id": book.author_id, "fields": changed_fields
+        })
     db.commit()
+    invalidate_tags(f"book:{book.id}")
     db.refresh(book)
     return book
 
 
 def delete_book(db: Session, book: Book) -> bool:
-    """Delete a book"""
+    """
+    Delete a book (its cover files and cached exports are removed in the background)
+    Cached chapters go too, including responses prepared for scheduled releases.
+    """
+    chapter_ids = [chapter_id for (chapter_id,) in db.query(Chapter.id).filter(Chapter.book_id == book.id)]
+    _enqueue_file_cleanup(db, [book.cover_image_url, book.thumbnail_url])
+    job_service.enqueue(db, "exports.clear", {"book_id": book.id}, priority=job_service.PRIORITY_LOW)
+    outbox_service.record_event(db, "book.deleted", book.id, {"book_id": book.id, "author_id": book.author_id})
     db.delete(book)
     db.commit()
+    invalidate_tags(f"book:{book.id}", *(f"chapter:{chapter_id}" for chapter_id in chapter_ids))
     return True
 
 
+def _enqueue_file_cleanup(db: Session, file_urls: List[Optional[str]]) -> None:
+    """Queue deletion of uploaded files (kept if another book still uses them)"""
+    file_urls = [url for url in file_urls if url and url.startswith("/uploads/")]
+    if file_urls:
+        job_service.enqueue(
+            db, "files.delete_unreferenced", {"urls": file_urls}, priority=job_service.PRIORITY_LOW
+        )
+
+
 def increment_views(db: Session, book: Book) -> Book:
-    """Increment book view count"""
-    book.total_views += 1
+    """Increment book view count (cached copies are not invalidated for views)"""
+    book.total_views = Book.total_views + 1  # In SQL: the instance may be a cached copy
     db.commit()
     db.refresh(book)
+    trending_tracker.record(book.id, "views")
     return book
 
 
 def increment_likes(db: Session, book: Book) -> Book:
     """Increment book likes count"""
-    book.total_likes += 1
+    book.total_likes = Book.total_likes + 1
+    outbox_service.record_event(db, "book.liked", book.id, {"book_id": book.id})
     db.commit()
+    invalidate_tags(f"book:{book.id}")
     db.refresh(book)
+    trending_tracker.record(book.id, "likes")
     return book
 
 
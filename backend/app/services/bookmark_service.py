@@ -2,10 +2,16 @@
 Bookmark service layer - Business logic for bookmark operations
 """
 from typing import Optional, List
+from datetime import datetime, timezone
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, or_, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.models.bookmark import Bookmark
-from app.schemas.bookmark import BookmarkCreate
+from app.models.book import Book
+from app.schemas.bookmark import BookmarkCreate, BookmarkSyncItem
+from app.schemas.sync import SyncItemResult, SyncItemStatus
+from app.services.sync_service import normalize_client_timestamp, latest_item_per_book
+from app.services.trending_tracker import trending_tracker
 
 
 def get_bookmark_by_user_and_book(
@@ -44,6 +50,7 @@ def create_bookmark(db: Session, user_id: int, bookmark_in: BookmarkCreate) -> B
     db.add(db_bookmark)
     db.commit()
     db.refresh(db_bookmark)
+    trending_tracker.record(db_bookmark.book_id, "bookmarks")
     return db_bookmark
 
 
@@ -62,3 +69,121 @@ def delete_bookmark_by_book(db: Session, user_id: int, book_id: int) -> bool:
     return False
 
 
+def sync_bookmarks(
+    db: Session, user_id: int, items: List[BookmarkSyncItem]
+) -> List[SyncItemResult]:
+    """
+    Apply queued bookmark adds/removes from an offline client
+    
+    Resolves conflicts last-writer-wins per book using client timestamps
+    (compared with the stored bookmark's updated_at, naive UTC like the
+    default Base gives it). All adds go through one
+    INSERT ... ON CONFLICT DO UPDATE and all removes through one DELETE, in a
+    single transaction. Returns one result per item.
+    """
+    now = datetime.now(timezone.utc)
+    items = [
+        item.model_copy(update={
+            "client_timestamp": normalize_client_timestamp(item.client_timestamp, now)
+        })
+        for item in items
+    ]
+    latest, superseded = latest_item_per_book(items)
+    
+    results = [
+        SyncItemResult(
+            index=index,
+            book_id=items[index].book_id,
+            status=SyncItemStatus.SUPERSEDED,
+            detail="A newer toggle for this book is in the same batch"
+        )
+        for index in superseded
+    ]
+    
+    existing_books = {
+        book_id for (book_id,) in db.query(Book.id).filter(Book.id.in_(list(latest)))
+    }
+    adds = []
+    removes = []
+    for book_id, (index, item) in latest.items():
+        if book_id not in existing_books:
+            results.append(SyncItemResult(
+                index=index, book_id=book_id, status=SyncItemStatus.INVALID,
+                detail="Book not found"
+            ))
+        elif item.bookmarked:
+            adds.append((index, item))
+        else:
+            removes.append((index, item))
+    
+    written_books = set()
+    if adds:
+        stmt = pg_insert(Bookmark).values([
+            {
+                "user_id": user_id,
+                "book_id": item.book_id,
+                "created_at": item.client_timestamp,
+                "updated_at": _naive_utc(item.client_timestamp),
+            }
+            for _, item in adds
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Bookmark.user_id, Bookmark.book_id],
+            set_={"updated_at": stmt.excluded.updated_at},
+            where=Bookmark.updated_at < stmt.excluded.updated_at
+        ).returning(Bookmark.book_id)
+        written_books |= {book_id for (book_id,) in db.execute(stmt)}
+    
+    kept_books = set()
+    if removes:
+        stmt = delete(Bookmark).where(
+            Bookmark.user_id == user_id,
+            or_(*[
+                and_(
+                    Bookmark.book_id == item.book_id,
+                    Bookmark.updated_at <= _naive_utc(item.client_timestamp)
+                )
+                for _, item in removes
+            ])
+        ).execution_options(synchronize_session=False)
+        db.execute(stmt)
+        
+        # Bookmarks still present were written after the client's remove
+        remove_book_ids = [item.book_id for _, item in removes]
+        kept_books = {
+            book_id for (book_id,) in db.query(Bookmark.book_id).filter(
+                Bookmark.user_id == user_id,
+                Bookmark.book_id.in_(remove_book_ids)
+            )
+        }
+    
+    db.commit()
+    
+    for index, item in adds:
+        if item.book_id in written_books:
+            results.append(SyncItemResult(
+                index=index, book_id=item.book_id, status=SyncItemStatus.APPLIED
+            ))
+        else:
+            results.append(SyncItemResult(
+                index=index, book_id=item.book_id, status=SyncItemStatus.SUPERSEDED,
+                detail="A newer write for this bookmark is already stored"
+            ))
+    
+    for index, item in removes:
+        if item.book_id in kept_books:
+            results.append(SyncItemResult(
+                index=index, book_id=item.book_id, status=SyncItemStatus.SUPERSEDED,
+                detail="A newer write for this bookmark is already stored"
+            ))
+        else:
+            results.append(SyncItemResult(
+                index=index, book_id=item.book_id, status=SyncItemStatus.APPLIED
+            ))
+    
+    return results
+
+
+def _naive_utc(timestamp: datetime) -> datetime:
+    """Convert an aware timestamp for the naive (UTC) bookmarks.updated_at column"""
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,353 @@
+"""
+Chapter import service layer - Bulk import of chapters into a book
+
+Chapters are read one at a time from an NDJSON file (one chapter object per
+line) or a zip archive (one .json chapter object or .txt/.md text file per
+entry, in name order). Validation, word counts, graph compilation and
+revision encoding run in a pool of worker processes, batch by batch, while
+the previous batch is inserted with multi-row INSERTs.
+
+The import is all or nothing: every chapter is inserted in one transaction,
+which is rolled back if any chapter is invalid. Chapters with a publish_at
+get their release scheduled in that transaction, as when created one at a
+time. Progress is reported as a stream of events:
+    {"event": "progress", "processed": 400, "imported": 400}
+    {"event": "completed", "imported": 1500, "first_chapter_number": 1, "last_chapter_number": 1500}
+    {"event": "failed", "processed": 1500, "errors": [{"location": "line 12", "error": "..."}]}
+"""
+import json
+import logging
+import multiprocessing
+import re
+import zipfile
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from datetime import datetime
+from pathlib import PurePosixPath
+from typing import Optional, List, Dict, Any, Iterator, Tuple, IO
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.book import Book
+from app.models.chapter import Chapter
+from app.models.chapter_revision import ChapterRevision
+from app.schemas.chapter import ChapterCreate
+from app.services import chapter_service, outbox_service
+from app.services.chapter_revision_service import encode_revision_data
+
+logger = logging.getLogger(__name__)
+
+# Archive entries imported as chapters; anything else (folders, images) is skipped
+JSON_EXTENSIONS = {".json"}
+TEXT_EXTENSIONS = {".txt", ".md"}
+
+# Leading "001 - " style numbering stripped from file names used as titles
+_NUMBER_PREFIX = re.compile(r"^\d+\s*[-_.)]*\s*")
+
+# (location, chapter object or error message)
+ImportItem = Tuple[str, Any]
+
+
+class ChapterImportError(ValueError):
+    """Raised when an import file cannot be read at all"""
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> Optional[Executor]:
+    """Get the shared worker pool, or None to prepare chapters in-process"""
+    global _executor
+    if settings.IMPORT_WORKERS <= 0:
+        return None
+    if _executor is None:
+        # Spawned (not forked) workers: the server process has threads and open connections
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMPORT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Stop the worker pool (on application shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+def iter_import_items(file: IO[bytes], filename: Optional[str]) -> Iterator[ImportItem]:
+    """
+    Read chapters from an uploaded file, detecting NDJSON or zip
+
+    Raises ChapterImportError if the file is not a readable archive.
+    """
+    is_zip = zipfile.is_zipfile(file)
+    file.seek(0)
+    if is_zip or (filename or "").lower().endswith(".zip"):
+        return iter_zip_items(file)
+    return iter_ndjson_items(file)
+
+
+def iter_ndjson_items(file: IO[bytes]) -> Iterator[ImportItem]:
+    """Read one chapter object per non-empty line"""
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        location = f"line {line_number}"
+        try:
+            yield location, json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            yield location, f"Invalid JSON: {e}"
+
+
+def iter_zip_items(file: IO[bytes]) -> Iterator[ImportItem]:
+    """
+    Read chapters from a zip archive, in entry name order
+    .json entries hold a chapter object; .txt/.md entries become simple
+    chapters titled after the file name.
+    """
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile as e:
+        raise ChapterImportError(f"Invalid zip archive: {e}")
+
+    with archive:
+        entries = [
+            info for info in archive.infolist()
+            if not info.is_dir() and PurePosixPath(info.filename).suffix.lower() in JSON_EXTENSIONS | TEXT_EXTENSIONS
+            and not PurePosixPath(info.filename).name.startswith(".")
+        ]
+        if sum(info.file_size for info in entries) > settings.IMPORT_MAX_FILE_SIZE:
+            raise ChapterImportError("Archive contents exceed the maximum import size")
+
+        for info in sorted(entries, key=lambda entry: entry.filename):
+            path = PurePosixPath(info.filename)
+            location = f"entry {info.filename}"
+            try:
+                data = archive.read(info).decode("utf-8-sig")
+            except (UnicodeDecodeError, zipfile.BadZipFile) as e:
+                yield location, f"Unreadable entry: {e}"
+                continue
+
+            if path.suffix.lower() in JSON_EXTENSIONS:
+                try:
+                    yield location, json.loads(data)
+                except json.JSONDecodeError as e:
+                    yield location, f"Invalid JSON: {e}"
+            else:
+                title = _NUMBER_PREFIX.sub("", path.stem).strip() or path.stem
+                yield location, {"title": title, "content_data": {"text": data}}
+
+
+def prepare_chapter(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate a chapter and compute its derived columns (runs in a worker process)
+
+    Returns {"values": Chapter column values, "revision": keyframe data}, or
+    {"error": message} if the chapter is invalid.
+    """
+    try:
+        chapter_in = ChapterCreate.model_validate(item)
+        content_type = chapter_in.content_type
+        content_data = chapter_in.content_data
+        text_stats = chapter_service.calculate_text_stats(content_data, content_type)
+        compiled_graph = chapter_service.compile_graph(content_data, content_type)
+        asset_manifest = chapter_service.build_manifest(content_data, compiled_graph)
+    except ValidationError as e:
+        return {"error": "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error['loc'] else error['msg']
+            for error in e.errors()
+        )}
+    except ValueError as e:
+        return {"error": str(e)}
+
+    return {
+        "values": {
+            **chapter_in.model_dump(),
+            "word_count": text_stats["word_count"],
+            "character_count": text_stats["character_count"],
+            "reading_time_minutes": text_stats["reading_time_minutes"],
+            "text_stats": text_stats,
+            "compiled_graph": compiled_graph,
+            "asset_manifest": asset_manifest,
+            "published_at": datetime.utcnow() if chapter_in.is_published else None,
+        },
+        "revision": encode_revision_data(content_data),
+    }
+
+
+def prepare_chapters(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Prepare a chunk of chapters (one task per chunk keeps inter-process overhead low)"""
+    return [prepare_chapter(item) for item in items]
+
+
+def import_chapters(
+    db: Session, book_id: int, items: Iterator[ImportItem], executor: Optional[Executor] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Import chapters into a book, yielding progress events (see module docstring)
+
+    Chapters without a chapter_number are numbered after the highest existing
+    (or previously imported) chapter. The book row is locked for the whole
+    import, so concurrent imports and reorders of the book run in turn.
+    """
+    db.query(Book.id).filter(Book.id == book_id).with_for_update().first()
+    taken = {number for (number,) in db.query(Chapter.chapter_number).filter(Chapter.book_id == book_id)}
+    next_number = max(taken, default=0) + 1
+
+    errors: List[Dict[str, str]] = []
+    processed = 0
+    imported: List[int] = []
+    pending: Optional[List[Tuple[List[str], Future]]] = None
+
+    def finish_batch(batch: List[Tuple[List[str], Future]]) -> None:
+        """Collect worker results and insert the batch (unless the import already failed)"""
+        prepared = []
+        for locations, future in batch:
+            for location, result in zip(locations, future.result()):
+                if "error" in result:
+                    errors.append({"location": location, "error": result["error"]})
+                else:
+                    prepared.append(result)
+        if not errors and prepared:
+            imported.extend(_insert_prepared(db, book_id, prepared))
+
+    try:
+        for batch in _batched(items, settings.IMPORT_BATCH_SIZE):
+            valid = []
+            for location, item in batch:
+                processed += 1
+                if processed > settings.IMPORT_MAX_CHAPTERS:
+                    raise ChapterImportError(f"Imports are limited to {settings.IMPORT_MAX_CHAPTERS} chapters")
+
+                error, next_number = _check_item(item, taken, next_number)
+                if error:
+                    errors.append({"location": location, "error": error})
+                    continue
+                valid.append((location, item))
+            submitted = _submit(executor, valid)
+
+            # Workers prepare this batch while the previous one is inserted
+            if pending is not None:
+                finish_batch(pending)
+                yield {"event": "progress", "processed": processed - len(batch), "imported": len(imported)}
+            pending = submitted
+
+            if len(errors) >= settings.IMPORT_MAX_ERRORS:
+                break
+
+        if pending is not None:
+            finish_batch(pending)
+    except ChapterImportError as e:
+        errors.append({"location": "file", "error": str(e)})
+    except Exception:
+        db.rollback()
+        logger.exception("Chapter import into book %s failed", book_id)
+        yield {"event": "failed", "processed": processed, "errors": [{"location": "server", "error": "Import failed"}]}
+        return
+
+    if errors:
+        db.rollback()
+        yield {"event": "failed", "processed": processed, "errors": errors[:settings.IMPORT_MAX_ERRORS]}
+        return
+
+    if imported:
+        outbox_service.record_event(db, "book.chapters_imported", book_id, {
+            "book_id": book_id,
+            "count": len(imported),
+            "first_chapter_number": min(imported),
+            "last_chapter_number": max(imported),
+        })
+    db.commit()
+    yield {
+        "event": "completed",
+        "imported": len(imported),
+        "first_chapter_number": min(imported, default=None),
+        "last_chapter_number": max(imported, default=None),
+    }
+
+
+def _check_item(item: Any, taken: set, next_number: int) -> Tuple[Optional[str], int]:
+    """
+    Check an item's shape and claim its chapter number (in order, in this process)
+    Returns tuple of (error message or None, next free number).
+    """
+    if isinstance(item, str):
+        return item, next_number
+    if not isinstance(item, dict):
+        return "Chapter must be a JSON object", next_number
+
+    # Plain text shortcut: {"title": ..., "text": ...}
+    if "content_data" not in item and isinstance(item.get("text"), str):
+        item["content_data"] = {"text": item.pop("text")}
+
+    number = item.get("chapter_number")
+    if number is None:
+        while next_number in taken:
+            next_number += 1
+        item["chapter_number"] = number = next_number
+    elif not isinstance(number, int) or isinstance(number, bool):
+        return "chapter_number must be an integer", next_number
+
+    if number in taken:
+        return f"Chapter number {number} already exists for this book", next_number
+    taken.add(number)
+    return None, max(next_number, number + 1)
+
+
+def _submit(executor: Optional[Executor], items: List[ImportItem]) -> List[Tuple[List[str], Future]]:
+    """Prepare chapters in the pool, one chunk per worker, or right away without one"""
+    if not items:
+        return []
+    if executor is None:
+        future: Future = Future()
+        future.set_result(prepare_chapters([item for _, item in items]))
+        return [([location for location, _ in items], future)]
+
+    chunk_size = -(-len(items) // settings.IMPORT_WORKERS)
+    chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+    return [
+        ([location for location, _ in chunk], executor.submit(prepare_chapters, [item for _, item in chunk]))
+        for chunk in chunks
+    ]
+
+
+def _insert_prepared(db: Session, book_id: int, prepared: List[Dict[str, Any]]) -> List[int]:
+    """Insert prepared chapters and their first revisions, and schedule their releases; returns their chapter numbers"""
+    rows = db.execute(
+        insert(Chapter).returning(
+            Chapter.id, Chapter.chapter_number, Chapter.publish_at, sort_by_parameter_order=True
+        ),
+        [{**result["values"], "book_id": book_id, "version": 1} for result in prepared]
+    ).all()
+
+    db.execute(insert(ChapterRevision), [
+        {
+            "chapter_id": row.id,
+            "version": 1,
+            "content_type": result["values"]["content_type"],
+            "is_keyframe": True,
+            "depth": 0,
+            "data": result["revision"],
+            "word_count": result["values"]["word_count"],
+        }
+        for row, result in zip(rows, prepared)
+    ])
+    for row in rows:
+        if row.publish_at is not None:
+            chapter_service.schedule_release(db, row)
+    return [row.chapter_number for row in rows]
+
+
+def _batched(items: Iterator[ImportItem], size: int) -> Iterator[List[ImportItem]]:
+    """Group items into lists of `size`"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
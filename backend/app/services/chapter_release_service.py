@@ -0,0 +1,105 @@
+"""
+Chapter release service - Warm state ahead of scheduled chapter releases
+
+A chapter scheduled with publish_at is published by the chapters.publish_due
+job (chapter_service.publish_due_chapters). PUBLISH_PREPARE_SECONDS before
+that, the chapters.prepare_release job readies what its first readers need:
+    - derived data not stored yet (text stats, node graph, asset manifest)
+    - the book and its rating statistics, in the cache
+    - the GET /chapters/{chapter_id} response as it will be once released,
+      compressed with every supported encoding, in the shared cache until
+      PUBLISH_PAYLOAD_TTL_SECONDS after the release
+
+From the release time on, GET /chapters/{chapter_id} serves that response
+without querying the database, even if the publish job runs a little late.
+Any change to the chapter drops it (cache tag chapter:{chapter_id}).
+"""
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+from app.core.cache import get_cache_layer
+from app.core.compression import choose_encoding, compress, get_supported_encodings, mark_encoded
+from app.core.config import settings
+from app.core.responses import model_response
+from app.schemas.chapter import Chapter as ChapterSchema
+from app.services import book_service, chapter_service, rating_service
+from app.utils.chapter_assets import build_preload_header
+
+RELEASE_CACHE = "chapter_releases"
+
+
+def prepare_release(db: Session, chapter_id: int, publish_at: datetime) -> bool:
+    """
+    Warm caches and precompute the response of a chapter scheduled for publish_at
+
+    Returns:
+        False if the chapter was deleted, published or rescheduled since
+    """
+    if not settings.CACHE_ENABLED:
+        return False
+    book_id = None
+
+    def build_payload() -> Optional[dict]:
+        nonlocal book_id
+        chapter = chapter_service.get_chapter_by_id(db, chapter_id)
+        if chapter is None or chapter.is_published or chapter.publish_at != publish_at:
+            return None
+        book_id = chapter.book_id
+        chapter_service.ensure_text_stats(chapter)
+        asset_manifest = chapter_service.ensure_asset_manifest(chapter)
+        db.commit()
+        return _build_release_payload(chapter, publish_at, asset_manifest)
+
+    ttl = (publish_at - datetime.now(timezone.utc)).total_seconds() + settings.PUBLISH_PAYLOAD_TTL_SECONDS
+    payload = get_cache_layer().get_or_load(
+        RELEASE_CACHE, str(chapter_id), _tags(chapter_id), build_payload, ttl=max(ttl, 1.0)
+    )
+    if payload is None:
+        return False
+
+    if book_id is not None:
+        book_service.get_book_by_id(db, book_id)
+        rating_service.get_book_rating_stats(db, book_id)
+    return True
+
+
+def get_release_response(chapter_id: int, accept_encoding: Optional[str]) -> Optional[Response]:
+    """The prepared response of a chapter whose release time has come, or None"""
+    if not settings.CACHE_ENABLED:
+        return None
+    payload = get_cache_layer().get(RELEASE_CACHE, str(chapter_id), _tags(chapter_id))
+    if payload is None or time.time() < payload["released_at"]:
+        return None
+
+    encoding = None
+    if settings.COMPRESSION_ENABLED:
+        encoding = choose_encoding(accept_encoding, list(payload["encoded"]))
+    response = Response(
+        payload["encoded"][encoding] if encoding else payload["body"], media_type="application/json"
+    )
+    if encoding:
+        mark_encoded(response.headers, encoding)
+    if payload["link"]:
+        response.headers["Link"] = payload["link"]
+    return response
+
+
+def _build_release_payload(chapter, publish_at: datetime, asset_manifest: Optional[dict]) -> dict:
+    """The chapter's response body once published, with its compressed forms and Link header"""
+    released = {field: getattr(chapter, field, None) for field in ChapterSchema.model_fields}
+    released.update(is_published=True, published_at=publish_at, updated_at=publish_at, publish_at=None)
+    body = model_response(ChapterSchema, released).body
+
+    encoded = {}
+    if settings.COMPRESSION_ENABLED and len(body) >= settings.COMPRESSION_MIN_SIZE:
+        encoded = {encoding: compress(body, encoding) for encoding in get_supported_encodings()}
+    link = None
+    if asset_manifest:
+        link = build_preload_header(asset_manifest["assets"], settings.ASSET_PRELOAD_LIMIT)
+    return {"released_at": publish_at.timestamp(), "body": body, "encoded": encoded, "link": link}
+
+
+def _tags(chapter_id: int) -> tuple:
+    return (f"chapter:{chapter_id}",)
@@ -0,0 +1,301 @@
+"""
+Chapter revision service layer - Revision history stored as keyframes and deltas
+
+Every content save records a revision. Most revisions only store the delta
+from the previous revision; every REVISION_KEYFRAME_INTERVAL revisions the
+full content is stored as a keyframe. A version is reconstructed by seeking
+to the nearest keyframe at or before it and replaying the deltas after it,
+streaming rows from the database instead of loading the history at once.
+
+Every REVISION_COMPACT_EVERY saves of a chapter, a chapters.compact_revisions
+job compacts its history in the background: revisions older than
+REVISION_KEEP_ALL_HOURS are thinned to the last one per
+REVISION_COMPACT_BUCKET_MINUTES, and revisions older than
+REVISION_RETENTION_DAYS are deleted (the latest revision is always kept).
+"""
+import json
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Tuple, Dict, Any, Iterator
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.chapter import ContentType
+from app.models.chapter_revision import ChapterRevision
+from app.services import job_service
+from app.utils.json_patch import apply_delta, diff_documents
+
+# Revision rows fetched per round trip while replaying history
+STREAM_BATCH_SIZE = 50
+
+# Max revision ids per DELETE statement during compaction
+DELETE_BATCH_SIZE = 500
+
+
+def encode_revision_data(value: Any) -> bytes:
+    """Compress content or a delta for storage"""
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def decode_revision_data(data: bytes) -> Any:
+    """Decompress stored content or a delta"""
+    return json.loads(zlib.decompress(data))
+
+
+def record_revision(
+    db: Session,
+    chapter_id: int,
+    version: int,
+    content_type: ContentType,
+    content_data: dict,
+    word_count: int,
+    previous_content: Optional[dict] = None,
+    delta: Optional[dict] = None
+) -> ChapterRevision:
+    """
+    Record the revision for a newly saved chapter version
+    Call inside the transaction that saves the chapter; the caller commits.
+
+    Stored as a delta from the previous revision when that revision is
+    version - 1 and either the delta itself or the previous content is
+    given; otherwise (first save, gaps in history, keyframe interval
+    reached) the full content is stored.
+    """
+    previous = db.query(ChapterRevision.version, ChapterRevision.depth).filter(
+        ChapterRevision.chapter_id == chapter_id
+    ).order_by(ChapterRevision.version.desc()).first()
+
+    use_delta = (
+        previous is not None
+        and previous.version == version - 1
+        and previous.depth + 1 < settings.REVISION_KEYFRAME_INTERVAL
+        and (delta is not None or previous_content is not None)
+    )
+    if use_delta:
+        if delta is None:
+            delta = diff_documents(previous_content, content_data)
+        data = encode_revision_data(delta)
+        depth = previous.depth + 1
+    else:
+        data = encode_revision_data(content_data)
+        depth = 0
+
+    revision = ChapterRevision(
+        chapter_id=chapter_id,
+        version=version,
+        content_type=content_type,
+        is_keyframe=not use_delta,
+        depth=depth,
+        data=data,
+        word_count=word_count
+    )
+    db.add(revision)
+    db.flush()
+
+    if version % settings.REVISION_COMPACT_EVERY == 0:
+        job_service.enqueue(
+            db, "chapters.compact_revisions", {"chapter_id": chapter_id},
+            priority=job_service.PRIORITY_LOW,
+            idempotency_key=f"chapters.compact_revisions:{chapter_id}:{version}"
+        )
+
+    return revision
+
+
+def get_revisions(
+    db: Session, chapter_id: int, skip: int = 0, limit: int = 50
+) -> Tuple[List[Any], int]:
+    """
+    Get revision metadata for a chapter, newest first (without content)
+    Returns tuple of (rows, total count)
+    """
+    query = db.query(ChapterRevision).filter(ChapterRevision.chapter_id == chapter_id)
+    total = query.count()
+
+    rows = db.query(
+        ChapterRevision.version,
+        ChapterRevision.content_type,
+        ChapterRevision.is_keyframe,
+        ChapterRevision.word_count,
+        func.length(ChapterRevision.data).label("size"),
+        ChapterRevision.created_at
+    ).filter(
+        ChapterRevision.chapter_id == chapter_id
+    ).order_by(ChapterRevision.version.desc()).offset(skip).limit(limit).all()
+
+    return rows, total
+
+
+def get_revision_content(
+    db: Session, chapter_id: int, version: int
+) -> Optional[Tuple[dict, ContentType]]:
+    """
+    Reconstruct the content of a revision
+    Returns tuple of (content_data, content_type), or None if the revision is not stored.
+    """
+    for current_version, content_data, content_type in _replay(db, chapter_id, version, version):
+        if current_version == version:
+            return content_data, content_type
+    return None
+
+
+def diff_revisions(
+    db: Session, chapter_id: int, from_version: int, to_version: int
+) -> Optional[Dict[str, List[dict]]]:
+    """
+    Get the delta that turns one revision into another
+    Returns None if either revision is not stored.
+    """
+    low, high = sorted((from_version, to_version))
+    contents: Dict[int, dict] = {}
+
+    if _find_keyframe(db, chapter_id, high) <= low:
+        # Both are reached by replaying one run of deltas
+        for current_version, content_data, _ in _replay(db, chapter_id, low, high):
+            if current_version in (low, high):
+                contents[current_version] = content_data
+    else:
+        for version in (low, high):
+            revision = get_revision_content(db, chapter_id, version)
+            if revision is not None:
+                contents[version] = revision[0]
+
+    if from_version not in contents or to_version not in contents:
+        return None
+    return diff_documents(contents[from_version], contents[to_version])
+
+
+def compact_revisions(db: Session, chapter_id: int, now: Optional[datetime] = None) -> int:
+    """
+    Apply the retention policy to a chapter's revision history (the caller commits)
+
+    Deltas of revisions whose predecessor is removed are rebuilt against the
+    revision now before them, and keyframes are added where the distance to
+    the previous keyframe would exceed REVISION_KEYFRAME_INTERVAL.
+
+    Returns:
+        Number of revisions deleted
+    """
+    now = now or datetime.now(timezone.utc)
+    keep_all_after = now - timedelta(hours=settings.REVISION_KEEP_ALL_HOURS)
+    delete_before = now - timedelta(days=settings.REVISION_RETENTION_DAYS)
+    bucket_seconds = settings.REVISION_COMPACT_BUCKET_MINUTES * 60
+
+    def is_kept(row, next_row) -> bool:
+        if next_row is None:
+            return True  # Latest revision
+        created_at = _as_utc(row.created_at)
+        if created_at < delete_before:
+            return False
+        if created_at >= keep_all_after:
+            return True
+        # Keep the last revision of each time bucket
+        bucket = int(created_at.timestamp() // bucket_seconds)
+        return bucket != int(_as_utc(next_row.created_at).timestamp() // bucket_seconds)
+
+    deleted_ids: List[int] = []
+    updates: List[Dict[str, Any]] = []
+    content = None
+    kept_content = None
+    kept_depth: Optional[int] = None
+    predecessor_removed = False
+
+    rows = _stream(db, chapter_id, first_version=1)
+    row = next(rows, None)
+    while row is not None:
+        next_row = next(rows, None)
+        stored = decode_revision_data(row.data)
+        content = stored if row.is_keyframe else apply_delta(content, stored)
+
+        if not is_kept(row, next_row):
+            deleted_ids.append(row.id)
+            predecessor_removed = True
+            row = next_row
+            continue
+
+        if row.is_keyframe:
+            depth = 0
+        elif kept_depth is None or kept_depth + 1 >= settings.REVISION_KEYFRAME_INTERVAL:
+            depth = 0
+            updates.append({"id": row.id, "is_keyframe": True, "depth": 0, "data": encode_revision_data(content)})
+        else:
+            depth = kept_depth + 1
+            if predecessor_removed:
+                delta = diff_documents(kept_content, content)
+                updates.append({"id": row.id, "depth": depth, "data": encode_revision_data(delta)})
+            elif depth != row.depth:
+                updates.append({"id": row.id, "depth": depth})
+
+        kept_content = content
+        kept_depth = depth
+        predecessor_removed = False
+        row = next_row
+
+    for start in range(0, len(deleted_ids), DELETE_BATCH_SIZE):
+        db.execute(
+            delete(ChapterRevision).where(ChapterRevision.id.in_(deleted_ids[start:start + DELETE_BATCH_SIZE])),
+            execution_options={"synchronize_session": False}
+        )
+    for values in updates:
+        db.execute(
+            update(ChapterRevision).where(ChapterRevision.id == values.pop("id")).values(**values),
+            execution_options={"synchronize_session": False}
+        )
+    db.flush()
+
+    return len(deleted_ids)
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Treat naive timestamps as UTC"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _find_keyframe(db: Session, chapter_id: int, version: int) -> int:
+    """Version of the nearest keyframe at or before `version` (0 if none)"""
+    return db.query(func.max(ChapterRevision.version)).filter(
+        ChapterRevision.chapter_id == chapter_id,
+        ChapterRevision.is_keyframe == True,
+        ChapterRevision.version <= version
+    ).scalar() or 0
+
+
+def _replay(
+    db: Session, chapter_id: int, from_version: int, to_version: int
+) -> Iterator[Tuple[int, dict, ContentType]]:
+    """
+    Reconstruct stored revisions, seeking to the keyframe before from_version
+    Yields (version, content_data, content_type) up to to_version.
+    """
+    keyframe = _find_keyframe(db, chapter_id, from_version)
+    if not keyframe:
+        return
+
+    content = None
+    for row in _stream(db, chapter_id, first_version=keyframe, last_version=to_version):
+        stored = decode_revision_data(row.data)
+        content = stored if row.is_keyframe else apply_delta(content, stored)
+        yield row.version, content, row.content_type
+
+
+def _stream(
+    db: Session, chapter_id: int, first_version: int, last_version: Optional[int] = None
+) -> Iterator[Any]:
+    """Stream revision rows in version order, STREAM_BATCH_SIZE at a time"""
+    stmt = select(
+        ChapterRevision.id,
+        ChapterRevision.version,
+        ChapterRevision.content_type,
+        ChapterRevision.is_keyframe,
+        ChapterRevision.depth,
+        ChapterRevision.data,
+        ChapterRevision.created_at
+    ).where(
+        ChapterRevision.chapter_id == chapter_id,
+        ChapterRevision.version >= first_version
+    )
+    if last_version is not None:
+        stmt = stmt.where(ChapterRevision.version <= last_version)
+
+    stmt = stmt.order_by(ChapterRevision.version).execution_options(yield_per=STREAM_BATCH_SIZE)
+    return iter(db.execute(stmt))
@@ -1,14 +1,30 @@
 """
 Chapter service layer - Business logic for chapter operations
 """
-from typing import Optional, List, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
-from datetime import datetime
+from typing import Optional, List, Tuple, Dict
+from sqlalchemy.orm import Session, defer, load_only
+from sqlalchemy import and_, func, or_, select, true, update, values, column, Integer
+from datetime import datetime, timezone
 from app.models.chapter import Chapter, ContentType
 from app.models.book import Book
 from app.models.user import User
-from app.schemas.chapter import ChapterCreate, ChapterUpdate
+from app.schemas.chapter import ChapterCreate, ChapterUpdate, ChapterPatch
+from app.core.storage import FileStorage
+from app.utils.chapter_graph import compile_content_data, ChapterGraphError
+from app.utils.chapter_assets import ASSET_MANIFEST_VERSION, build_asset_manifest
+from app.utils.text_stats import compute_text_stats, TEXT_KEYS, TEXT_STATS_VERSION
+from app.utils.json_patch import apply_json_patch, apply_text_edits, parse_pointer, ChapterPatchError
+from app.core.cache import invalidate_tags
+from app.core.config import settings
+from app.services import chapter_revision_service, job_service, outbox_service
+
+
+class ChapterVersionConflict(Exception):
+    """Raised when a delta update was made against an outdated chapter version"""
+    
+    def __init__(self, current_version: int):
+        self.current_version = current_version
+        super().__init__(f"Chapter has been modified (current version is {current_version})")
 
 
 def get_chapter_by_id(db: Session, chapter_id: int) -> Optional[Chapter]:
@@ -16,6 +32,41 @@ def get_chapter_by_id(db: Session, chapter_id: int) -> Optional[Chapter]:
     return db.query(Chapter).filter(Chapter.id == chapter_id).first()
 
 
+def get_chapter_without_content(db: Session, chapter_id: int) -> Optional[Chapter]:
+    """
+    Get chapter by ID without loading content_data
+    For node-level delivery, where only the compiled graph is needed
+    """
+    return db.query(Chapter).options(
+        defer(Chapter.content_data)
+    ).filter(Chapter.id == chapter_id).first()
+
+
+def get_chapter_nodes(db: Session, chapter_id: int, positions: List[int]) -> Dict[int, dict]:
+    """
+    Get interactive nodes of a chapter by their position in content_data["nodes"]
+    
+    The nodes are picked out inside PostgreSQL, so only the requested nodes
+    are sent to the application instead of the whole content_data document.
+    Returns dict of {position: node}.
+    """
+    if not positions:
+        return {}
+    
+    elements = func.json_array_elements(
+        Chapter.content_data["nodes"]
+    ).table_valued("value", with_ordinality="ordinality").render_derived(name="node")
+    
+    stmt = select(elements.c.ordinality, elements.c.value).select_from(Chapter).join(
+        elements, true()
+    ).where(
+        Chapter.id == chapter_id,
+        elements.c.ordinality.in_([position + 1 for position in positions])  # 1-based
+    )
+    
+    return {ordinality - 1: node for ordinality, node in db.execute(stmt)}
+
+
 def get_chapters_by_book(
     db: Session,
     book_id: int,
@@ -33,10 +84,25 @@ def get_chapters_by_book(
     return query.order_by(Chapter.chapter_number).all()
 
 
+def chapter_number_exists(
+    db: Session, book_id: int, chapter_number: int, exclude_chapter_id: Optional[int] = None
+) -> bool:
+    """Check if a book already has a chapter with this number"""
+    query = db.query(Chapter.id).filter(
+        Chapter.book_id == book_id,
+        Chapter.chapter_number == chapter_number
+    )
+    if exclude_chapter_id is not None:
+        query = query.filter(Chapter.id != exclude_chapter_id)
+    return db.query(query.exists()).scalar()
+
+
 def create_chapter(db: Session, chapter_in: ChapterCreate, book_id: int) -> Chapter:
     """Create a new chapter"""
-    # Calculate word count
-    word_count = calculate_word_count(chapter_in.content_data, chapter_in.content_type)
+    # Calculate word count, character count and reading time
+    text_stats = calculate_text_stats(chapter_in.content_data, chapter_in.content_type)
+    compiled_graph = compile_graph(chapter_in.content_data, chapter_in.content_type)
+    asset_manifest = build_manifest(chapter_in.content_data, compiled_graph)
     
     # Set published_at if chapter is published
     published_at = None
@@ -46,25 +112,56 @@ def create_chapter(db: Session, chapter_in: ChapterCreate, book_id: int) -> Chap
     db_chapter = Chapter(
         **chapter_in.model_dump(),
         book_id=book_id,
-        word_count=word_count,
+        word_count=text_stats['word_count'],
+        character_count=text_stats['character_count'],
+        reading_time_minutes=text_stats['reading_time_minutes'],
+        text_stats=text_stats,
+        compiled_graph=compiled_graph,
+        asset_manifest=asset_manifest,
         published_at=published_at
     )
     
     db.add(db_chapter)
+    db.flush()
+    
+    # First revision: a keyframe with the initial content
+    chapter_revision_service.record_revision(
+        db, db_chapter.id, db_chapter.version, db_chapter.content_type,
+        db_chapter.content_data, db_chapter.word_count
+    )
+    _record_chapter_event(db, "chapter.created", db_chapter)
+    if db_chapter.publish_at is not None:
+        schedule_release(db, db_chapter)
+    
     db.commit()
     db.refresh(db_chapter)
     return db_chapter
 
 
 def update_chapter(db: Session, chapter: Chapter, chapter_update: ChapterUpdate) -> Chapter:
-    """Update a chapter"""
+    """
+    Update a chapter
+    Raises ChapterGraphError (a ValueError) if interactive content is invalid
+    """
     update_data = chapter_update.model_dump(exclude_unset=True)
+    content_changed = 'content_data' in update_data or 'content_type' in update_data
     
-    # If content is updated, recalculate word count
-    if 'content_data' in update_data or 'content_type' in update_data:
+    # If content is updated, recompile the node graph and asset manifest and recalculate text stats
+    if content_changed:
+        # Lock the row so concurrent saves get consecutive versions
+        db.refresh(chapter, with_for_update=True)
+        previous_content = chapter.content_data
         content_data = update_data.get('content_data', chapter.content_data)
         content_type = update_data.get('content_type', chapter.content_type)
-        update_data['word_count'] = calculate_word_count(content_data, content_type)
+        update_data['compiled_graph'] = compile_graph(content_data, content_type)
+        update_data['asset_manifest'] = build_manifest(content_data, update_data['compiled_graph'])
+        # Only nodes whose text changed since the last save are recounted
+        text_stats = calculate_text_stats(content_data, content_type, previous=chapter.text_stats)
+        update_data['text_stats'] = text_stats
+        update_data['word_count'] = text_stats['word_count']
+        update_data['character_count'] = text_stats['character_count']
+        update_data['reading_time_minutes'] = text_stats['reading_time_minutes']
+        update_data['version'] = chapter.version + 1
     
     # If is_published is being set to True and wasn't published before, set published_at
     if 'is_published' in update_data and update_data['is_published'] and not chapter.is_published:
@@ -74,18 +171,152 @@ def update_chapter(db: Session, chapter: Chapter, chapter_update: ChapterUpdate)
     if 'is_published' in update_data and not update_data['is_published'] and chapter.is_published:
         update_data['published_at'] = None
     
+    # Publishing cancels a scheduled release; only unpublished chapters can be scheduled
+    if update_data.get('is_published'):
+        update_data['publish_at'] = None
+    elif update_data.get('publish_at') is not None and chapter.is_published and 'is_published' not in update_data:
+        raise ValueError("Unpublish the chapter before scheduling its release")
+    rescheduled = update_data.get('publish_at') is not None and update_data['publish_at'] != chapter.publish_at
+    
+    changed_fields = [
+        field for field in chapter_update.model_dump(exclude_unset=True)
+        if getattr(chapter, field) != update_data[field]
+    ]
+    
     for field, value in update_data.items():
         setattr(chapter, field, value)
     
+    if content_changed:
+        chapter_revision_service.record_revision(
+            db, chapter.id, chapter.version, chapter.content_type,
+            chapter.content_data, chapter.word_count, previous_content=previous_content
+        )
+    if changed_fields:
+        _record_chapter_event(db, "chapter.updated", chapter, fields=changed_fields)
+    if rescheduled:
+        schedule_release(db, chapter)
+    
     db.commit()
+    invalidate_tags(f"chapter:{chapter.id}")
     db.refresh(chapter)
     return chapter
 
 
+def patch_chapter(db: Session, chapter: Chapter, patch: ChapterPatch) -> dict:
+    """
+    Apply a delta update (JSON Patch operations, then text edits) to a chapter's content
+    
+    The write is conditional on the chapter still being at patch.base_version,
+    so concurrent saves cannot overwrite each other. The node graph and asset
+    manifest are only rebuilt if the patch changes more than text, and only
+    text that changed is recounted.
+    
+    Raises ChapterVersionConflict if the chapter has been saved since
+    base_version, and ValueError (ChapterPatchError, ChapterGraphError) if
+    the patch does not apply or leaves invalid content.
+    
+    Returns dict with the new version and text stats (the content is not reloaded).
+    """
+    if chapter.version != patch.base_version:
+        raise ChapterVersionConflict(chapter.version)
+    
+    operations = [operation.model_dump(by_alias=True, exclude_unset=True) for operation in patch.operations]
+    text_edits = [edit.model_dump() for edit in patch.text_edits]
+    
+    content_data = apply_json_patch(chapter.content_data, operations)
+    content_data = apply_text_edits(content_data, text_edits)
+    check_content_structure(content_data, chapter.content_type)
+    
+    text_stats = calculate_text_stats(content_data, chapter.content_type, previous=chapter.text_stats)
+    values = {
+        'content_data': content_data,
+        'text_stats': text_stats,
+        'word_count': text_stats['word_count'],
+        'character_count': text_stats['character_count'],
+        'reading_time_minutes': text_stats['reading_time_minutes'],
+        'version': Chapter.version + 1,
+    }
+    if not is_text_only_patch(operations, text_edits):
+        values['compiled_graph'] = compile_graph(content_data, chapter.content_type)
+        values['asset_manifest'] = build_manifest(content_data, values['compiled_graph'])
+    
+    row = db.execute(
+        update(Chapter)
+        .where(Chapter.id == chapter.id, Chapter.version == patch.base_version)
+        .values(**values)
+        .returning(Chapter.version, Chapter.updated_at)
+        .execution_options(synchronize_session=False)
+    ).first()
+    
+    if row is None:
+        # Saved by another request since the chapter was loaded
+        db.rollback()
+        current_version = db.query(Chapter.version).filter(Chapter.id == chapter.id).scalar()
+        raise ChapterVersionConflict(current_version)
+    
+    # The client's edits are already a delta from base_version
+    chapter_revision_service.record_revision(
+        db, chapter.id, row.version, chapter.content_type, content_data,
+        text_stats['word_count'], delta={'operations': operations, 'text_edits': text_edits}
+    )
+    _record_chapter_event(db, "chapter.updated", chapter, fields=['content_data'], version=row.version)
+    
+    db.commit()
+    invalidate_tags(f"chapter:{chapter.id}")
+    return {
+        'id': chapter.id,
+        'version': row.version,
+        'word_count': text_stats['word_count'],
+        'character_count': text_stats['character_count'],
+        'reading_time_minutes': text_stats['reading_time_minutes'],
+        'updated_at': row.updated_at,
+    }
+
+
+def is_text_only_patch(operations: List[dict], text_edits: List[dict]) -> bool:
+    """
+    Check if a patch only changes reader-visible text (no ids, links or assets),
+    in which case the compiled graph and asset manifest stay valid
+    """
+    for operation in operations:
+        if operation['op'] == 'test':
+            continue
+        if operation['op'] not in ('add', 'remove', 'replace'):
+            return False
+        tokens = parse_pointer(operation['path'])
+        if len(tokens) < 2 or tokens[-1] not in TEXT_KEYS:
+            return False
+        if operation['op'] != 'remove' and isinstance(operation.get('value'), (dict, list)):
+            return False
+    
+    for edit in text_edits:
+        tokens = parse_pointer(edit['path'])
+        if not tokens or tokens[-1] not in TEXT_KEYS:
+            return False
+    
+    return True
+
+
+def check_content_structure(content_data: dict, content_type: ContentType) -> None:
+    """
+    Check the top-level structure of content_data (as validated on creation)
+    Raises ChapterPatchError (a ValueError) if it is invalid
+    """
+    if not isinstance(content_data, dict) or not content_data:
+        raise ChapterPatchError("content_data must be a non-empty object")
+    
+    if content_type == ContentType.SIMPLE and not isinstance(content_data.get('text'), str):
+        raise ChapterPatchError("Simple chapters must have a string 'text' field in content_data")
+    if content_type == ContentType.INTERACTIVE and not isinstance(content_data.get('nodes'), list):
+        raise ChapterPatchError("Interactive chapters must have a 'nodes' list in content_data")
+
+
 def delete_chapter(db: Session, chapter: Chapter) -> bool:
     """Delete a chapter"""
+    _record_chapter_event(db, "chapter.deleted", chapter)
     db.delete(chapter)
     db.commit()
+    invalidate_tags(f"chapter:{chapter.id}")
     return True
 
 
@@ -93,76 +324,387 @@ def reorder_chapters(db: Session, book_id: int, chapter_id: int, new_chapter_num
     """
     Reorder chapters within a book
     Moves chapter to new position and adjusts other chapter numbers accordingly
+    Returns chapter summaries in the new order, or [] if the move is invalid
     """
-    # Get the chapter to move
-    chapter = db.query(Chapter).filter(
-        Chapter.id == chapter_id,
-        Chapter.book_id == book_id
-    ).first()
-    
-    if not chapter:
+    try:
+        move_chapters(db, book_id, [(chapter_id, new_chapter_number)])
+    except ValueError:
+        db.rollback()
         return []
     
-    old_number = chapter.chapter_number
+    return get_chapter_summaries(db, book_id)
+
+
+def move_chapters(db: Session, book_id: int, moves: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Apply chapter moves in order, all or nothing
     
-    # Get all chapters for this book
-    all_chapters = db.query(Chapter).filter(
-        Chapter.book_id == book_id
-    ).order_by(Chapter.chapter_number).all()
+    Each move gives a chapter a new chapter_number; the chapters numbered
+    between its old and new number shift by one to make room (a free number
+    is just taken). Only the chapters in the range spanned by the moves are
+    read, and only the ones whose number changes are written, with two
+    set-based UPDATEs.
     
-    # Validate new_chapter_number
-    if new_chapter_number < 1 or new_chapter_number > len(all_chapters):
-        return []
+    Args:
+        moves: (chapter_id, new_chapter_number) pairs
     
-    if old_number == new_chapter_number:
-        # No change needed
-        return all_chapters
+    Raises:
+        ValueError: If a chapter is not in the book or a number is out of range
     
-    # Remove chapter from list
-    all_chapters.remove(chapter)
+    Returns:
+        (chapter_id, chapter_number) of every chapter whose number changed
+    """
+    # Serialize reorders of the same book
+    db.query(Book.id).filter(Book.id == book_id).with_for_update().first()
     
-    # Insert at new position (new_chapter_number is 1-indexed)
-    all_chapters.insert(new_chapter_number - 1, chapter)
+    moved_ids = {chapter_id for chapter_id, _ in moves}
+    current = dict(db.query(Chapter.id, Chapter.chapter_number).filter(
+        Chapter.book_id == book_id,
+        Chapter.id.in_(moved_ids)
+    ).all())
+    missing = moved_ids - current.keys()
+    if missing:
+        raise ValueError(f"Chapter {min(missing)} not found in this book")
     
-    # To avoid unique constraint violations, first set all chapter_numbers to negative values
-    for idx, chap in enumerate(all_chapters, start=1):
-        chap.chapter_number = -(idx + 1000)  # Use negative numbers temporarily
+    max_number = db.query(func.max(Chapter.chapter_number)).filter(
+        Chapter.book_id == book_id
+    ).scalar() or 0
+    for chapter_id, new_number in moves:
+        if new_number < 1 or new_number > max_number:
+            raise ValueError(f"Chapter number {new_number} is out of range (1-{max_number})")
     
-    db.flush()  # Flush the negative numbers
+    numbers = list(current.values()) + [new_number for _, new_number in moves]
+    slots = dict(db.query(Chapter.chapter_number, Chapter.id).filter(
+        Chapter.book_id == book_id,
+        Chapter.chapter_number.between(min(numbers), max(numbers))
+    ).all())  # chapter_number -> chapter_id
+    original = {chapter_id: number for number, chapter_id in slots.items()}
+    positions = dict(original)
     
-    # Now set the correct chapter_numbers
-    for idx, chap in enumerate(all_chapters, start=1):
-        chap.chapter_number = idx
+    for chapter_id, new_number in moves:
+        old_number = positions[chapter_id]
+        if old_number == new_number:
+            continue
+        
+        if new_number not in slots:
+            del slots[old_number]
+            slots[new_number] = chapter_id
+            positions[chapter_id] = new_number
+            continue
+        
+        # Rotate the chapters between the old and new number by one
+        low, high = sorted((old_number, new_number))
+        affected = sorted(number for number in slots if low <= number <= high)
+        chapter_ids = [slots[number] for number in affected]
+        if old_number < new_number:
+            chapter_ids = chapter_ids[1:] + chapter_ids[:1]
+        else:
+            chapter_ids = chapter_ids[-1:] + chapter_ids[:-1]
+        for number, moved_id in zip(affected, chapter_ids):
+            slots[number] = moved_id
+            positions[moved_id] = number
     
+    changes = [
+        (chapter_id, number) for chapter_id, number in positions.items()
+        if original[chapter_id] != number
+    ]
+    set_chapter_numbers(db, changes)
+    if changes:
+        outbox_service.record_event(db, "book.chapters_reordered", book_id, {
+            "book_id": book_id, "changes": [list(change) for change in changes]
+        })
     db.commit()
+    invalidate_tags(*(f"chapter:{chapter_id}" for chapter_id, _ in changes))
+    return changes
+
+
+def set_chapter_numbers(db: Session, changes: List[Tuple[int, int]]) -> None:
+    """
+    Write new chapter numbers with two statements, whatever the number of changes
+    The new numbers must be a permutation of the old ones (the caller commits).
+    """
+    if not changes:
+        return
+    
+    # Park the changed rows on negative numbers first so the unique
+    # (book_id, chapter_number) constraint holds after every row update
+    db.execute(
+        update(Chapter)
+        .where(Chapter.id.in_([chapter_id for chapter_id, _ in changes]))
+        .values(chapter_number=-Chapter.chapter_number),
+        execution_options={"synchronize_session": False}
+    )
+    
+    new_numbers = values(
+        column("id", Integer), column("chapter_number", Integer), name="new_numbers"
+    ).data(changes)
+    db.execute(
+        update(Chapter)
+        .where(Chapter.id == new_numbers.c.id)
+        .values(chapter_number=new_numbers.c.chapter_number),
+        execution_options={"synchronize_session": False}
+    )
+
+
+def get_chapter_summaries(db: Session, book_id: int, published_only: bool = False) -> List[Chapter]:
+    """
+    Get all chapters of a book ordered by chapter_number, without content
+    Only the columns of ChapterSummary are loaded.
+    """
+    query = db.query(Chapter).options(
+        load_only(
+            Chapter.id, Chapter.book_id, Chapter.chapter_number, Chapter.title,
+            Chapter.content_type, Chapter.word_count, Chapter.character_count,
+            Chapter.reading_time_minutes, Chapter.is_published, Chapter.published_at,
+            Chapter.publish_at, Chapter.created_at, Chapter.updated_at
+        )
+    ).filter(Chapter.book_id == book_id)
     
-    # Refresh all chapters
-    for chap in all_chapters:
-        db.refresh(chap)
+    if published_only:
+        query = query.filter(Chapter.is_published == True)
     
-    return all_chapters
+    return query.order_by(Chapter.chapter_number).all()
+
+
+def calculate_text_stats(
+    content_data: dict, content_type: ContentType, previous: Optional[dict] = None
+) -> dict:
+    """
+    Calculate word count, character count, reading time and per-node counts
+    Counts cached in `previous` (the chapter's stored text_stats) are reused for unchanged text.
+    """
+    return compute_text_stats(
+        content_data,
+        interactive=content_type == ContentType.INTERACTIVE,
+        words_per_minute=settings.READING_WORDS_PER_MINUTE,
+        previous=previous
+    )
 
 
 def calculate_word_count(content_data: dict, content_type: ContentType) -> int:
-    """Calculate word count from content_data"""
-    if content_type == ContentType.SIMPLE:
-        text = content_data.get('text', '')
-        return len(text.split())
-    elif content_type == ContentType.INTERACTIVE:
-        # For interactive content, count words in all text nodes
-        total_words = 0
-        nodes = content_data.get('nodes', [])
-        for node in nodes:
-            if isinstance(node, dict):
-                # Count words in various text fields
-                if 'text' in node:
-                    total_words += len(str(node['text']).split())
-                if 'content' in node:
-                    total_words += len(str(node['content']).split())
-                if 'dialogue' in node:
-                    total_words += len(str(node['dialogue']).split())
-        return total_words
-    return 0
+    """Calculate word count from content_data (counted by the text stats engine)"""
+    return calculate_text_stats(content_data, content_type)['word_count']
+
+
+def has_current_text_stats(chapter: Chapter) -> bool:
+    """Whether a chapter's stored text stats were counted the way calculate_text_stats counts now"""
+    return chapter.text_stats is not None and chapter.text_stats.get('version') == TEXT_STATS_VERSION
+
+
+def get_text_stats(chapter: Chapter) -> dict:
+    """
+    Get a chapter's text stats without storing anything
+    
+    Stats of chapters saved before per-node stats were kept, or counted by an
+    earlier TEXT_STATS_VERSION, are calculated on the fly until
+    backfill_text_stats has stored theirs.
+    """
+    if has_current_text_stats(chapter):
+        return chapter.text_stats
+    return calculate_text_stats(chapter.content_data, chapter.content_type, previous=chapter.text_stats)
+
+
+def ensure_text_stats(chapter: Chapter) -> dict:
+    """Store the current text stats and counts of a chapter missing them (the caller commits)"""
+    if has_current_text_stats(chapter):
+        return chapter.text_stats
+    
+    text_stats = get_text_stats(chapter)
+    chapter.text_stats = text_stats
+    chapter.word_count = text_stats['word_count']
+    chapter.character_count = text_stats['character_count']
+    chapter.reading_time_minutes = text_stats['reading_time_minutes']
+    return text_stats
+
+
+def backfill_text_stats(db: Session, after_id: int = 0) -> Optional[int]:
+    """
+    Store the current text stats of up to CHAPTER_BACKFILL_BATCH_SIZE chapters
+    missing them, after chapter after_id (commits)
+    
+    Cached chapters are dropped, as their word counts and reading times may change.
+    
+    Returns:
+        ID of the last chapter of a full batch (more may follow), else None
+    """
+    chapters = db.query(Chapter).filter(
+        Chapter.id > after_id,
+        or_(
+            Chapter.text_stats.is_(None),
+            Chapter.text_stats['version'].as_integer().is_distinct_from(TEXT_STATS_VERSION)
+        )
+    ).order_by(Chapter.id).limit(settings.CHAPTER_BACKFILL_BATCH_SIZE).all()
+    
+    for chapter in chapters:
+        ensure_text_stats(chapter)
+    db.commit()
+    if chapters:
+        invalidate_tags(*(f"chapter:{chapter.id}" for chapter in chapters))
+    
+    if len(chapters) < settings.CHAPTER_BACKFILL_BATCH_SIZE:
+        return None
+    return chapters[-1].id
+
+
+def compile_graph(content_data: dict, content_type: ContentType) -> Optional[dict]:
+    """
+    Compile the node graph of an interactive chapter (None for simple chapters)
+    Raises ChapterGraphError if ids or next/choice targets are invalid
+    """
+    if content_type != ContentType.INTERACTIVE:
+        return None
+    return compile_content_data(content_data)
+
+
+def get_compiled_graph(chapter: Chapter) -> Optional[dict]:
+    """
+    Get a chapter's compiled graph without storing anything
+    
+    Chapters saved before graphs were compiled are compiled on the fly until
+    backfill_chapter_assets has stored theirs. Returns None for simple
+    chapters and invalid graphs.
+    """
+    if chapter.compiled_graph is not None or chapter.content_type != ContentType.INTERACTIVE:
+        return chapter.compiled_graph
+    if chapter.asset_manifest is not None:
+        return None  # Backfilled with an empty manifest: no valid graph
+    
+    try:
+        return compile_graph(chapter.content_data, chapter.content_type)
+    except ChapterGraphError:
+        return None
+
+
+def build_manifest(content_data: dict, compiled_graph: Optional[dict]) -> Optional[dict]:
+    """Build the asset manifest of an interactive chapter, with sizes of uploaded files"""
+    if compiled_graph is None:
+        return None
+    return build_asset_manifest(
+        content_data["nodes"], compiled_graph, FileStorage.get_file_size
+    )
+
+
+def get_asset_manifest(chapter: Chapter) -> Optional[dict]:
+    """
+    Get a chapter's asset manifest without storing anything (built on the fly
+    for chapters not backfilled yet). Returns None for simple chapters.
+    """
+    if chapter.asset_manifest is not None:
+        return chapter.asset_manifest
+    
+    compiled_graph = get_compiled_graph(chapter)
+    if compiled_graph is None:
+        return None
+    return build_manifest(chapter.content_data, compiled_graph)
+
+
+def ensure_asset_manifest(chapter: Chapter) -> Optional[dict]:
+    """
+    Store the compiled graph and asset manifest of a chapter saved before
+    they were kept (the caller commits). Returns None for simple chapters.
+    
+    Content without a valid graph gets an empty manifest, so that neither
+    the backfill nor readers compile it again.
+    """
+    if chapter.asset_manifest is not None or chapter.content_type != ContentType.INTERACTIVE:
+        return chapter.asset_manifest
+    
+    try:
+        chapter.compiled_graph = compile_graph(chapter.content_data, chapter.content_type)
+    except ChapterGraphError:
+        pass
+    
+    if chapter.compiled_graph is None:
+        chapter.asset_manifest = {"version": ASSET_MANIFEST_VERSION, "total_size": 0, "assets": []}
+    else:
+        chapter.asset_manifest = build_manifest(chapter.content_data, chapter.compiled_graph)
+    return chapter.asset_manifest
+
+
+def backfill_chapter_assets(db: Session, after_id: int = 0) -> Optional[int]:
+    """
+    Store the graphs and asset manifests of up to CHAPTER_BACKFILL_BATCH_SIZE
+    interactive chapters missing them, after chapter after_id (commits)
+    
+    Returns:
+        ID of the last chapter of a full batch (more may follow), else None
+    """
+    chapters = db.query(Chapter).filter(
+        Chapter.id > after_id,
+        Chapter.content_type == ContentType.INTERACTIVE,
+        Chapter.asset_manifest.is_(None)
+    ).order_by(Chapter.id).limit(settings.CHAPTER_BACKFILL_BATCH_SIZE).all()
+    
+    for chapter in chapters:
+        ensure_asset_manifest(chapter)
+    db.commit()
+    
+    if len(chapters) < settings.CHAPTER_BACKFILL_BATCH_SIZE:
+        return None
+    return chapters[-1].id
+
+
+def schedule_release(db: Session, chapter: Chapter) -> None:
+    """
+    Enqueue the jobs releasing a chapter at its publish_at (the caller commits)
+    
+    The release pipeline (chapters.prepare_release) runs PUBLISH_PREPARE_SECONDS
+    ahead; chapters.publish_due then publishes every chapter due at that time.
+    Jobs of an earlier schedule still run but find nothing to do.
+    """
+    release_time = int(chapter.publish_at.timestamp())
+    delay_seconds = (chapter.publish_at - datetime.now(timezone.utc)).total_seconds()
+    job_service.enqueue(
+        db, "chapters.prepare_release",
+        {"chapter_id": chapter.id, "publish_at": chapter.publish_at.isoformat()},
+        delay_seconds=max(delay_seconds - settings.PUBLISH_PREPARE_SECONDS, 0),
+        idempotency_key=f"chapters.prepare_release:{chapter.id}:{release_time}"
+    )
+    job_service.enqueue(
+        db, "chapters.publish_due", {},
+        priority=job_service.PRIORITY_HIGH,
+        delay_seconds=max(delay_seconds, 0),
+        idempotency_key=f"chapters.publish_due:{release_time}"
+    )
+
+
+def publish_due_chapters(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Publish the chapters whose publish_at has come, PUBLISH_BATCH_SIZE per transaction (commits)
+    
+    A released chapter's published_at and updated_at are its publish_at, so
+    the response prepared ahead of the release is byte-identical. Its book's
+    updated_at is bumped and the cached book dropped.
+    
+    Returns:
+        Number of chapters published
+    """
+    now = now or datetime.now(timezone.utc)
+    published = 0
+    while True:
+        chapters = db.query(Chapter).options(
+            load_only(Chapter.id, Chapter.book_id, Chapter.chapter_number, Chapter.version,
+                      Chapter.is_published, Chapter.publish_at)
+        ).filter(
+            Chapter.publish_at <= now, Chapter.is_published == False
+        ).order_by(Chapter.publish_at).limit(settings.PUBLISH_BATCH_SIZE).with_for_update(skip_locked=True).all()
+        if not chapters:
+            return published
+        
+        for chapter in chapters:
+            chapter.is_published = True
+            chapter.published_at = chapter.publish_at
+            chapter.updated_at = chapter.publish_at
+            chapter.publish_at = None
+            _record_chapter_event(db, "chapter.updated", chapter, fields=['is_published', 'publish_at'])
+        book_ids = sorted({chapter.book_id for chapter in chapters})
+        db.execute(
+            update(Book).where(Book.id.in_(book_ids)).values(updated_at=datetime.utcnow()),
+            execution_options={"synchronize_session": False}
+        )
+        db.commit()
+        invalidate_tags(*(f"book:{book_id}" for book_id in book_ids))
+        published += len(chapters)
 
 
 def get_book_by_chapter(db: Session, chapter_id: int) -> Optional[Book]:
@@ -189,3 +731,19 @@ def get_next_chapter_number(db: Session, book_id: int) -> int:
     
     return (max_number or 0) + 1
 
+
+
+def _record_chapter_event(
+    db: Session, event_type: str, chapter: Chapter, fields: Optional[List[str]] = None, version: Optional[int] = None
+) -> None:
+    """Add a chapter change event to the outbox"""
+    payload = {
+        'chapter_id': chapter.id,
+        'book_id': chapter.book_id,
+        'chapter_number': chapter.chapter_number,
+        'version': version or chapter.version,
+        'is_published': chapter.is_published,
+    }
+    if fields is not None:
+        payload['fields'] = fields
+    outbox_service.record_event(db, event_type, chapter.id, payload)
@@ -7,10 +7,12 @@ from sqlalchemy import and_, or_, func
 from app.models.chapter_template import ChapterTemplate
 from app.models.user import User
 from app.schemas.chapter_template import ChapterTemplateCreate, ChapterTemplateUpdate
+from app.core.cache import cached, invalidate_tags
 
 
+@cached("templates", key="{template_id}", tags=("template:{template_id}",), model=ChapterTemplate)
 def get_template_by_id(db: Session, template_id: int) -> Optional[ChapterTemplate]:
-    """Get chapter template by ID"""
+    """Get chapter template by ID (cached)"""
     return db.query(ChapterTemplate).filter(ChapterTemplate.id == template_id).first()
 
 
@@ -99,11 +101,12 @@ def get_public_templates(
     return get_templates(db, skip=skip, limit=limit, public_only=True, search_query=search_query)
 
 
+@cached("templates", key="popular:{limit}", tags=("templates:popular",), model=ChapterTemplate)
 def get_popular_templates(
     db: Session,
     limit: int = 10
 ) -> List[ChapterTemplate]:
-    """Get most popular public templates (by usage count)"""
+    """Get most popular public templates (by usage count, cached)"""
     return db.query(ChapterTemplate).filter(
         ChapterTemplate.is_public == True
     ).order_by(
@@ -120,6 +123,8 @@ def create_template(db: Session, template_in: ChapterTemplateCreate, user_id: in
     
     db.add(db_template)
     db.commit()
+    if db_template.is_public:
+        invalidate_tags("templates:popular")
     db.refresh(db_template)
     return db_template
 
@@ -136,6 +141,7 @@ def update_template(
         setattr(template, field, value)
     
     db.commit()
+    invalidate_tags(f"template:{template.id}", "templates:popular")
     db.refresh(template)
     return template
 
@@ -144,13 +150,15 @@ def delete_template(db: Session, template: ChapterTemplate) -> bool:
     """Delete a chapter template"""
     db.delete(template)
     db.commit()
+    invalidate_tags(f"template:{template.id}", "templates:popular")
     return True
 
 
 def increment_usage_count(db: Session, template: ChapterTemplate) -> ChapterTemplate:
     """Increment the usage count of a template"""
-    template.usage_count += 1
+    template.usage_count = ChapterTemplate.usage_count + 1  # In SQL: the instance may be a cached copy
     db.commit()
+    invalidate_tags(f"template:{template.id}", "templates:popular")
     db.refresh(template)
     return template
 
@@ -3,8 +3,11 @@ Comment service layer - Business logic for comment operations
 """
 from typing import Optional, List
 from sqlalchemy.orm import Session, joinedload
+from app.models.chapter import Chapter
 from app.models.comment import Comment
 from app.schemas.comment import CommentCreate, CommentUpdate
+from app.services import outbox_service
+from app.services.trending_tracker import trending_tracker
 
 
 def get_comment_by_id(db: Session, comment_id: int) -> Optional[Comment]:
@@ -46,14 +49,20 @@ def create_comment(db: Session, user_id: int, comment_in: CommentCreate) -> Comm
     )
     
     db.add(db_comment)
+    db.flush()
+    _record_comment_event(db, "comment.created", db_comment)
+    book_id = db.query(Chapter.book_id).filter(Chapter.id == db_comment.chapter_id).scalar()
     db.commit()
     db.refresh(db_comment)
+    if book_id is not None:
+        trending_tracker.record(book_id, "comments")
     return db_comment
 
 
 def update_comment(db: Session, comment: Comment, comment_update: CommentUpdate) -> Comment:
     """Update a comment"""
     comment.content = comment_update.content
+    _record_comment_event(db, "comment.updated", comment)
     db.commit()
     db.refresh(comment)
     return comment
@@ -61,6 +70,7 @@ def update_comment(db: Session, comment: Comment, comment_update: CommentUpdate)
 
 def delete_comment(db: Session, comment: Comment) -> bool:
     """Delete a comment (and all its replies via cascade)"""
+    _record_comment_event(db, "comment.deleted", comment)
     db.delete(comment)
     db.commit()
     return True
@@ -71,3 +81,11 @@ def get_chapter_comments_count(db: Session, chapter_id: int) -> int:
     return db.query(Comment).filter(Comment.chapter_id == chapter_id).count()
 
 
+def _record_comment_event(db: Session, event_type: str, comment: Comment) -> None:
+    """Add a comment change event to the outbox"""
+    outbox_service.record_event(db, event_type, comment.id, {
+        "comment_id": comment.id,
+        "chapter_id": comment.chapter_id,
+        "user_id": comment.user_id,
+        "parent_comment_id": comment.parent_comment_id,
+    })
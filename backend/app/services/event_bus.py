@@ -0,0 +1,49 @@
+"""
+In-process event bus - Delivers change events to subscribers in this process
+
+Handlers subscribe to event types by glob pattern ("chapter.*", "*") and are
+called in log order from the outbox relay thread, so they should be quick
+(enqueue a job for slow work). A failing handler is logged and skipped.
+"""
+import fnmatch
+import logging
+import threading
+from typing import Callable, Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[Dict[str, Any]], None]
+
+
+class EventBus:
+    """Publish/subscribe dispatcher for change events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: List[Tuple[str, EventHandler]] = []
+
+    def subscribe(self, pattern: str, handler: EventHandler) -> None:
+        """Call handler for every event whose type matches the glob pattern"""
+        with self._lock:
+            self._subscriptions.append((pattern, handler))
+
+    def unsubscribe(self, handler: EventHandler) -> None:
+        """Remove every subscription of a handler"""
+        with self._lock:
+            self._subscriptions = [(pattern, h) for pattern, h in self._subscriptions if h is not handler]
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """Deliver an event to the matching handlers, in subscription order"""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for pattern, handler in subscriptions:
+            if not fnmatch.fnmatchcase(event["type"], pattern):
+                continue
+            try:
+                handler(event)
+            except Exception:
+                logger.exception("Event handler %r failed on event %s", handler, event.get("offset"))
+
+
+# Process-wide bus instance
+event_bus = EventBus()
@@ -0,0 +1,289 @@
+"""
+Job service layer - Persistent queue for work deferred out of the request path
+
+Services enqueue a job (a registered task name plus a JSON payload) inside
+their own transaction, so the job only becomes visible to workers once the
+change that needs it is committed, and the request returns right away.
+
+Workers (app.services.job_worker) claim the most urgent due job with
+SELECT ... FOR UPDATE SKIP LOCKED and run its task handler in a transaction
+that also marks the job succeeded. A failed job is retried with exponential
+backoff until max_attempts. While a handler runs, a heartbeat thread
+refreshes the job's lock every JOB_HEARTBEAT_SECONDS; a job whose worker died
+is retried once its lock is older than JOB_LOCK_TIMEOUT_SECONDS.
+
+Registering a task:
+    @task("files.create_thumbnail")
+    def create_thumbnail(db: Session, payload: dict) -> None:
+        ...
+"""
+import logging
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Callable, Iterator, Sequence
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+TaskHandler = Callable[[Session, Dict[str, Any]], None]
+
+# Priorities (higher runs first; any integer works)
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+
+DEFAULT_QUEUE = "default"
+
+# Longest error text kept on a job
+MAX_ERROR_LENGTH = 2000
+
+_tasks: Dict[str, TaskHandler] = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a task handler to fail its job without retrying"""
+
+
+def task(name: str) -> Callable[[TaskHandler], TaskHandler]:
+    """Register a function as the handler of a task name"""
+    def register(handler: TaskHandler) -> TaskHandler:
+        if name in _tasks and _tasks[name] is not handler:
+            raise ValueError(f"Task '{name}' is already registered")
+        _tasks[name] = handler
+        return handler
+    return register
+
+
+def get_task(name: str) -> Optional[TaskHandler]:
+    """Get the handler registered for a task name"""
+    return _tasks.get(name)
+
+
+def enqueue(
+    db: Session,
+    task_name: str,
+    payload: Optional[Dict[str, Any]] = None,
+    priority: int = PRIORITY_NORMAL,
+    delay_seconds: float = 0,
+    max_attempts: Optional[int] = None,
+    idempotency_key: Optional[str] = None,
+    queue: str = DEFAULT_QUEUE
+) -> int:
+    """
+    Add a job to the queue (the caller commits)
+
+    Enqueueing again with the idempotency_key of a job that is still stored
+    (waiting, running or finished less than JOB_RETENTION_DAYS ago) does not
+    add a job.
+
+    Returns:
+        ID of the new job, or of the existing job with the same idempotency key
+    """
+    values = {
+        "queue": queue,
+        "task": task_name,
+        "payload": payload or {},
+        "priority": priority,
+        "status": JobStatus.QUEUED,
+        "attempts": 0,
+        "max_attempts": max_attempts or settings.JOB_MAX_ATTEMPTS,
+        "idempotency_key": idempotency_key,
+        "run_at": datetime.now(timezone.utc) + timedelta(seconds=delay_seconds),
+    }
+    stmt = pg_insert(Job).values(**values)
+    if idempotency_key is not None:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[Job.idempotency_key])
+
+    job_id = db.execute(stmt.returning(Job.id)).scalar()
+    if job_id is None:
+        job_id = db.query(Job.id).filter(Job.idempotency_key == idempotency_key).scalar()
+    return job_id
+
+
+def claim_job(db: Session, worker_id: str, queues: Sequence[str] = (DEFAULT_QUEUE,)) -> Optional[Any]:
+    """
+    Claim the most urgent due job and mark it running (commits)
+
+    Rows locked by another worker's claim are skipped rather than waited for.
+    Returns the claimed job's row (id, task, payload, attempts, max_attempts, locked_by) or None.
+    """
+    now = datetime.now(timezone.utc)
+    candidate = select(Job.id).where(
+        Job.status == JobStatus.QUEUED,
+        Job.queue.in_(queues),
+        Job.run_at <= now
+    ).order_by(Job.priority.desc(), Job.run_at, Job.id).limit(1).with_for_update(skip_locked=True)
+
+    job = db.execute(
+        update(Job).where(Job.id == candidate.scalar_subquery()).values(
+            status=JobStatus.RUNNING,
+            attempts=Job.attempts + 1,
+            locked_at=now,
+            locked_by=worker_id
+        ).returning(Job.id, Job.task, Job.payload, Job.attempts, Job.max_attempts, Job.locked_by),
+        execution_options={"synchronize_session": False}
+    ).first()
+    db.commit()
+    return job
+
+
+def run_job(job: Any) -> bool:
+    """
+    Run a claimed job (as returned by claim_job) and record the outcome
+
+    The handler's changes and the job's completion are committed together;
+    if the handler raises, its changes are rolled back and the job is
+    scheduled for a retry (or failed once out of attempts).
+
+    Returns:
+        True if the job succeeded
+    """
+    handler = get_task(job.task)
+    db = SessionLocal()
+    try:
+        if handler is None:
+            raise PermanentJobError(f"Unknown task '{job.task}'")
+        with _lock_heartbeat(job):
+            handler(db, job.payload)
+        db.execute(
+            update(Job).where(Job.id == job.id, Job.locked_by == job.locked_by).values(
+                status=JobStatus.SUCCEEDED,
+                locked_at=None,
+                finished_at=datetime.now(timezone.utc),
+                last_error=None
+            ),
+            execution_options={"synchronize_session": False}
+        )
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        permanent = isinstance(e, PermanentJobError)
+        if permanent:
+            logger.warning("Job %s (%s) failed: %s", job.id, job.task, e)
+        else:
+            logger.exception("Job %s (%s) failed on attempt %s", job.id, job.task, job.attempts)
+        _record_failure(db, job, f"{type(e).__name__}: {e}", retry=not permanent)
+        return False
+    finally:
+        db.close()
+
+
+def refresh_lock(db: Session, job: Any) -> bool:
+    """
+    Mark a claimed job's worker as still alive (commits)
+
+    Returns:
+        False if the job is no longer locked by that worker (recovered as stale)
+    """
+    refreshed = db.execute(
+        update(Job).where(
+            Job.id == job.id, Job.locked_by == job.locked_by, Job.status == JobStatus.RUNNING
+        ).values(locked_at=datetime.now(timezone.utc)),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+    db.commit()
+    return refreshed > 0
+
+
+def get_retry_delay(attempts: int) -> float:
+    """Seconds to wait before the next attempt: exponential backoff with jitter"""
+    delay = min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def recover_stale_jobs(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Requeue running jobs whose worker stopped responding (commits)
+    Jobs already out of attempts are failed instead.
+
+    Returns:
+        Number of jobs recovered
+    """
+    now = now or datetime.now(timezone.utc)
+    stale = (
+        Job.status == JobStatus.RUNNING,
+        Job.locked_at < now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS)
+    )
+    released = {"locked_at": None, "locked_by": None, "last_error": "Worker lock timed out"}
+
+    failed = db.execute(
+        update(Job).where(*stale, Job.attempts >= Job.max_attempts).values(
+            status=JobStatus.FAILED, finished_at=now, **released
+        ),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+    requeued = db.execute(
+        update(Job).where(*stale).values(status=JobStatus.QUEUED, run_at=now, **released),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+    db.commit()
+    return failed + requeued
+
+
+def purge_finished_jobs(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Delete jobs that finished more than JOB_RETENTION_DAYS ago (commits)
+
+    Returns:
+        Number of jobs deleted
+    """
+    now = now or datetime.now(timezone.utc)
+    result = db.execute(
+        delete(Job).where(
+            Job.status.in_([JobStatus.SUCCEEDED, JobStatus.FAILED]),
+            Job.finished_at < now - timedelta(days=settings.JOB_RETENTION_DAYS)
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return result.rowcount
+
+
+@contextmanager
+def _lock_heartbeat(job: Any) -> Iterator[None]:
+    """Refresh the job's lock every JOB_HEARTBEAT_SECONDS from another thread while the block runs"""
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(settings.JOB_HEARTBEAT_SECONDS):
+            db = SessionLocal()
+            try:
+                if not refresh_lock(db, job):
+                    logger.warning("Job %s (%s) lost its lock while running", job.id, job.task)
+                    return
+            except Exception:
+                logger.warning("Failed to refresh the lock of job %s", job.id, exc_info=True)
+            finally:
+                db.close()
+
+    heartbeat = threading.Thread(target=beat, name=f"job-heartbeat-{job.id}", daemon=True)
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        heartbeat.join()
+
+
+def _record_failure(db: Session, job: Any, error: str, retry: bool) -> None:
+    """Schedule the job's next attempt, or fail it for good"""
+    now = datetime.now(timezone.utc)
+    values: Dict[str, Any] = {"locked_at": None, "locked_by": None, "last_error": error[:MAX_ERROR_LENGTH]}
+    if retry and job.attempts < job.max_attempts:
+        values.update(status=JobStatus.QUEUED, run_at=now + timedelta(seconds=get_retry_delay(job.attempts)))
+    else:
+        values.update(status=JobStatus.FAILED, finished_at=now)
+
+    db.execute(
+        update(Job).where(Job.id == job.id, Job.locked_by == job.locked_by).values(**values),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
@@ -0,0 +1,93 @@
+"""
+Background job task handlers
+Imported by the job worker to register the tasks services enqueue
+"""
+from datetime import datetime
+from typing import Dict, Any, Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.core.storage import FileStorage
+from app.models.book import Book
+from app.services import (
+    book_export_service, chapter_release_service, chapter_revision_service, chapter_service, job_service,
+    recommendation_service, trending_service
+)
+from app.services.job_service import task
+
+
+@task("files.create_thumbnail")
+def create_cover_thumbnail(db: Session, payload: Dict[str, Any]) -> None:
+    """Create the thumbnail of an uploaded cover image: {"filename": ...}"""
+    if (FileStorage.COVERS_DIR / payload["filename"]).exists():
+        FileStorage.create_cover_thumbnail(payload["filename"])
+
+
+@task("files.delete_unreferenced")
+def delete_unreferenced_files(db: Session, payload: Dict[str, Any]) -> None:
+    """Delete uploaded files no book uses as its cover any more: {"urls": [...]}"""
+    for url in payload["urls"]:
+        in_use = db.query(Book.id).filter(
+            or_(Book.cover_image_url == url, Book.thumbnail_url == url)
+        ).first()
+        if not in_use:
+            FileStorage.delete_file(url)
+
+
+@task("chapters.prepare_release")
+def prepare_chapter_release(db: Session, payload: Dict[str, Any]) -> None:
+    """Warm caches and precompute a scheduled chapter's response: {"chapter_id": ..., "publish_at": iso}"""
+    chapter_release_service.prepare_release(db, payload["chapter_id"], datetime.fromisoformat(payload["publish_at"]))
+
+
+@task("chapters.publish_due")
+def publish_due_chapters(db: Session, payload: Dict[str, Any]) -> None:
+    """Publish every chapter whose publish_at has come: {}"""
+    chapter_service.publish_due_chapters(db)
+
+
+@task("chapters.backfill_assets")
+def backfill_chapter_assets(db: Session, payload: Dict[str, Any]) -> None:
+    """Store the graphs and asset manifests of chapters saved before they were kept: {"after_id": ...}"""
+    last_id = chapter_service.backfill_chapter_assets(db, payload.get("after_id", 0))
+    _continue_backfill(db, "chapters.backfill_assets", last_id)
+
+
+@task("chapters.backfill_text_stats")
+def backfill_chapter_text_stats(db: Session, payload: Dict[str, Any]) -> None:
+    """Store the text stats of chapters missing them or counted the old way: {"after_id": ...}"""
+    last_id = chapter_service.backfill_text_stats(db, payload.get("after_id", 0))
+    _continue_backfill(db, "chapters.backfill_text_stats", last_id)
+
+
+def _continue_backfill(db: Session, task_name: str, last_id: Optional[int]) -> None:
+    """Enqueue the next batch of a backfill after chapter last_id (None: done)"""
+    if last_id is not None:
+        job_service.enqueue(
+            db, task_name, {"after_id": last_id},
+            priority=job_service.PRIORITY_LOW, idempotency_key=f"{task_name}:{last_id}"
+        )
+        db.commit()
+
+
+@task("chapters.compact_revisions")
+def compact_chapter_revisions(db: Session, payload: Dict[str, Any]) -> None:
+    """Apply the retention policy to a chapter's revision history: {"chapter_id": ...}"""
+    chapter_revision_service.compact_revisions(db, payload["chapter_id"])
+
+
+@task("exports.clear")
+def clear_book_exports(db: Session, payload: Dict[str, Any]) -> None:
+    """Remove a book's cached exports: {"book_id": ...}"""
+    book_export_service.clear_cached_exports(payload["book_id"])
+
+
+@task("trending.rebuild_scores")
+def rebuild_trending_scores(db: Session, payload: Dict[str, Any]) -> None:
+    """Rescore every book from its activity buckets (after changing weights or the half-life): {}"""
+    trending_service.rebuild_scores(db)
+
+
+@task("recommendations.refresh")
+def refresh_recommendations(db: Session, payload: Dict[str, Any]) -> None:
+    """Recompute similar-book lists: {"full": bool}"""
+    recommendation_service.refresh_recommendations(db, full=payload.get("full", False))
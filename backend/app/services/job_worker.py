@@ -0,0 +1,134 @@
+"""
+Job worker - Runs queued background jobs
+
+A worker runs one or more threads, each claiming and running one job at a
+time, most urgent first, and polling every JOB_POLL_INTERVAL_SECONDS while the
+queue is empty. Any number of workers (threads in the API process, or
+dedicated processes started with `python -m app.worker`) can share the queue.
+
+Workers must run from the backend directory, like the API: file tasks use
+paths relative to it.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Optional, List, Sequence
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services import chapter_service, job_service, recommendation_service
+from app.services import job_tasks  # noqa: F401 - registers the task handlers
+
+logger = logging.getLogger(__name__)
+
+# Seconds between maintenance passes (stale lock recovery, purging old jobs, scheduling,
+# publishing scheduled chapters whose job was lost)
+MAINTENANCE_INTERVAL_SECONDS = 60.0
+
+
+class JobWorker:
+    """Pool of threads claiming and running jobs from the queue"""
+
+    def __init__(
+        self,
+        threads: int = 1,
+        queues: Sequence[str] = (job_service.DEFAULT_QUEUE,),
+        poll_interval_seconds: float = 1.0,
+        name: Optional[str] = None
+    ):
+        self.threads = threads
+        self.queues = list(queues)
+        self.poll_interval_seconds = poll_interval_seconds
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stop_event = threading.Event()
+        self._runners: List[threading.Thread] = []
+        self._last_maintenance = 0.0
+        self._maintenance_lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the worker threads"""
+        if any(runner.is_alive() for runner in self._runners):
+            return
+
+        self._stop_event.clear()
+        self._runners = [
+            threading.Thread(target=self._run, args=(f"{self.name}/{index}",), name=f"job-worker-{index}", daemon=True)
+            for index in range(self.threads)
+        ]
+        for runner in self._runners:
+            runner.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop claiming jobs and wait for running jobs to finish"""
+        self._stop_event.set()
+        deadline = time.monotonic() + timeout
+        for runner in self._runners:
+            runner.join(timeout=max(deadline - time.monotonic(), 0))
+        self._runners = []
+
+    def run_pending(self, worker_id: Optional[str] = None) -> int:
+        """
+        Run due jobs until the queue is empty (or the worker is stopped)
+
+        Returns:
+            Number of jobs run
+        """
+        worker_id = worker_id or self.name
+        count = 0
+        while not self._stop_event.is_set():
+            db = SessionLocal()
+            try:
+                job = job_service.claim_job(db, worker_id, self.queues)
+            finally:
+                db.close()
+            if job is None:
+                break
+            job_service.run_job(job)
+            count += 1
+        return count
+
+    def _run(self, worker_id: str) -> None:
+        """Thread loop: run due jobs, then wait for more"""
+        while not self._stop_event.is_set():
+            try:
+                self._maintain()
+                self.run_pending(worker_id)
+            except Exception:
+                logger.exception("Job worker %s failed to poll the queue", worker_id)
+            self._stop_event.wait(self.poll_interval_seconds)
+
+    def _maintain(self) -> None:
+        """Recover jobs of dead workers, purge old jobs, schedule periodic jobs and publish overdue chapters (one thread at a time, once per interval)"""
+        now = time.monotonic()
+        if now - self._last_maintenance < MAINTENANCE_INTERVAL_SECONDS:
+            return
+        if not self._maintenance_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_maintenance = now
+            db = SessionLocal()
+            try:
+                recovered = job_service.recover_stale_jobs(db)
+                purged = job_service.purge_finished_jobs(db)
+                if settings.RECOMMENDATIONS_REFRESH_MINUTES:
+                    recommendation_service.schedule_refresh(db)
+                overdue = chapter_service.publish_due_chapters(db)
+            finally:
+                db.close()
+            if recovered:
+                logger.warning("Requeued %d jobs of unresponsive workers", recovered)
+            if purged:
+                logger.info("Purged %d finished jobs", purged)
+            if overdue:
+                logger.warning("Published %d overdue scheduled chapters", overdue)
+        finally:
+            self._maintenance_lock.release()
+
+
+# Worker threads started with the API process (JOB_WORKER_THREADS may be 0)
+api_worker = JobWorker(
+    threads=settings.JOB_WORKER_THREADS,
+    poll_interval_seconds=settings.JOB_POLL_INTERVAL_SECONDS,
+)
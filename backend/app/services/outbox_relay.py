@@ -0,0 +1,166 @@
+"""
+Outbox relay - Moves committed change events into the change log and onto the event bus
+
+Each API process runs one relay thread. The threads take turns assigning log
+offsets to newly committed events (an advisory lock lets one at a time do
+it), and each thread publishes every event in the log, in offset order, to
+its own process's event bus, starting from the end of the log at startup.
+
+On Postgres the thread sleeps on LISTEN and is woken by the NOTIFY sent when
+events are committed or relayed; OUTBOX_POLL_INTERVAL_SECONDS bounds the wait
+in case a notification is missed (and is the only wake-up on other databases).
+"""
+import logging
+import select
+import threading
+import time
+from typing import Optional
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.services import outbox_service
+from app.services.event_bus import EventBus, event_bus
+
+logger = logging.getLogger(__name__)
+
+# Seconds between purges of old events
+PURGE_INTERVAL_SECONDS = 3600.0
+
+
+class OutboxRelay:
+    """Background thread relaying outbox events and dispatching them in-process"""
+
+    def __init__(self, bus: EventBus, bind: Engine, poll_interval_seconds: float, batch_size: int):
+        self.bus = bus
+        self.bind = bind
+        self.poll_interval_seconds = poll_interval_seconds
+        self.batch_size = batch_size
+        self.offset: Optional[int] = None  # Last offset dispatched to the bus
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listener = None  # Raw DBAPI connection LISTENing for notifications
+        self._last_purge = 0.0
+
+    def start(self) -> None:
+        """Start the relay thread (events already in the log are not dispatched)"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        if self.offset is None:
+            db = SessionLocal()
+            try:
+                self.offset = outbox_service.get_last_offset(db)
+            finally:
+                db.close()
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the relay thread after relaying what is pending"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval_seconds + 5)
+            self._thread = None
+        self._close_listener()
+        try:
+            self.run_once()
+        except Exception:
+            logger.exception("Failed to relay outbox events on shutdown")
+
+    def run_once(self) -> int:
+        """
+        Relay pending events and dispatch new log entries to the bus
+
+        Returns:
+            Number of events dispatched
+        """
+        db = SessionLocal()
+        try:
+            while outbox_service.relay_pending_events(db, self.batch_size) >= self.batch_size:
+                pass
+
+            if self.offset is None:
+                self.offset = outbox_service.get_last_offset(db)
+            dispatched = 0
+            while True:
+                events = outbox_service.get_events(db, self.offset, self.batch_size)
+                db.rollback()  # End the read transaction before running handlers
+                for event in events:
+                    self.bus.publish(event)
+                    self.offset = event["offset"]
+                dispatched += len(events)
+                if len(events) < self.batch_size:
+                    return dispatched
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        """Thread loop: relay and dispatch, then wait for a notification or the poll interval"""
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+                self._purge_if_due()
+            except Exception:
+                logger.exception("Failed to relay outbox events")
+                self._close_listener()
+            self._wait()
+
+    def _wait(self) -> None:
+        """Sleep until notified of new events, the poll interval passes or the relay stops"""
+        listener = self._get_listener()
+        if listener is None:
+            self._stop_event.wait(self.poll_interval_seconds)
+            return
+
+        readable, _, _ = select.select([listener], [], [], self.poll_interval_seconds)
+        if readable:
+            listener.poll()
+            listener.notifies.clear()
+
+    def _get_listener(self):
+        """Open the LISTEN connection on Postgres (None elsewhere or if it fails)"""
+        if self._listener is not None or self.bind.dialect.name != "postgresql":
+            return self._listener
+        try:
+            # A dedicated connection, outside the pool: it stays in LISTEN mode
+            connect_args, connect_kwargs = self.bind.dialect.create_connect_args(self.bind.url)
+            connection = self.bind.dialect.connect(*connect_args, **connect_kwargs)
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {outbox_service.NOTIFY_CHANNEL}")
+            self._listener = connection
+        except Exception:
+            logger.exception("Failed to listen for outbox notifications; polling instead")
+        return self._listener
+
+    def _close_listener(self) -> None:
+        if self._listener is not None:
+            try:
+                self._listener.close()
+            except Exception:
+                pass
+            self._listener = None
+
+    def _purge_if_due(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        db = SessionLocal()
+        try:
+            purged = outbox_service.purge_events(db)
+        finally:
+            db.close()
+        if purged:
+            logger.info("Purged %d old outbox events", purged)
+
+
+# Process-wide relay instance
+outbox_relay = OutboxRelay(
+    bus=event_bus,
+    bind=engine,
+    poll_interval_seconds=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+)
@@ -0,0 +1,144 @@
+"""
+Outbox service layer - Change events for books, chapters, comments and ratings
+
+Service functions that change content call record_event before committing,
+so an event is stored if and only if its change is. The relay
+(app.services.outbox_relay) then gives committed events consecutive log
+offsets and publishes them; consumers read the change log in offset order.
+
+Event format (as published and returned by get_events):
+    {
+        "offset": 1042,
+        "type": "chapter.updated",
+        "aggregate_type": "chapter",
+        "aggregate_id": 17,
+        "payload": {"book_id": 3, "chapter_id": 17, "fields": ["content_data"], ...},
+        "created_at": "2026-10-19T18:20:51.604117+00:00"
+    }
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any
+from sqlalchemy import update, delete, func, select, text, values, column, BigInteger
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.outbox_event import OutboxEvent
+
+# Postgres NOTIFY channel that wakes relays when events are committed
+NOTIFY_CHANNEL = "outbox_events"
+
+# Advisory lock held while assigning log offsets (one relay at a time)
+RELAY_LOCK_KEY = 804_113_570
+
+
+def record_event(db: Session, event_type: str, aggregate_id: int, payload: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Add a change event to the outbox (the caller commits)
+
+    Args:
+        event_type: "<aggregate type>.<change>", e.g. "book.created"
+    """
+    db.add(OutboxEvent(
+        event_type=event_type,
+        aggregate_type=event_type.split(".", 1)[0],
+        aggregate_id=aggregate_id,
+        payload=payload or {}
+    ))
+    if _is_postgres(db):
+        # Delivered when the transaction commits (repeats in one transaction are merged)
+        db.execute(text(f"NOTIFY {NOTIFY_CHANNEL}"))
+
+
+def relay_pending_events(db: Session, limit: Optional[int] = None) -> int:
+    """
+    Assign log offsets to committed events that have none yet, in id order (commits)
+
+    Only one relay assigns offsets at a time; if another holds the lock this
+    returns 0 right away.
+
+    Returns:
+        Number of events relayed
+    """
+    if _is_postgres(db):
+        locked = db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": RELAY_LOCK_KEY}).scalar()
+        if not locked:
+            db.rollback()
+            return 0
+
+    pending = [event_id for (event_id,) in db.query(OutboxEvent.id).filter(
+        OutboxEvent.log_offset.is_(None)
+    ).order_by(OutboxEvent.id).limit(limit or settings.OUTBOX_BATCH_SIZE)]
+    if not pending:
+        db.rollback()
+        return 0
+
+    last_offset = db.query(func.max(OutboxEvent.log_offset)).scalar() or 0
+    offsets = values(
+        column("id", BigInteger), column("log_offset", BigInteger), name="offsets"
+    ).data([(event_id, last_offset + position) for position, event_id in enumerate(pending, start=1)])
+    db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id == offsets.c.id)
+        .values(log_offset=offsets.c.log_offset, published_at=datetime.now(timezone.utc)),
+        execution_options={"synchronize_session": False}
+    )
+    if _is_postgres(db):
+        # Wake the other processes' dispatchers
+        db.execute(text(f"NOTIFY {NOTIFY_CHANNEL}"))
+    db.commit()
+    return len(pending)
+
+
+def get_events(
+    db: Session, after_offset: int = 0, limit: int = 100, event_type_prefix: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Get relayed events after an offset, in log order"""
+    query = db.query(OutboxEvent).filter(
+        OutboxEvent.log_offset > after_offset
+    )
+    if event_type_prefix:
+        query = query.filter(OutboxEvent.event_type.startswith(event_type_prefix, autoescape=True))
+    return [_to_dict(event) for event in query.order_by(OutboxEvent.log_offset).limit(limit)]
+
+
+def get_last_offset(db: Session) -> int:
+    """Offset of the latest relayed event (0 if none)"""
+    return db.query(func.max(OutboxEvent.log_offset)).scalar() or 0
+
+
+def purge_events(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Delete relayed events older than OUTBOX_RETENTION_DAYS (commits)
+
+    The latest relayed event is always kept: the relay continues the log from
+    its offset, so offsets keep growing (and consumers' `after` stays valid)
+    however quiet the log has been.
+
+    Returns:
+        Number of events deleted
+    """
+    now = now or datetime.now(timezone.utc)
+    last_offset = select(func.max(OutboxEvent.log_offset)).scalar_subquery()
+    result = db.execute(
+        delete(OutboxEvent).where(
+            OutboxEvent.log_offset < last_offset,
+            OutboxEvent.created_at < now - timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return result.rowcount
+
+
+def _to_dict(event: OutboxEvent) -> Dict[str, Any]:
+    return {
+        "offset": event.log_offset,
+        "type": event.event_type,
+        "aggregate_type": event.aggregate_type,
+        "aggregate_id": event.aggregate_id,
+        "payload": event.payload,
+        "created_at": event.created_at.isoformat() if event.created_at else None,
+    }
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
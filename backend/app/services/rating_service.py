@@ -6,6 +6,9 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 from app.models.rating import Rating
 from app.schemas.rating import RatingCreate, RatingUpdate
+from app.core.cache import cached, invalidate_tags
+from app.services import outbox_service
+from app.services.trending_tracker import trending_tracker
 
 
 def get_rating_by_user_and_book(
@@ -20,8 +23,9 @@ def get_rating_by_user_and_book(
     ).first()
 
 
+@cached("rating_stats", key="{book_id}", tags=("book:{book_id}:ratings",))
 def get_book_rating_stats(db: Session, book_id: int) -> Dict:
-    """Get rating statistics for a book"""
+    """Get rating statistics for a book (cached)"""
     # Get average rating and total count
     stats = db.query(
         func.avg(Rating.rating).label('average'),
@@ -56,7 +60,9 @@ def create_or_update_rating(
     if existing_rating:
         # Update existing rating
         existing_rating.rating = rating_in.rating
+        _record_rating_event(db, "rating.updated", existing_rating)
         db.commit()
+        invalidate_tags(f"book:{existing_rating.book_id}:ratings")
         db.refresh(existing_rating)
         return existing_rating
     else:
@@ -66,23 +72,31 @@ def create_or_update_rating(
             **rating_in.model_dump()
         )
         db.add(db_rating)
+        db.flush()
+        _record_rating_event(db, "rating.created", db_rating)
         db.commit()
+        invalidate_tags(f"book:{db_rating.book_id}:ratings")
         db.refresh(db_rating)
+        trending_tracker.record(db_rating.book_id, "ratings")
         return db_rating
 
 
 def update_rating(db: Session, rating: Rating, rating_update: RatingUpdate) -> Rating:
     """Update a rating"""
     rating.rating = rating_update.rating
+    _record_rating_event(db, "rating.updated", rating)
     db.commit()
+    invalidate_tags(f"book:{rating.book_id}:ratings")
     db.refresh(rating)
     return rating
 
 
 def delete_rating(db: Session, rating: Rating) -> bool:
     """Delete a rating"""
+    _record_rating_event(db, "rating.deleted", rating)
     db.delete(rating)
     db.commit()
+    invalidate_tags(f"book:{rating.book_id}:ratings")
     return True
 
 
@@ -94,3 +108,11 @@ def delete_rating_by_book(db: Session, user_id: int, book_id: int) -> bool:
     return False
 
 
+def _record_rating_event(db: Session, event_type: str, rating: Rating) -> None:
+    """Add a rating change event to the outbox"""
+    outbox_service.record_event(db, event_type, rating.id, {
+        "rating_id": rating.id,
+        "book_id": rating.book_id,
+        "user_id": rating.user_id,
+        "rating": rating.rating,
+    })
@@ -0,0 +1,195 @@
+"""
+Reading Progress buffer - Coalesces high-frequency progress updates in memory
+
+Reader clients report progress as the user scrolls. Instead of writing every
+tick, updates are kept per (user_id, book_id) and only the latest one is
+written. Pending updates are flushed with a single bulk upsert once the oldest
+one reaches the max-staleness bound, when too many keys are pending, or on
+application shutdown.
+
+Each worker process keeps its own buffer.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Tuple, Any
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.schemas.reading_progress import ReadingProgressCreate
+from app.services import reading_progress_service
+
+logger = logging.getLogger(__name__)
+
+ProgressKey = Tuple[int, int]  # (user_id, book_id)
+
+
+class ReadingProgressBuffer:
+    """In-memory, per (user, book) coalescing buffer for reading progress"""
+
+    def __init__(self, max_staleness_seconds: float, max_pending: int):
+        self.max_staleness_seconds = max_staleness_seconds
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending: Dict[ProgressKey, Dict[str, Any]] = {}
+        self._oldest_pending_at: Optional[float] = None  # monotonic time
+        self._stop_event = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def add(self, user_id: int, progress_in: ReadingProgressCreate) -> Dict[str, Any]:
+        """
+        Record a progress update, replacing any pending update for the same book
+        Flushes inline if the buffer is full or its oldest update is too stale.
+        Returns the pending row.
+        """
+        row = {
+            "user_id": user_id,
+            "book_id": progress_in.book_id,
+            "chapter_id": progress_in.chapter_id,
+            "progress_percentage": progress_in.progress_percentage,
+            "last_read_at": datetime.now(timezone.utc),
+        }
+
+        with self._lock:
+            if not self._pending:
+                self._oldest_pending_at = time.monotonic()
+            self._pending[(user_id, progress_in.book_id)] = row
+            flush_due = self._is_flush_due()
+
+        if flush_due:
+            try:
+                self.flush()
+            except Exception:
+                # Rows were requeued; the background flusher will retry
+                logger.exception("Failed to flush buffered reading progress")
+
+        return row
+
+    def get(self, user_id: int, book_id: int) -> Optional[Dict[str, Any]]:
+        """Get the pending update for a user and book, if any"""
+        with self._lock:
+            row = self._pending.get((user_id, book_id))
+            return dict(row) if row else None
+
+    def has_pending_for_user(self, user_id: int) -> bool:
+        """Check if a user has any updates waiting to be flushed"""
+        with self._lock:
+            return any(key[0] == user_id for key in self._pending)
+
+    def discard(self, user_id: int, book_id: int) -> None:
+        """Drop a pending update (e.g. superseded by a direct write)"""
+        with self._lock:
+            self._pending.pop((user_id, book_id), None)
+
+    def flush(self, db: Optional[Session] = None, user_id: Optional[int] = None) -> int:
+        """
+        Write pending updates with one bulk upsert
+
+        Args:
+            db: Session to use; a new session is opened if not provided
+            user_id: If provided, only flush this user's updates
+
+        Returns:
+            Number of rows written
+        """
+        rows = self._drain(user_id)
+        if not rows:
+            return 0
+
+        own_session = db is None
+        if own_session:
+            db = SessionLocal()
+
+        try:
+            try:
+                return reading_progress_service.bulk_upsert_reading_progress(db, rows)
+            except IntegrityError:
+                # A book or chapter was deleted (or never existed): retry without it
+                db.rollback()
+                valid_rows = reading_progress_service.filter_rows_with_valid_references(db, rows)
+                if len(valid_rows) < len(rows):
+                    logger.warning(
+                        "Dropped %d buffered reading progress updates with invalid references",
+                        len(rows) - len(valid_rows)
+                    )
+                rows = valid_rows
+                return reading_progress_service.bulk_upsert_reading_progress(db, rows)
+        except Exception:
+            db.rollback()
+            self._requeue(rows)
+            raise
+        finally:
+            if own_session:
+                db.close()
+
+    def start(self) -> None:
+        """Start the background thread that enforces the max-staleness bound"""
+        if self._flusher and self._flusher.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._flusher = threading.Thread(
+            target=self._run, name="reading-progress-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and flush everything still pending"""
+        self._stop_event.set()
+        if self._flusher:
+            self._flusher.join(timeout=self.max_staleness_seconds + 5)
+            self._flusher = None
+        self.flush()
+
+    def _run(self) -> None:
+        """Background loop: flush whenever the oldest pending update is due"""
+        interval = max(self.max_staleness_seconds / 2, 0.05)
+        while not self._stop_event.wait(interval):
+            with self._lock:
+                flush_due = self._is_flush_due()
+            if not flush_due:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush buffered reading progress")
+
+    def _is_flush_due(self) -> bool:
+        """Check flush conditions (caller must hold the lock)"""
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.max_pending:
+            return True
+        age = time.monotonic() - self._oldest_pending_at
+        return age >= self.max_staleness_seconds
+
+    def _drain(self, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Remove and return pending rows"""
+        with self._lock:
+            if user_id is None:
+                rows = list(self._pending.values())
+                self._pending.clear()
+            else:
+                keys = [key for key in self._pending if key[0] == user_id]
+                rows = [self._pending.pop(key) for key in keys]
+
+            if not self._pending:
+                self._oldest_pending_at = None
+            return rows
+
+    def _requeue(self, rows: List[Dict[str, Any]]) -> None:
+        """Put rows back after a failed flush unless newer updates arrived"""
+        with self._lock:
+            if not self._pending:
+                self._oldest_pending_at = time.monotonic()
+            for row in rows:
+                self._pending.setdefault((row["user_id"], row["book_id"]), row)
+
+
+# Process-wide buffer instance
+progress_buffer = ReadingProgressBuffer(
+    max_staleness_seconds=settings.READING_PROGRESS_MAX_STALENESS_SECONDS,
+    max_pending=settings.READING_PROGRESS_MAX_PENDING,
+)
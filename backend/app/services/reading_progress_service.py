@@ -1,11 +1,19 @@
 """
 Reading Progress service layer - Business logic for reading progress operations
 """
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
+from datetime import datetime, timezone
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.models.reading_progress import ReadingProgress
-from app.schemas.reading_progress import ReadingProgressCreate, ReadingProgressUpdate
+from app.models.book import Book
+from app.models.chapter import Chapter
+from app.schemas.reading_progress import (
+    ReadingProgressCreate, ReadingProgressUpdate, ReadingProgressSyncItem
+)
+from app.schemas.sync import SyncItemResult, SyncItemStatus
+from app.services.sync_service import normalize_client_timestamp, latest_item_per_book
 
 
 def get_reading_progress_by_user_and_book(
@@ -54,6 +62,7 @@ def create_or_update_reading_progress(
         # Update existing progress
         existing_progress.chapter_id = progress_in.chapter_id
         existing_progress.progress_percentage = progress_in.progress_percentage
+        existing_progress.last_read_at = datetime.now(timezone.utc)
         db.commit()
         db.refresh(existing_progress)
         return existing_progress
@@ -69,6 +78,145 @@ def create_or_update_reading_progress(
         return db_progress
 
 
+def _build_progress_upsert(rows: List[Dict[str, Any]], newer_only: bool = False):
+    """
+    Build an INSERT ... ON CONFLICT (user_id, book_id) DO UPDATE statement
+    
+    With newer_only, existing rows are only overwritten when the incoming
+    last_read_at is more recent (last-writer-wins).
+    """
+    stmt = pg_insert(ReadingProgress).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[ReadingProgress.user_id, ReadingProgress.book_id],
+        set_={
+            "chapter_id": stmt.excluded.chapter_id,
+            "progress_percentage": stmt.excluded.progress_percentage,
+            "last_read_at": stmt.excluded.last_read_at,
+            "updated_at": func.now(),
+        },
+        where=(ReadingProgress.last_read_at < stmt.excluded.last_read_at) if newer_only else None
+    )
+
+
+def bulk_upsert_reading_progress(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """
+    Insert or update many reading progress rows in a single statement
+    
+    Each row is a dict with user_id, book_id, chapter_id, progress_percentage
+    and last_read_at. The whole batch costs one round trip and one commit.
+    Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+    
+    db.execute(_build_progress_upsert(rows))
+    db.commit()
+    return len(rows)
+
+
+def sync_reading_progress(
+    db: Session, user_id: int, items: List[ReadingProgressSyncItem]
+) -> List[SyncItemResult]:
+    """
+    Apply queued reading progress updates from an offline client
+    
+    Resolves conflicts last-writer-wins per book using client timestamps:
+    within the batch first, then against stored rows, in one transaction
+    and one bulk upsert. Returns one result per item.
+    """
+    now = datetime.now(timezone.utc)
+    items = [
+        item.model_copy(update={
+            "client_timestamp": normalize_client_timestamp(item.client_timestamp, now)
+        })
+        for item in items
+    ]
+    latest, superseded = latest_item_per_book(items)
+    
+    results = [
+        SyncItemResult(
+            index=index,
+            book_id=items[index].book_id,
+            status=SyncItemStatus.SUPERSEDED,
+            detail="A newer update for this book is in the same batch"
+        )
+        for index in superseded
+    ]
+    
+    rows = [
+        {
+            "user_id": user_id,
+            "book_id": item.book_id,
+            "chapter_id": item.chapter_id,
+            "progress_percentage": item.progress_percentage,
+            "last_read_at": item.client_timestamp,
+        }
+        for _, item in latest.values()
+    ]
+    valid_rows = filter_rows_with_valid_references(db, rows) if rows else []
+    valid_books = {row["book_id"] for row in valid_rows}
+    
+    applied_books = set()
+    if valid_rows:
+        stmt = _build_progress_upsert(valid_rows, newer_only=True).returning(ReadingProgress.book_id)
+        applied_books = {book_id for (book_id,) in db.execute(stmt)}
+    db.commit()
+    
+    for book_id, (index, _) in latest.items():
+        if book_id not in valid_books:
+            results.append(SyncItemResult(
+                index=index, book_id=book_id, status=SyncItemStatus.INVALID,
+                detail="Book or chapter not found"
+            ))
+        elif book_id in applied_books:
+            results.append(SyncItemResult(
+                index=index, book_id=book_id, status=SyncItemStatus.APPLIED
+            ))
+        else:
+            results.append(SyncItemResult(
+                index=index, book_id=book_id, status=SyncItemStatus.SUPERSEDED,
+                detail="A newer update for this book is already stored"
+            ))
+    
+    return results
+
+
+def filter_rows_with_valid_references(
+    db: Session, rows: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Drop progress rows whose book or chapter no longer exists"""
+    book_ids = {row["book_id"] for row in rows}
+    chapter_ids = {row["chapter_id"] for row in rows}
+    
+    existing_books = {
+        book_id for (book_id,) in db.query(Book.id).filter(Book.id.in_(book_ids))
+    }
+    existing_chapters = {
+        chapter_id for (chapter_id,) in db.query(Chapter.id).filter(Chapter.id.in_(chapter_ids))
+    }
+    
+    return [
+        row for row in rows
+        if row["book_id"] in existing_books and row["chapter_id"] in existing_chapters
+    ]
+
+
+def apply_pending_progress(
+    db: Session, progress: ReadingProgress, pending: Dict[str, Any]
+) -> ReadingProgress:
+    """
+    Overlay a buffered (not yet flushed) update onto a stored progress row
+    
+    The row is detached from the session first so the overlay is never
+    written back by a later commit.
+    """
+    db.expunge(progress)
+    progress.chapter_id = pending["chapter_id"]
+    progress.progress_percentage = pending["progress_percentage"]
+    progress.last_read_at = pending["last_read_at"]
+    return progress
+
+
 def update_reading_progress(
     db: Session, progress: ReadingProgress, progress_update: ReadingProgressUpdate
 ) -> ReadingProgress:
@@ -77,6 +225,7 @@ def update_reading_progress(
     
     for field, value in update_data.items():
         setattr(progress, field, value)
+    progress.last_read_at = datetime.now(timezone.utc)
     
     db.commit()
     db.refresh(progress)
@@ -0,0 +1,331 @@
+"""
+Recommendation service layer - "Readers of this book also read" from co-reading signals
+
+A batch refresh (the "recommendations.refresh" job, which the job worker
+schedules every RECOMMENDATIONS_REFRESH_MINUTES) builds a sparse user x book
+matrix from bookmarks, ratings and reading progress and computes item-item
+cosine similarity with SciPy sparse products, a block of books at a time.
+Each book's top RECOMMENDATIONS_TOP_N similar books are stored in
+book_recommendations, and the endpoints only read those lists: a book's list
+directly, a user's recommendations by merging the lists of their recent books.
+
+An incremental refresh recomputes only the books read by users whose
+interactions changed since the previous run. Another book's score against
+one of those books is then slightly stale until the next full rebuild, which
+is also when removed bookmarks and ratings stop counting.
+"""
+import heapq
+import logging
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Tuple, Iterator
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select, delete, func, union
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.book import Book, BookStatus
+from app.models.book_recommendation import BookRecommendation
+from app.models.bookmark import Bookmark
+from app.models.rating import Rating
+from app.models.reading_progress import ReadingProgress
+from app.services import job_service
+
+logger = logging.getLogger(__name__)
+
+# Interaction strengths: a bookmark, a finished book (half for just opening
+# it) and a 5-star rating (1 star counts -1) each count 1.0
+BOOKMARK_WEIGHT = 1.0
+READ_WEIGHT = 1.0
+RATING_WEIGHT = 1.0
+
+# Books per similarity block (bounds the memory of one sparse product)
+BLOCK_SIZE = 256
+
+# Interaction rows fetched per round trip
+FETCH_SIZE = 100_000
+
+# Recommendation lists per multi-row upsert
+WRITE_BATCH_SIZE = 1000
+
+
+def refresh_recommendations(db: Session, full: bool = False) -> int:
+    """
+    Recompute similar-book lists (commits)
+
+    Args:
+        full: Recompute every book; otherwise only books read by users with
+            interactions changed since the last run (everything on the first run)
+
+    Returns:
+        Number of books whose list was written
+    """
+    started_at = datetime.now(timezone.utc)
+    since = None if full else db.query(func.max(BookRecommendation.computed_at)).scalar()
+
+    user_ids, book_ids, values = _load_interactions(db)
+    matrix, users, books = build_interaction_matrix(user_ids, book_ids, values)
+
+    if since is None:
+        columns = np.arange(len(books))
+    else:
+        changed_users = _get_changed_user_ids(db, since)
+        rows = np.flatnonzero(np.isin(users, changed_users))
+        columns = np.unique(matrix[rows].indices)
+
+    written = 0
+    batch = []
+    for book_id, similar_ids, scores in compute_similar_books(
+        matrix, books, columns,
+        top_n=settings.RECOMMENDATIONS_TOP_N,
+        min_common_readers=settings.RECOMMENDATIONS_MIN_COMMON_READERS
+    ):
+        batch.append({
+            "book_id": book_id,
+            "similar_book_ids": similar_ids,
+            "scores": scores,
+            "computed_at": started_at,
+            "created_at": started_at.replace(tzinfo=None),
+            "updated_at": started_at.replace(tzinfo=None),
+        })
+        if len(batch) >= WRITE_BATCH_SIZE:
+            written += _write_lists(db, batch)
+            batch = []
+    written += _write_lists(db, batch)
+
+    if since is None:
+        # Books nobody reads any more
+        db.execute(
+            delete(BookRecommendation).where(BookRecommendation.computed_at < started_at),
+            execution_options={"synchronize_session": False}
+        )
+    db.commit()
+
+    logger.info(
+        "Refreshed recommendations of %d books from %d interactions (%s)",
+        written, len(values), "full" if since is None else "incremental"
+    )
+    return written
+
+
+def schedule_refresh(db: Session, now: Optional[datetime] = None) -> None:
+    """
+    Enqueue the refresh of the current RECOMMENDATIONS_REFRESH_MINUTES period (commits)
+
+    Every worker calls this; the idempotency key makes one job per period.
+    Every RECOMMENDATIONS_FULL_REBUILD_HOURS the period's refresh is a full one.
+    """
+    period_seconds = settings.RECOMMENDATIONS_REFRESH_MINUTES * 60
+    period = int((now or datetime.now(timezone.utc)).timestamp() // period_seconds)
+    full_every = max(round(settings.RECOMMENDATIONS_FULL_REBUILD_HOURS * 3600 / period_seconds), 1)
+    job_service.enqueue(
+        db, "recommendations.refresh", {"full": period % full_every == 0},
+        priority=job_service.PRIORITY_LOW,
+        idempotency_key=f"recommendations.refresh:{period}"
+    )
+    db.commit()
+
+
+def build_interaction_matrix(
+    user_ids: np.ndarray, book_ids: np.ndarray, values: np.ndarray
+) -> Tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+    """
+    Build the user x book interaction matrix
+
+    Values of the same user and book are summed; pairs that end up zero or
+    negative (e.g. a 1-star rating of a bookmarked book) are dropped.
+
+    Returns:
+        (matrix, user ID of each row, book ID of each column)
+    """
+    users, rows = np.unique(user_ids, return_inverse=True)
+    books, columns = np.unique(book_ids, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (values.astype(np.float64), (rows, columns)), shape=(len(users), len(books))
+    )
+    matrix.sum_duplicates()
+    matrix.data[matrix.data < 0] = 0
+    matrix.eliminate_zeros()
+    return matrix, users, books
+
+
+def compute_similar_books(
+    matrix: sparse.csr_matrix,
+    book_ids: np.ndarray,
+    columns: np.ndarray,
+    top_n: int,
+    min_common_readers: int = 1
+) -> Iterator[Tuple[int, List[int], List[float]]]:
+    """
+    Most similar books of some columns of an interaction matrix by cosine similarity
+
+    Args:
+        book_ids: Book ID of each column
+        columns: Columns to compute lists for
+        min_common_readers: Pairs with fewer users in common are left out
+
+    Yields:
+        (book_id, similar book IDs, scores), most similar first (possibly empty)
+    """
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    inverse_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    normalized = (matrix @ sparse.diags(inverse_norms)).tocsr()
+    normalized_columns = normalized.tocsc()
+
+    readers = readers_columns = None
+    if min_common_readers > 1:
+        readers = matrix.copy()
+        readers.data[:] = 1.0
+        readers_columns = readers.tocsc()
+
+    for start in range(0, len(columns), BLOCK_SIZE):
+        block = columns[start:start + BLOCK_SIZE]
+        similarity = (normalized_columns[:, block].T @ normalized).tocsr()
+        if readers is not None:
+            common = (readers_columns[:, block].T @ readers).tocsr()
+            similarity = similarity.multiply(common >= min_common_readers).tocsr()
+
+        for row, column in enumerate(block):
+            begin, end = similarity.indptr[row], similarity.indptr[row + 1]
+            indices = similarity.indices[begin:end]
+            scores = similarity.data[begin:end]
+            keep = (indices != column) & (scores > 0)
+            indices, scores = indices[keep], scores[keep]
+            if len(scores) > top_n:
+                best = np.argpartition(-scores, top_n)[:top_n]
+                indices, scores = indices[best], scores[best]
+            order = np.argsort(-scores, kind="stable")
+            yield (
+                int(book_ids[column]),
+                book_ids[indices[order]].astype(int).tolist(),
+                np.round(scores[order], 6).tolist(),
+            )
+
+
+def get_similar_books(db: Session, book_id: int, limit: int = 10) -> List[Tuple[Book, float]]:
+    """Books most often read by readers of a book, with their similarity"""
+    recommendation = db.get(BookRecommendation, book_id)
+    if not recommendation:
+        return []
+    scored = list(zip(recommendation.similar_book_ids, recommendation.scores))
+    return _load_ranked_books(db, scored, limit)
+
+
+def get_user_recommendations(db: Session, user_id: int, limit: int = 20) -> List[Tuple[Book, float]]:
+    """
+    Books similar to a user's recently read, bookmarked and rated books
+
+    Each candidate scores the sum, over the user's recent books, of the
+    book's interaction strength times its similarity to the candidate.
+    Books the user has already interacted with are left out.
+    """
+    seeds = _get_recent_books(db, user_id, settings.RECOMMENDATIONS_USER_HISTORY)
+    if not seeds:
+        return []
+
+    candidates: Dict[int, float] = {}
+    for recommendation in db.query(BookRecommendation).filter(BookRecommendation.book_id.in_(list(seeds))):
+        weight = seeds[recommendation.book_id]
+        for similar_id, score in zip(recommendation.similar_book_ids, recommendation.scores):
+            if similar_id not in seeds:
+                candidates[similar_id] = candidates.get(similar_id, 0.0) + weight * score
+
+    # Extra candidates make up for books left out as drafts
+    scored = heapq.nlargest(limit * 2, candidates.items(), key=lambda item: item[1])
+    return _load_ranked_books(db, scored, limit)
+
+
+def _load_ranked_books(db: Session, scored: List[Tuple[int, float]], limit: int) -> List[Tuple[Book, float]]:
+    """Load scored books in order, leaving out drafts and deleted books"""
+    if not scored:
+        return []
+    books = {
+        book.id: book
+        for book in db.query(Book).filter(
+            Book.id.in_([book_id for book_id, _ in scored]),
+            Book.status != BookStatus.DRAFT
+        )
+    }
+    results = [(books[book_id], score) for book_id, score in scored if book_id in books]
+    return results[:limit]
+
+
+def _load_interactions(db: Session) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Read every interaction as parallel arrays
+
+    Returns:
+        (user IDs, book IDs, interaction strengths)
+    """
+    bookmarks = _fetch_array(db, select(Bookmark.user_id, Bookmark.book_id), 2)
+    ratings = _fetch_array(db, select(Rating.user_id, Rating.book_id, Rating.rating), 3)
+    progress = _fetch_array(
+        db, select(ReadingProgress.user_id, ReadingProgress.book_id, ReadingProgress.progress_percentage), 3
+    )
+
+    values = np.concatenate([
+        np.full(len(bookmarks), BOOKMARK_WEIGHT),
+        RATING_WEIGHT * (ratings[:, 2] - 3) / 2,
+        READ_WEIGHT * (0.5 + np.clip(progress[:, 2], 0, 100) / 200),
+    ])
+    user_ids = np.concatenate([bookmarks[:, 0], ratings[:, 0], progress[:, 0]]).astype(np.int64)
+    book_ids = np.concatenate([bookmarks[:, 1], ratings[:, 1], progress[:, 1]]).astype(np.int64)
+    return user_ids, book_ids, values
+
+
+def _fetch_array(db: Session, stmt, width: int) -> np.ndarray:
+    """Stream a query's rows into a float array of shape (rows, width)"""
+    chunks = [
+        np.array(partition, dtype=np.float64).reshape(-1, width)
+        for partition in db.execute(stmt.execution_options(yield_per=FETCH_SIZE)).partitions()
+    ]
+    return np.concatenate(chunks) if chunks else np.empty((0, width))
+
+
+def _get_changed_user_ids(db: Session, since: datetime) -> np.ndarray:
+    """Users who bookmarked, rated or read something since a time"""
+    stmt = union(
+        select(Bookmark.user_id).where(Bookmark.updated_at > since),
+        select(Rating.user_id).where(Rating.updated_at > since),
+        select(ReadingProgress.user_id).where(ReadingProgress.updated_at > since),
+    )
+    return np.array([user_id for (user_id,) in db.execute(stmt)], dtype=np.int64)
+
+
+def _get_recent_books(db: Session, user_id: int, limit: int) -> Dict[int, float]:
+    """A user's most recent books with their interaction strength"""
+    seeds: Dict[int, float] = {}
+    for (book_id,) in db.query(Bookmark.book_id).filter(
+        Bookmark.user_id == user_id
+    ).order_by(Bookmark.updated_at.desc()).limit(limit):
+        seeds[book_id] = seeds.get(book_id, 0.0) + BOOKMARK_WEIGHT
+    for book_id, rating in db.query(Rating.book_id, Rating.rating).filter(
+        Rating.user_id == user_id
+    ).order_by(Rating.updated_at.desc()).limit(limit):
+        seeds[book_id] = seeds.get(book_id, 0.0) + RATING_WEIGHT * (rating - 3) / 2
+    for book_id, percentage in db.query(ReadingProgress.book_id, ReadingProgress.progress_percentage).filter(
+        ReadingProgress.user_id == user_id
+    ).order_by(ReadingProgress.updated_at.desc()).limit(limit):
+        seeds[book_id] = seeds.get(book_id, 0.0) + READ_WEIGHT * (0.5 + min(max(percentage, 0), 100) / 200)
+    # Disliked books still count as seen, but do not pull in similar books
+    return {book_id: max(weight, 0.0) for book_id, weight in seeds.items()}
+
+
+def _write_lists(db: Session, rows: List[dict]) -> int:
+    """Upsert a batch of recommendation lists (of books that still exist)"""
+    existing = {book_id for (book_id,) in db.query(Book.id).filter(Book.id.in_([row["book_id"] for row in rows]))}
+    rows = [row for row in rows if row["book_id"] in existing]
+    if not rows:
+        return 0
+    stmt = pg_insert(BookRecommendation).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BookRecommendation.book_id],
+        set_={
+            "similar_book_ids": stmt.excluded.similar_book_ids,
+            "scores": stmt.excluded.scores,
+            "computed_at": stmt.excluded.computed_at,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    db.execute(stmt)
+    return len(rows)
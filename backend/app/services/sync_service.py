@@ -0,0 +1,57 @@
+"""
+Sync service layer - Shared helpers for offline client batch writes
+
+Offline clients replay queued writes with the time they happened on the
+device. Conflicts are resolved last-writer-wins per key using those client
+timestamps.
+"""
+from typing import List, Dict, Tuple, Any
+from datetime import datetime, timezone
+from app.schemas.sync import SyncItemResult, SyncItemStatus
+
+
+def normalize_client_timestamp(client_timestamp: datetime, now: datetime) -> datetime:
+    """
+    Make a client timestamp comparable with stored timestamps
+
+    Naive timestamps are treated as UTC. Timestamps in the future (skewed
+    device clocks) are clamped to the server time so they cannot win every
+    later conflict.
+    """
+    if client_timestamp.tzinfo is None:
+        client_timestamp = client_timestamp.replace(tzinfo=timezone.utc)
+    return min(client_timestamp, now)
+
+
+def latest_item_per_book(items: List[Any]) -> Tuple[Dict[int, Tuple[int, Any]], List[int]]:
+    """
+    Collapse batch items to the newest one per book_id
+
+    Returns tuple of ({book_id: (index, item)}, superseded indexes).
+    Ties keep the item that appears later in the batch.
+    """
+    latest: Dict[int, Tuple[int, Any]] = {}
+    superseded: List[int] = []
+
+    for index, item in enumerate(items):
+        current = latest.get(item.book_id)
+        if current is None:
+            latest[item.book_id] = (index, item)
+        elif item.client_timestamp >= current[1].client_timestamp:
+            superseded.append(current[0])
+            latest[item.book_id] = (index, item)
+        else:
+            superseded.append(index)
+
+    return latest, superseded
+
+
+def build_batch_response(results: List[SyncItemResult]) -> Dict:
+    """Build the batch response with per-status totals, ordered as requested"""
+    results = sorted(results, key=lambda result: result.index)
+    return {
+        "results": results,
+        "applied": sum(1 for r in results if r.status == SyncItemStatus.APPLIED),
+        "superseded": sum(1 for r in results if r.status == SyncItemStatus.SUPERSEDED),
+        "invalid": sum(1 for r in results if r.status == SyncItemStatus.INVALID),
+    }
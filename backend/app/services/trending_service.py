@@ -0,0 +1,271 @@
+"""
+Trending service layer - Time-decayed popularity scores from book activity
+
+Activity (views, likes, new ratings, bookmarks and comments) is counted per
+book in hourly buckets and folded into a forward-decayed score: activity in
+the bucket starting at t adds weight * count * exp(rate * (t - SCORE_EPOCH)),
+with rate = ln 2 / TRENDING_HALF_LIFE_HOURS. Scores are stored as logs so they
+never overflow. Every book's decayed score today is its stored score divided
+by the same exp(rate * (now - SCORE_EPOCH)), so rankings only change when a
+book gets new activity, never just because time passes.
+
+Changing SIGNAL_WEIGHTS or TRENDING_HALF_LIFE_HOURS only affects new activity;
+run rebuild_scores (the "trending.rebuild_scores" job) to rescore the buckets.
+"""
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Tuple, Iterable
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.book import Book, BookStatus
+from app.models.book_activity import BookActivityBucket, BookTrendingScore
+
+# Weight of one activity of each kind
+SIGNAL_WEIGHTS: Dict[str, float] = {
+    "views": 1.0,
+    "likes": 5.0,
+    "ratings": 8.0,
+    "bookmarks": 6.0,
+    "comments": 4.0,
+}
+
+# Reference time of the forward-decayed scores
+SCORE_EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+BUCKET_SECONDS = 3600
+
+BucketKey = Tuple[int, datetime]  # (book_id, bucket_start)
+BucketCounts = Dict[str, int]  # signal -> count
+
+
+def get_bucket_start(at: datetime) -> datetime:
+    """Start of the hourly bucket containing a time"""
+    seconds = int(at.timestamp()) // BUCKET_SECONDS * BUCKET_SECONDS
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+
+def get_decay_rate() -> float:
+    """Decay per second that halves a score every TRENDING_HALF_LIFE_HOURS"""
+    return math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def get_current_score(log_score: float, now: Optional[datetime] = None) -> float:
+    """Decayed weighted activity of a book now (each activity halves per half-life)"""
+    now = now or datetime.now(timezone.utc)
+    return math.exp(log_score - get_decay_rate() * (now - SCORE_EPOCH).total_seconds())
+
+
+def score_buckets(buckets: Iterable[Tuple[int, datetime, BucketCounts]]) -> Dict[int, Tuple[float, datetime]]:
+    """
+    Fold bucket counts into per-book scores
+
+    Returns:
+        Dictionary of book_id -> (log_score, start of the latest bucket)
+    """
+    rate = get_decay_rate()
+    scores: Dict[int, Tuple[float, datetime]] = {}
+    for book_id, bucket_start, counts in buckets:
+        weight = sum(SIGNAL_WEIGHTS[signal] * count for signal, count in counts.items() if count)
+        if weight <= 0:
+            continue
+        log_weight = math.log(weight) + rate * (bucket_start - SCORE_EPOCH).total_seconds()
+        if book_id in scores:
+            log_score, last_activity_at = scores[book_id]
+            scores[book_id] = (_log_add(log_score, log_weight), max(last_activity_at, bucket_start))
+        else:
+            scores[book_id] = (log_weight, bucket_start)
+    return scores
+
+
+def write_activity(db: Session, buckets: Dict[BucketKey, BucketCounts]) -> int:
+    """
+    Add activity counts to their buckets and to the books' scores (commits)
+
+    Rows are written in key order so concurrent writers from several processes
+    lock them in the same order.
+
+    Returns:
+        Number of buckets written
+    """
+    if not buckets:
+        return 0
+
+    keys = sorted(buckets)
+    now = datetime.utcnow()
+    bucket_rows = [
+        {
+            "book_id": book_id,
+            "bucket_start": bucket_start,
+            **{signal: buckets[(book_id, bucket_start)].get(signal, 0) for signal in SIGNAL_WEIGHTS},
+            "created_at": now,
+            "updated_at": now,
+        }
+        for book_id, bucket_start in keys
+    ]
+    stmt = pg_insert(BookActivityBucket).values(bucket_rows)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_book_activity_bucket",
+        set_={
+            **{
+                signal: getattr(BookActivityBucket, signal) + getattr(stmt.excluded, signal)
+                for signal in SIGNAL_WEIGHTS
+            },
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    db.execute(stmt)
+
+    scores = score_buckets((book_id, bucket_start, buckets[(book_id, bucket_start)]) for book_id, bucket_start in keys)
+    if scores:
+        stmt = pg_insert(BookTrendingScore).values([
+            {"book_id": book_id, "log_score": log_score, "last_activity_at": last_activity_at, "created_at": now}
+            for book_id, (log_score, last_activity_at) in sorted(scores.items())
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[BookTrendingScore.book_id],
+            set_={
+                "log_score": _sql_log_add(BookTrendingScore.log_score, stmt.excluded.log_score),
+                "last_activity_at": func.greatest(BookTrendingScore.last_activity_at, stmt.excluded.last_activity_at),
+                "updated_at": func.now(),
+            }
+        )
+        db.execute(stmt)
+
+    db.commit()
+    return len(bucket_rows)
+
+
+def get_existing_book_ids(db: Session, book_ids: Iterable[int]) -> set:
+    """Subset of book IDs that still exist"""
+    return {book_id for (book_id,) in db.query(Book.id).filter(Book.id.in_(list(set(book_ids))))}
+
+
+def get_scores(
+    db: Session, changed_since: Optional[datetime] = None, book_ids: Optional[List[int]] = None
+) -> List[Tuple]:
+    """
+    Get book scores with the fields rankings are keyed on
+
+    Without arguments, returns the books active within TRENDING_WINDOW_DAYS.
+
+    Args:
+        changed_since: Only scores changed after this (database) time
+        book_ids: Only these books
+
+    Returns:
+        Rows of (book_id, log_score, last_activity_at, updated_at, genre, tags, status)
+    """
+    query = db.query(
+        BookTrendingScore.book_id,
+        BookTrendingScore.log_score,
+        BookTrendingScore.last_activity_at,
+        BookTrendingScore.updated_at,
+        Book.genre,
+        Book.tags,
+        Book.status,
+    ).join(Book, Book.id == BookTrendingScore.book_id)
+
+    if book_ids is not None:
+        query = query.filter(BookTrendingScore.book_id.in_(book_ids))
+    elif changed_since is not None:
+        query = query.filter(BookTrendingScore.updated_at > changed_since)
+    else:
+        window_start = datetime.now(timezone.utc) - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+        query = query.filter(BookTrendingScore.last_activity_at >= window_start)
+    return query.all()
+
+
+def get_trending_books(
+    db: Session, ranked: List[Tuple[int, float]], genre: Optional[str] = None, tag: Optional[str] = None
+) -> List[Tuple[Book, float]]:
+    """
+    Load ranked books in rank order
+
+    Books deleted, unpublished or moved out of the genre or tag since the
+    ranking was last refreshed are left out.
+
+    Args:
+        ranked: (book_id, log_score) pairs, best first
+    """
+    if not ranked:
+        return []
+
+    books = {
+        book.id: book
+        for book in db.query(Book).filter(
+            Book.id.in_([book_id for book_id, _ in ranked]),
+            Book.status != BookStatus.DRAFT
+        )
+    }
+    now = datetime.now(timezone.utc)
+    results = []
+    for book_id, log_score in ranked:
+        book = books.get(book_id)
+        if not book:
+            continue
+        if genre is not None and book.genre != genre:
+            continue
+        if tag is not None and tag not in (book.tags or []):
+            continue
+        results.append((book, get_current_score(log_score, now)))
+    return results
+
+
+def rebuild_scores(db: Session) -> int:
+    """
+    Recompute every score from the activity buckets (commits)
+
+    Returns:
+        Number of books scored
+    """
+    buckets = db.query(
+        BookActivityBucket.book_id,
+        BookActivityBucket.bucket_start,
+        *[getattr(BookActivityBucket, signal) for signal in SIGNAL_WEIGHTS]
+    ).yield_per(5000)
+    scores = score_buckets(
+        (row[0], row[1], dict(zip(SIGNAL_WEIGHTS, row[2:])))
+        for row in buckets
+    )
+
+    db.execute(delete(BookTrendingScore), execution_options={"synchronize_session": False})
+    now = datetime.utcnow()
+    rows = [
+        {"book_id": book_id, "log_score": log_score, "last_activity_at": last_activity_at, "created_at": now}
+        for book_id, (log_score, last_activity_at) in scores.items()
+    ]
+    for start in range(0, len(rows), 1000):
+        db.execute(BookTrendingScore.__table__.insert(), rows[start:start + 1000])
+    db.commit()
+    return len(rows)
+
+
+def purge_buckets(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Delete activity buckets older than TRENDING_BUCKET_RETENTION_DAYS (commits)
+
+    Returns:
+        Number of buckets deleted
+    """
+    now = now or datetime.now(timezone.utc)
+    result = db.execute(
+        delete(BookActivityBucket).where(
+            BookActivityBucket.bucket_start < now - timedelta(days=settings.TRENDING_BUCKET_RETENTION_DAYS)
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return result.rowcount
+
+
+def _log_add(a: float, b: float) -> float:
+    """log(exp(a) + exp(b)) without overflow"""
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log1p(math.exp(low - high))
+
+
+def _sql_log_add(a, b):
+    """SQL log(exp(a) + exp(b)); the exponent is clamped since Postgres raises on underflow"""
+    return func.greatest(a, b) + func.ln(1 + func.exp(-func.least(func.abs(a - b), 50.0)))
@@ -0,0 +1,333 @@
+"""
+Trending tracker - Buffers book activity and serves trending rankings from memory
+
+Services report activity with trending_tracker.record after committing. Counts
+are kept in memory per (book, hour) and written with one bulk upsert every
+TRENDING_FLUSH_SECONDS. After each flush the tracker reads the scores changed
+since its last read (by any process) and updates its rankings incrementally:
+the overall top TRENDING_TOP_K books and the top books of every genre and tag.
+
+Scores only grow (see trending_service), so a book that falls out of a top-K
+list can only come back through new activity, which reaches the tracker as a
+changed score. Books whose last activity is older than TRENDING_WINDOW_DAYS
+are skipped when serving and dropped by the full reload every
+TRENDING_REBUILD_SECONDS.
+
+Each worker process keeps its own buffer and rankings.
+"""
+import bisect
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Set, Tuple, Any
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.book import BookStatus
+from app.services import trending_service
+from app.services.event_bus import EventBus, event_bus
+
+logger = logging.getLogger(__name__)
+
+# Rescan this far back on each incremental read, for score changes committed late
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+# Book fields that decide which rankings a book is in
+RANKING_FIELDS = {"genre", "tags", "status"}
+
+
+def get_ranking_key(genre: Optional[str] = None, tag: Optional[str] = None) -> str:
+    """Key of the overall ranking ("") or a genre's or tag's ranking"""
+    if genre is not None:
+        return f"genre:{genre}"
+    if tag is not None:
+        return f"tag:{tag}"
+    return ""
+
+
+class _Ranking:
+    """Top K books of one ranking, best first"""
+
+    def __init__(self, k: int):
+        self.k = k
+        self.entries: List[Tuple[float, int]] = []  # (-log_score, book_id), ascending
+        self.scores: Dict[int, float] = {}
+
+    def offer(self, book_id: int, log_score: float) -> None:
+        """Insert or move a book, keeping only the best K"""
+        old_score = self.scores.pop(book_id, None)
+        if old_score is not None:
+            del self.entries[bisect.bisect_left(self.entries, (-old_score, book_id))]
+        elif len(self.entries) >= self.k and (-log_score, book_id) >= self.entries[-1]:
+            return
+
+        bisect.insort(self.entries, (-log_score, book_id))
+        self.scores[book_id] = log_score
+        if len(self.entries) > self.k:
+            _, evicted = self.entries.pop()
+            del self.scores[evicted]
+
+    def discard(self, book_id: int) -> None:
+        old_score = self.scores.pop(book_id, None)
+        if old_score is not None:
+            del self.entries[bisect.bisect_left(self.entries, (-old_score, book_id))]
+
+
+class TrendingIndex:
+    """In-memory top-K rankings, overall and per genre and tag"""
+
+    def __init__(self, k: int):
+        self.k = k
+        self._lock = threading.Lock()
+        self._books: Dict[int, Tuple[datetime, List[str]]] = {}  # book_id -> (last activity, ranking keys)
+        self._rankings: Dict[str, _Ranking] = {}
+
+    def update(
+        self, book_id: int, log_score: float, last_activity_at: datetime,
+        genre: Optional[str], tags: Optional[List[str]], listed: bool = True
+    ) -> None:
+        """Apply a book's current score (unlisted books are removed)"""
+        keys = [get_ranking_key()]
+        if genre:
+            keys.append(get_ranking_key(genre=genre))
+        keys.extend(get_ranking_key(tag=tag) for tag in set(tags or []))
+
+        with self._lock:
+            self._discard(book_id)
+            if not listed:
+                return
+            self._books[book_id] = (last_activity_at, keys)
+            for key in keys:
+                ranking = self._rankings.get(key)
+                if ranking is None:
+                    ranking = self._rankings[key] = _Ranking(self.k)
+                ranking.offer(book_id, log_score)
+
+    def remove(self, book_id: int) -> None:
+        with self._lock:
+            self._discard(book_id)
+
+    def top(self, key: str, limit: int, active_since: datetime) -> List[Tuple[int, float]]:
+        """
+        Best books of a ranking with activity since a time, in O(K)
+
+        Returns:
+            (book_id, log_score) pairs, best first
+        """
+        with self._lock:
+            ranking = self._rankings.get(key)
+            if ranking is None:
+                return []
+            results = []
+            for negative_score, book_id in ranking.entries:
+                if self._books[book_id][0] < active_since:
+                    continue
+                results.append((book_id, -negative_score))
+                if len(results) >= limit:
+                    break
+            return results
+
+    def _discard(self, book_id: int) -> None:
+        """Remove a book from its rankings (caller must hold the lock)"""
+        entry = self._books.pop(book_id, None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            ranking = self._rankings[key]
+            ranking.discard(book_id)
+            if not ranking.entries:
+                del self._rankings[key]
+
+
+class TrendingTracker:
+    """Activity buffer plus this process's trending rankings"""
+
+    def __init__(self, bus: EventBus, flush_interval_seconds: float, rebuild_interval_seconds: float, top_k: int):
+        self.bus = bus
+        self.flush_interval_seconds = flush_interval_seconds
+        self.rebuild_interval_seconds = rebuild_interval_seconds
+        self.top_k = top_k
+        self.index = TrendingIndex(top_k)
+        self._lock = threading.Lock()
+        self._pending: Dict[trending_service.BucketKey, Dict[str, int]] = {}
+        self._dirty: Set[int] = set()  # Books whose ranking fields changed
+        self._synced_to: Optional[datetime] = None  # Latest score change applied (database time)
+        self._last_rebuild: Optional[float] = None  # monotonic time
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, book_id: int, signal: str, count: int = 1) -> None:
+        """Count activity on a book (signal is a key of trending_service.SIGNAL_WEIGHTS)"""
+        key = (book_id, trending_service.get_bucket_start(datetime.now(timezone.utc)))
+        with self._lock:
+            counts = self._pending.setdefault(key, {})
+            counts[signal] = counts.get(signal, 0) + count
+
+    def get_trending(self, genre: Optional[str] = None, tag: Optional[str] = None, limit: int = 20) -> List[Tuple[int, float]]:
+        """
+        Top books overall, of a genre or of a tag
+
+        Returns:
+            (book_id, log_score) pairs, best first
+        """
+        active_since = datetime.now(timezone.utc) - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+        return self.index.top(get_ranking_key(genre=genre, tag=tag), limit, active_since)
+
+    def flush(self) -> int:
+        """
+        Write buffered activity
+
+        Returns:
+            Number of buckets written
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        db = SessionLocal()
+        try:
+            try:
+                return trending_service.write_activity(db, pending)
+            except IntegrityError:
+                # A book was deleted: retry without it
+                db.rollback()
+                existing = trending_service.get_existing_book_ids(db, [book_id for book_id, _ in pending])
+                pending = {key: counts for key, counts in pending.items() if key[0] in existing}
+                return trending_service.write_activity(db, pending)
+        except Exception:
+            db.rollback()
+            self._requeue(pending)
+            raise
+        finally:
+            db.close()
+
+    def refresh(self) -> None:
+        """Apply score and book changes to the rankings (a full reload when due)"""
+        now = time.monotonic()
+        if self._last_rebuild is None or now - self._last_rebuild >= self.rebuild_interval_seconds:
+            self._reload()
+            self._last_rebuild = now
+            return
+
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        db = SessionLocal()
+        try:
+            rows = trending_service.get_scores(db, changed_since=self._synced_to - REFRESH_OVERLAP)
+            if dirty:
+                dirty_rows = trending_service.get_scores(db, book_ids=list(dirty))
+                rows.extend(dirty_rows)
+                # Books gone from the scores table were deleted
+                for book_id in dirty - {row.book_id for row in dirty_rows}:
+                    self.index.remove(book_id)
+        except Exception:
+            with self._lock:
+                self._dirty |= dirty
+            raise
+        finally:
+            db.close()
+        self._apply(self.index, rows)
+
+    def start(self) -> None:
+        """Load the rankings and start the flush/refresh thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self.bus.subscribe("book.updated", self._on_book_updated)
+        self.bus.subscribe("book.deleted", self._on_book_deleted)
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Failed to load trending rankings")
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="trending-tracker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread and write everything still buffered"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval_seconds + 5)
+            self._thread = None
+        self.bus.unsubscribe(self._on_book_updated)
+        self.bus.unsubscribe(self._on_book_deleted)
+        self.flush()
+
+    def _run(self) -> None:
+        """Thread loop: flush activity, then pick up every process's score changes"""
+        last_purge = 0.0
+        while not self._stop_event.wait(self.flush_interval_seconds):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to write buffered book activity")
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh trending rankings")
+            if time.monotonic() - last_purge >= self.rebuild_interval_seconds:
+                last_purge = time.monotonic()
+                self._purge()
+
+    def _reload(self) -> None:
+        """Rebuild the rankings from every book active in the window"""
+        db = SessionLocal()
+        try:
+            rows = trending_service.get_scores(db)
+        finally:
+            db.close()
+        index = TrendingIndex(self.top_k)
+        self._synced_to = None
+        self._apply(index, rows)
+        if self._synced_to is None:
+            self._synced_to = datetime.now(timezone.utc)
+        self.index = index
+
+    def _apply(self, index: TrendingIndex, rows: List[Tuple]) -> None:
+        for row in rows:
+            index.update(
+                row.book_id, row.log_score, row.last_activity_at,
+                row.genre, row.tags, listed=row.status != BookStatus.DRAFT
+            )
+            if self._synced_to is None or row.updated_at > self._synced_to:
+                self._synced_to = row.updated_at
+
+    def _purge(self) -> None:
+        db = SessionLocal()
+        try:
+            purged = trending_service.purge_buckets(db)
+        except Exception:
+            logger.exception("Failed to purge old book activity")
+            return
+        finally:
+            db.close()
+        if purged:
+            logger.info("Purged %d old book activity buckets", purged)
+
+    def _on_book_updated(self, event: Dict[str, Any]) -> None:
+        if RANKING_FIELDS & set(event["payload"].get("fields", [])):
+            with self._lock:
+                self._dirty.add(event["aggregate_id"])
+
+    def _on_book_deleted(self, event: Dict[str, Any]) -> None:
+        self.index.remove(event["aggregate_id"])
+
+    def _requeue(self, pending: Dict[trending_service.BucketKey, Dict[str, int]]) -> None:
+        """Merge counts back after a failed flush"""
+        with self._lock:
+            for key, counts in pending.items():
+                merged = self._pending.setdefault(key, {})
+                for signal, count in counts.items():
+                    merged[signal] = merged.get(signal, 0) + count
+
+
+# Process-wide tracker instance
+trending_tracker = TrendingTracker(
+    bus=event_bus,
+    flush_interval_seconds=settings.TRENDING_FLUSH_SECONDS,
+    rebuild_interval_seconds=settings.TRENDING_REBUILD_SECONDS,
+    top_k=settings.TRENDING_TOP_K,
+)
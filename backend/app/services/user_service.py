@@ -5,11 +5,13 @@ from typing import Optional
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
+from app.core.cache import cached, invalidate_tags
 from app.core.security import get_password_hash, verify_password
 
 
+@cached("users", key="{user_id}", tags=("user:{user_id}",), model=User)
 def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
-    """Get user by ID"""
+    """Get user by ID (cached)"""
     return db.query(User).filter(User.id == user_id).first()
 
 
@@ -67,6 +69,7 @@ def update_user(db: Session, user: User, user_update: UserUpdate) -> User:
         setattr(user, field, value)
     
     db.commit()
+    invalidate_tags(f"user:{user.id}")
     db.refresh(user)
     return user
 
@@ -102,5 +105,6 @@ def change_password(db: Session, user: User, old_password: str, new_password: st
     # Update password
     user.password_hash = get_password_hash(new_password)
     db.commit()
+    invalidate_tags(f"user:{user.id}")
     return True
 
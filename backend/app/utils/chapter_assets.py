@@ -0,0 +1,142 @@
+"""
+Interactive chapter asset manifest
+Collects the images and audio referenced by interactive nodes so readers can prefetch them
+
+Manifest format:
+    {
+        "version": 1,
+        "total_size": 48213,           # sum of known sizes in bytes
+        "assets": [                    # ordered by first reachable use
+            {"url": "/uploads/images/chapters/bg.jpg", "kind": "image",
+             "first_node": "start", "size": 48213},
+            ...
+        ]
+    }
+"""
+import mimetypes
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+ASSET_MANIFEST_VERSION = 1
+
+# Node keys that hold asset URLs, with the kind assumed when the extension is unknown
+ASSET_KEYS = {
+    "background": "image",
+    "sprite": "image",
+    "image": "image",
+    "image_url": "image",
+    "src": "image",
+    "music": "audio",
+    "sound": "audio",
+    "audio": "audio",
+    "video": "video",
+}
+
+# Link header "as" value for each asset kind
+PRELOAD_AS = {"image": "image", "audio": "audio", "video": "video"}
+
+# Characters left as-is when quoting URLs for the Link header (everything but <, > and spaces)
+_URL_SAFE_CHARS = "/:?#[]@!$&'()*+,;=%~"
+
+
+def get_asset_kind(url: str, key: str) -> str:
+    """Guess an asset's kind from its extension, falling back to the node key"""
+    mime_type, _ = mimetypes.guess_type(url)
+    if mime_type:
+        kind = mime_type.split("/", 1)[0]
+        if kind in PRELOAD_AS:
+            return kind
+    return ASSET_KEYS[key]
+
+
+def extract_node_assets(node: Any) -> List[Tuple[str, str]]:
+    """
+    Get (url, kind) pairs referenced by a node, in document order
+    Nested objects (e.g. choice options, character cards) are searched too.
+    """
+    assets = []
+    stack = [node]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            nested = []
+            for key, item in value.items():
+                if key in ASSET_KEYS and isinstance(item, str) and item:
+                    assets.append((item, get_asset_kind(item, key)))
+                elif isinstance(item, (dict, list)):
+                    nested.append(item)
+            stack.extend(reversed(nested))
+        elif isinstance(value, list):
+            stack.extend(reversed(value))
+    return assets
+
+
+def build_asset_manifest(
+    nodes: List[Dict[str, Any]],
+    compiled_graph: Dict[str, Any],
+    get_size: Callable[[str], Optional[int]]
+) -> Dict[str, Any]:
+    """
+    Build the asset manifest of an interactive chapter
+
+    Nodes are visited breadth-first from the entry node along the compiled
+    edges, so assets appear in the order a reader can first reach them;
+    assets only used by unreachable nodes come last.
+
+    Args:
+        nodes: content_data["nodes"]
+        compiled_graph: Output of compile_chapter_graph for the same nodes
+        get_size: Returns the size in bytes of an asset URL, or None if unknown
+    """
+    edges = compiled_graph["edges"]
+    order = _breadth_first_order(edges, compiled_graph["entry"])
+
+    assets = []
+    seen = set()
+    for position in order:
+        node = nodes[position]
+        for url, kind in extract_node_assets(node):
+            if url in seen:
+                continue
+            seen.add(url)
+            assets.append({
+                "url": url,
+                "kind": kind,
+                "first_node": node["id"],
+                "size": get_size(url),
+            })
+
+    return {
+        "version": ASSET_MANIFEST_VERSION,
+        "total_size": sum(asset["size"] or 0 for asset in assets),
+        "assets": assets,
+    }
+
+
+def build_preload_header(assets: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    """Build a Link header value preloading the first `limit` assets"""
+    links = [
+        f"<{quote(asset['url'], safe=_URL_SAFE_CHARS)}>; rel=preload; as={PRELOAD_AS[asset['kind']]}"
+        for asset in assets[:limit]
+    ]
+    return ", ".join(links) if links else None
+
+
+def _breadth_first_order(edges: List[List[int]], entry: Optional[int]) -> List[int]:
+    """All positions: reachable ones in BFS order from entry, then the rest"""
+    order = []
+    seen = [False] * len(edges)
+    if entry is not None:
+        seen[entry] = True
+        queue = deque([entry])
+        while queue:
+            position = queue.popleft()
+            order.append(position)
+            for target in edges[position]:
+                if not seen[target]:
+                    seen[target] = True
+                    queue.append(target)
+
+    order.extend(position for position, reached in enumerate(seen) if not reached)
+    return order
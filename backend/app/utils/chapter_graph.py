@@ -0,0 +1,209 @@
+"""
+Interactive chapter graph compiler
+Validates the node graph in content_data and builds a compact index for readers
+
+Interactive chapters store content_data["nodes"] as a flat list of dicts linked
+by ids: a node's "next" and each choice option's "next" name another node, or
+"end" to finish the chapter. The compiled form maps every id to its position
+in the list and stores outgoing edges by position, so a reader can jump to any
+node in O(1) without rebuilding the graph.
+
+Compiled graph format:
+    {
+        "version": 1,
+        "node_count": 4,
+        "entry": 0,                      # index of the first node shown
+        "index": {"start": 0, ...},      # node id -> position in nodes
+        "edges": [[1], [2, 3], [], []],  # outgoing targets by position
+        "unreachable": ["orphan"],       # ids not reachable from entry
+        "cycles": ["crossroads"]         # ids that loop back (re-entry points)
+    }
+"""
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+COMPILED_GRAPH_VERSION = 1
+
+# Targets that end the chapter instead of naming a node
+TERMINAL_TARGETS = {"end"}
+
+# Preferred entry node id; falls back to the first node
+ENTRY_NODE_ID = "start"
+
+# Keys holding lists of choice options, each with its own "next"
+CHOICE_KEYS = ("options", "choices")
+
+
+class ChapterGraphError(ValueError):
+    """Raised when an interactive chapter's node graph is invalid"""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__("Invalid interactive chapter: " + "; ".join(errors))
+
+
+def get_node_targets(node: Dict[str, Any]) -> List[Any]:
+    """Get the raw targets a node links to: "next" first, then choice options"""
+    targets = []
+    if node.get("next") is not None:
+        targets.append(node["next"])
+
+    for key in CHOICE_KEYS:
+        options = node.get(key)
+        if isinstance(options, list):
+            for option in options:
+                if isinstance(option, dict) and option.get("next") is not None:
+                    targets.append(option["next"])
+
+    return targets
+
+
+def compile_chapter_graph(nodes: List[Any]) -> Dict[str, Any]:
+    """
+    Validate an interactive node list and build its compiled graph
+
+    Raises ChapterGraphError for nodes without an id, duplicate ids and
+    dangling targets. Unreachable nodes and cycles are allowed (loops are
+    common in branching stories, unreachable nodes in drafts) and are
+    reported in the result instead.
+    """
+    errors = []
+    index: Dict[str, int] = {}
+
+    for position, node in enumerate(nodes):
+        if not isinstance(node, dict):
+            errors.append(f"node at position {position} is not an object")
+            continue
+        node_id = node.get("id")
+        if not isinstance(node_id, str) or not node_id:
+            errors.append(f"node at position {position} has no 'id'")
+            continue
+        if node_id in index:
+            errors.append(f"duplicate node id '{node_id}'")
+            continue
+        index[node_id] = position
+
+    edges: List[List[int]] = []
+    for position, node in enumerate(nodes):
+        node_edges = []
+        if isinstance(node, dict):
+            for target in get_node_targets(node):
+                if not isinstance(target, str):
+                    errors.append(f"node '{node.get('id', position)}' has a non-string target")
+                elif target in index:
+                    node_edges.append(index[target])
+                elif target not in TERMINAL_TARGETS:
+                    errors.append(
+                        f"node '{node.get('id', position)}' links to unknown node '{target}'"
+                    )
+        edges.append(node_edges)
+
+    if errors:
+        raise ChapterGraphError(errors)
+
+    entry = index.get(ENTRY_NODE_ID, 0) if nodes else None
+    ids = [node["id"] for node in nodes]
+
+    return {
+        "version": COMPILED_GRAPH_VERSION,
+        "node_count": len(nodes),
+        "entry": entry,
+        "index": index,
+        "edges": edges,
+        "unreachable": [ids[i] for i in _find_unreachable(edges, entry)],
+        "cycles": [ids[i] for i in _find_cycle_entries(edges, entry)],
+    }
+
+
+def compile_content_data(content_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Compile content_data of an interactive chapter (None if it has no nodes)"""
+    nodes = content_data.get("nodes")
+    if not isinstance(nodes, list):
+        return None
+    return compile_chapter_graph(nodes)
+
+
+def get_lookahead_window(
+    compiled_graph: Dict[str, Any], start: int, depth: int, max_nodes: int
+) -> Tuple[List[int], List[int]]:
+    """
+    Select the nodes a reader may see next, starting from a node
+
+    Breadth-first along next/choice edges, up to `depth` edges away and at most
+    `max_nodes` nodes, so every branch of a choice is covered before going
+    deeper down one of them.
+
+    Returns tuple of (positions in window, frontier positions), where the
+    frontier holds nodes linked from the window but not included in it.
+    """
+    edges = compiled_graph["edges"]
+    window = [start]
+    included = {start}
+    frontier: List[int] = []
+    queue = deque([(start, 0)])
+
+    while queue:
+        position, distance = queue.popleft()
+        for target in edges[position]:
+            if target in included:
+                continue
+            if distance + 1 > depth or len(window) >= max_nodes:
+                included.add(target)
+                frontier.append(target)
+                continue
+            included.add(target)
+            window.append(target)
+            queue.append((target, distance + 1))
+
+    return window, frontier
+
+
+def _find_unreachable(edges: List[List[int]], entry: Optional[int]) -> List[int]:
+    """Positions not reachable from the entry node (iterative DFS)"""
+    if entry is None:
+        return []
+
+    seen = [False] * len(edges)
+    seen[entry] = True
+    stack = [entry]
+    while stack:
+        for target in edges[stack.pop()]:
+            if not seen[target]:
+                seen[target] = True
+                stack.append(target)
+
+    return [position for position, reached in enumerate(seen) if not reached]
+
+
+def _find_cycle_entries(edges: List[List[int]], entry: Optional[int]) -> List[int]:
+    """
+    Positions that are the target of a back edge, i.e. where a loop re-enters
+
+    Iterative three-colour DFS from the entry node, then from any node not yet
+    visited, so cycles among unreachable nodes are reported too.
+    """
+    WHITE, GREY, BLACK = 0, 1, 2
+    colour = [WHITE] * len(edges)
+    loop_heads = set()
+
+    roots = ([entry] if entry is not None else []) + list(range(len(edges)))
+    for root in roots:
+        if colour[root] != WHITE:
+            continue
+        colour[root] = GREY
+        stack = [(root, 0)]
+        while stack:
+            position, edge_index = stack[-1]
+            if edge_index < len(edges[position]):
+                stack[-1] = (position, edge_index + 1)
+                target = edges[position][edge_index]
+                if colour[target] == WHITE:
+                    colour[target] = GREY
+                    stack.append((target, 0))
+                elif colour[target] == GREY:
+                    loop_heads.add(target)
+            else:
+                colour[position] = BLACK
+                stack.pop()
+
+    return sorted(loop_heads)
@@ -0,0 +1,321 @@
+"""
+Chapter content patching
+Applies JSON Patch (RFC 6902) operations and text splices to content_data
+
+Editors autosave by sending only what changed since the version they last
+loaded. Patches are applied copy-on-write: only the containers on the path of
+an operation are copied (once per patch), so a patch touching one node of a
+long chapter does not copy the whole document.
+
+Text edits splice a string inside the document:
+    {"path": "/nodes/3/text", "offset": 120, "delete": 5, "insert": "night"}
+Offsets count Unicode code points. Edits are applied in order, each against
+the result of the previous one.
+
+A delta is {"operations": [...], "text_edits": [...]}, operations applied
+first; diff_documents builds one from two versions of a document.
+"""
+import copy
+from typing import Any, Dict, List, Tuple
+
+JSON_PATCH_OPERATIONS = ("add", "remove", "replace", "move", "copy", "test")
+
+# Changed strings at least this long are diffed as a text splice instead of replaced
+TEXT_DIFF_MIN_LENGTH = 64
+
+# Block size for finding common prefixes/suffixes of long strings
+_COMPARE_BLOCK = 4096
+
+
+class ChapterPatchError(ValueError):
+    """Raised when a patch cannot be applied to a chapter's content"""
+
+
+def parse_pointer(path: str) -> List[str]:
+    """Split a JSON Pointer (RFC 6901) into unescaped reference tokens"""
+    if path == "":
+        return []
+    if not path.startswith("/"):
+        raise ChapterPatchError(f"invalid path '{path}': must start with '/'")
+    return [token.replace("~1", "/").replace("~0", "~") for token in path[1:].split("/")]
+
+
+def apply_json_patch(document: Dict[str, Any], operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Apply JSON Patch operations and return the patched document
+
+    The input document is not modified. Raises ChapterPatchError if an
+    operation is malformed, its path does not exist or a "test" fails.
+    """
+    owned: Dict[int, Any] = {}
+    for index, operation in enumerate(operations):
+        try:
+            document = _apply_operation(document, operation, owned)
+        except ChapterPatchError as e:
+            raise ChapterPatchError(f"operation {index} ({operation.get('op')}): {e}") from None
+    return document
+
+
+def apply_text_edits(document: Dict[str, Any], edits: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Apply text splices and return the patched document
+    The input document is not modified.
+    """
+    owned: Dict[int, Any] = {}
+    for index, edit in enumerate(edits):
+        tokens = parse_pointer(edit.get("path", "/text"))
+        if not tokens:
+            raise ChapterPatchError(f"text edit {index}: path must point inside content_data")
+
+        document, parent = _copy_path(document, tokens[:-1], owned)
+        key = _resolve_key(parent, tokens[-1], allow_end=False)
+        text = parent[key]
+        if not isinstance(text, str):
+            raise ChapterPatchError(f"text edit {index}: '{edit.get('path', '/text')}' is not a string")
+
+        offset = edit.get("offset", 0)
+        delete = edit.get("delete", 0)
+        if offset < 0 or delete < 0 or offset + delete > len(text):
+            raise ChapterPatchError(
+                f"text edit {index}: range {offset}..{offset + delete} is outside the text "
+                f"(length {len(text)})"
+            )
+        parent[key] = text[:offset] + edit.get("insert", "") + text[offset + delete:]
+    return document
+
+
+def apply_delta(document: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a delta (operations, then text edits) and return the patched document"""
+    document = apply_json_patch(document, delta.get("operations", []))
+    return apply_text_edits(document, delta.get("text_edits", []))
+
+
+def diff_documents(old: Any, new: Any) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Build a delta that turns `old` into `new`
+
+    Unchanged array items at both ends are skipped, so inserting or deleting
+    a node only records that node; a long string that changed is recorded as
+    a single splice around its common prefix and suffix.
+    """
+    operations: List[Dict[str, Any]] = []
+    text_edits: List[Dict[str, Any]] = []
+    _diff(old, new, "", operations, text_edits)
+    return {"operations": operations, "text_edits": text_edits}
+
+
+def _diff(old: Any, new: Any, path: str, operations: List[Dict[str, Any]], text_edits: List[Dict[str, Any]]) -> None:
+    """Append the changes between two values at `path` (paths are valid in both versions)"""
+    if old is new:
+        return
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                operations.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key in old:
+                _diff(old[key], value, f"{path}/{_escape(key)}", operations, text_edits)
+            else:
+                operations.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+        return
+
+    if isinstance(old, list) and isinstance(new, list):
+        shortest = min(len(old), len(new))
+        start = 0
+        while start < shortest and _json_equal(old[start], new[start]):
+            start += 1
+        end = 0
+        while end < shortest - start and _json_equal(old[-1 - end], new[-1 - end]):
+            end += 1
+
+        # Items changed in place, then the extra items of the longer version
+        overlap = shortest - start - end
+        for offset in range(overlap):
+            index = start + offset
+            _diff(old[index], new[index], f"{path}/{index}", operations, text_edits)
+        tail = start + overlap
+        for _ in range(len(old) - shortest):
+            operations.append({"op": "remove", "path": f"{path}/{tail}"})
+        for index in range(tail, tail + len(new) - shortest):
+            operations.append({"op": "add", "path": f"{path}/{index}", "value": new[index]})
+        return
+
+    if isinstance(old, str) and isinstance(new, str) and path and len(old) >= TEXT_DIFF_MIN_LENGTH:
+        if old != new:
+            prefix = _common_prefix_length(old, new)
+            suffix = _common_suffix_length(old[prefix:], new[prefix:])
+            text_edits.append({
+                "path": path,
+                "offset": prefix,
+                "delete": len(old) - prefix - suffix,
+                "insert": new[prefix:len(new) - suffix],
+            })
+        return
+
+    if not _json_equal(old, new):
+        operations.append({"op": "replace", "path": path, "value": new})
+
+
+def _json_equal(a: Any, b: Any) -> bool:
+    """Equality as JSON values (unlike ==, true is not 1 and 1.0 is not 1)"""
+    if a is b:
+        return True
+    if type(a) is not type(b) or a != b:
+        return False
+    if isinstance(a, dict):
+        return all(_json_equal(value, b[key]) for key, value in a.items())
+    if isinstance(a, list):
+        return all(_json_equal(x, y) for x, y in zip(a, b))
+    return True
+
+
+def _escape(key: str) -> str:
+    """Escape a member name as a JSON Pointer reference token"""
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    """Length of the common prefix, comparing block by block"""
+    limit = min(len(a), len(b))
+    length = 0
+    while length < limit:
+        block = min(_COMPARE_BLOCK, limit - length)
+        if a[length:length + block] == b[length:length + block]:
+            length += block
+            continue
+        while a[length] == b[length]:
+            length += 1
+        break
+    return length
+
+
+def _common_suffix_length(a: str, b: str) -> int:
+    """Length of the common suffix"""
+    return _common_prefix_length(a[::-1], b[::-1])
+
+
+def _apply_operation(document: Any, operation: Dict[str, Any], owned: Dict[int, Any]) -> Any:
+    """Apply a single JSON Patch operation"""
+    op = operation.get("op")
+    if op not in JSON_PATCH_OPERATIONS:
+        raise ChapterPatchError(f"unknown operation '{op}'")
+    if op in ("add", "replace", "test") and "value" not in operation:
+        raise ChapterPatchError("missing 'value'")
+    if op in ("move", "copy") and "from" not in operation:
+        raise ChapterPatchError("missing 'from'")
+
+    tokens = parse_pointer(operation.get("path", ""))
+
+    if op == "test":
+        if _get(document, tokens) != operation["value"]:
+            raise ChapterPatchError(f"test failed at '{operation['path']}'")
+        return document
+
+    if op == "copy":
+        value = copy.deepcopy(_get(document, parse_pointer(operation["from"])))
+        return _add(document, tokens, value, owned)
+
+    if op == "move":
+        from_tokens = parse_pointer(operation["from"])
+        if tokens[:len(from_tokens)] == from_tokens and len(tokens) > len(from_tokens):
+            raise ChapterPatchError("cannot move a value into one of its children")
+        value = _get(document, from_tokens)
+        document = _remove(document, from_tokens, owned)
+        return _add(document, tokens, value, owned)
+
+    if op == "remove":
+        return _remove(document, tokens, owned)
+
+    value = copy.deepcopy(operation["value"])
+    if op == "replace":
+        if not tokens:
+            return value
+        document, parent = _copy_path(document, tokens[:-1], owned)
+        parent[_resolve_key(parent, tokens[-1], allow_end=False)] = value
+        return document
+
+    return _add(document, tokens, value, owned)
+
+
+def _add(document: Any, tokens: List[str], value: Any, owned: Dict[int, Any]) -> Any:
+    """Add a value: set a member, or insert into an array ("-" appends)"""
+    if not tokens:
+        return value
+    document, parent = _copy_path(document, tokens[:-1], owned)
+    if isinstance(parent, list):
+        key = _resolve_key(parent, tokens[-1], allow_end=True)
+        parent.insert(key, value)
+    elif isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    else:
+        raise ChapterPatchError(f"cannot add to a {type(parent).__name__}")
+    return document
+
+
+def _remove(document: Any, tokens: List[str], owned: Dict[int, Any]) -> Any:
+    """Remove an existing member or array element"""
+    if not tokens:
+        raise ChapterPatchError("cannot remove the whole document")
+    document, parent = _copy_path(document, tokens[:-1], owned)
+    del parent[_resolve_key(parent, tokens[-1], allow_end=False)]
+    return document
+
+
+def _get(document: Any, tokens: List[str]) -> Any:
+    """Get the value a pointer refers to"""
+    value = document
+    for token in tokens:
+        value = value[_resolve_key(value, token, allow_end=False)]
+    return value
+
+
+def _copy_path(document: Any, tokens: List[str], owned: Dict[int, Any]) -> Tuple[Any, Any]:
+    """
+    Shallow-copy the containers from the root down to the one `tokens` points to
+    Containers already copied by this patch (in `owned`, by id) are reused.
+    Returns tuple of (new root, copied target container).
+    """
+    root = _shallow_copy(document, owned)
+    container = root
+    for token in tokens:
+        key = _resolve_key(container, token, allow_end=False)
+        child = _shallow_copy(container[key], owned)
+        container[key] = child
+        container = child
+    return root, container
+
+
+def _shallow_copy(value: Any, owned: Dict[int, Any]) -> Any:
+    """Copy a container one level deep, unless this patch already owns it"""
+    if id(value) in owned:
+        return value
+    if isinstance(value, dict):
+        value = dict(value)
+    elif isinstance(value, list):
+        value = list(value)
+    else:
+        raise ChapterPatchError(f"cannot traverse into a {type(value).__name__}")
+    owned[id(value)] = value  # Keeps the copy alive so its id is not reused
+    return value
+
+
+def _resolve_key(container: Any, token: str, allow_end: bool) -> Any:
+    """Turn a reference token into a dict key or list index, checking it exists"""
+    if isinstance(container, dict):
+        if token not in container:
+            raise ChapterPatchError(f"member '{token}' does not exist")
+        return token
+
+    if isinstance(container, list):
+        if token == "-" and allow_end:
+            return len(container)
+        if not token.isdigit() or (token != "0" and token.startswith("0")):
+            raise ChapterPatchError(f"invalid array index '{token}'")
+        index = int(token)
+        limit = len(container) if allow_end else len(container) - 1
+        if index > limit:
+            raise ChapterPatchError(f"array index {index} is out of range")
+        return index
+
+    raise ChapterPatchError(f"cannot traverse into a {type(container).__name__}")
@@ -0,0 +1,159 @@
+"""
+Chapter text statistics engine
+Word count, character count and reading time, with per-node caching for interactive chapters
+
+Stats format (stored in chapters.text_stats):
+    {
+        "version": 2,
+        "word_count": 1520,
+        "character_count": 8311,
+        "reading_time_minutes": 7,
+        "hash": "9f2c...",                       # simple chapters: hash of the text
+        "nodes": {"start": ["a1b2...", 12, 64]}  # interactive: id -> [hash, words, chars]
+    }
+
+Interactive chapters count every reader-visible text of their nodes
+(TEXT_KEYS), choice labels, questions and captions included.
+Counts for each interactive node are keyed by a hash of the node's text, so
+when a chapter is saved again only nodes whose text changed are recounted.
+Words are whitespace-separated tokens, matching str.split().
+"""
+import hashlib
+import math
+from typing import Any, Dict, List, Optional
+
+TEXT_STATS_VERSION = 2  # Bumped when what is counted changes, so stored stats are recounted
+
+# Node keys whose string values are shown to the reader (searched in nested
+# objects too, so choice option labels are counted); none of them affect the
+# node graph or assets
+TEXT_KEYS = ("text", "content", "dialogue", "question", "caption", "title", "name", "description")
+
+# Texts longer than this are counted chunk by chunk to bound memory use
+CHUNK_SIZE = 64 * 1024
+
+_FIELD_SEPARATOR = "\x1f"
+
+
+def count_words(text: str) -> int:
+    """
+    Count whitespace-separated words without splitting the whole text at once
+
+    Long texts are split in CHUNK_SIZE slices; a word cut in two by a slice
+    boundary is counted once.
+    """
+    if len(text) <= CHUNK_SIZE:
+        return len(text.split())
+
+    words = 0
+    previous_ends_in_word = False
+    for start in range(0, len(text), CHUNK_SIZE):
+        chunk = text[start:start + CHUNK_SIZE]
+        words += len(chunk.split())
+        if previous_ends_in_word and not chunk[0].isspace():
+            words -= 1
+        previous_ends_in_word = not chunk[-1].isspace()
+    return words
+
+
+def extract_node_texts(value: Any) -> List[str]:
+    """Get every reader-visible string of a node or option (TEXT_KEYS values), in document order"""
+    texts = []
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            nested = []
+            for key, item in value.items():
+                if key in TEXT_KEYS and _is_text(item):
+                    texts.append(str(item))
+                elif isinstance(item, (dict, list)):
+                    nested.append(item)
+            stack.extend(reversed(nested))
+        elif isinstance(value, list):
+            stack.extend(reversed(value))
+    return texts
+
+
+def _is_text(value: Any) -> bool:
+    return isinstance(value, (str, int, float)) and not isinstance(value, bool)
+
+
+def hash_texts(texts: List[str]) -> str:
+    """Content hash used as the cache key for a node's counts"""
+    digest = hashlib.blake2b(digest_size=8)
+    for text in texts:
+        digest.update(text.encode("utf-8", "surrogatepass"))
+        digest.update(_FIELD_SEPARATOR.encode())
+    return digest.hexdigest()
+
+
+def estimate_reading_time(word_count: int, words_per_minute: int) -> int:
+    """Estimated reading time in whole minutes (0 for empty chapters)"""
+    if word_count <= 0:
+        return 0
+    return math.ceil(word_count / words_per_minute)
+
+
+def compute_text_stats(
+    content_data: Dict[str, Any],
+    interactive: bool,
+    words_per_minute: int,
+    previous: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Compute text statistics for a chapter's content_data
+
+    Args:
+        content_data: {"text": ...} for simple chapters, {"nodes": [...]} for interactive
+        interactive: Whether content_data holds interactive nodes
+        words_per_minute: Reading speed used for the reading time estimate
+        previous: Stats from the last save; unchanged text is not recounted
+    """
+    if previous and previous.get("version") != TEXT_STATS_VERSION:
+        previous = None
+
+    stats: Dict[str, Any] = {"version": TEXT_STATS_VERSION}
+
+    if interactive:
+        # Reuse counts by content hash, even if a node was renamed or moved
+        cached = {}
+        if previous and isinstance(previous.get("nodes"), dict):
+            cached = {entry[0]: entry for entry in previous["nodes"].values()}
+
+        node_stats = {}
+        word_count = 0
+        character_count = 0
+        nodes = content_data.get("nodes", [])
+        for position, node in enumerate(nodes if isinstance(nodes, list) else []):
+            texts = extract_node_texts(node)
+            node_hash = hash_texts(texts)
+            entry = cached.get(node_hash)
+            if entry is None:
+                entry = [
+                    node_hash,
+                    sum(count_words(text) for text in texts),
+                    sum(len(text) for text in texts),
+                ]
+            node_id = node.get("id") if isinstance(node, dict) else None
+            node_stats[str(node_id) if node_id else f"#{position}"] = entry
+            word_count += entry[1]
+            character_count += entry[2]
+
+        stats["nodes"] = node_stats
+    else:
+        text = content_data.get("text", "")
+        text = text if isinstance(text, str) else str(text)
+        text_hash = hash_texts([text])
+        if previous and previous.get("hash") == text_hash:
+            word_count = previous["word_count"]
+            character_count = previous["character_count"]
+        else:
+            word_count = count_words(text)
+            character_count = len(text)
+        stats["hash"] = text_hash
+
+    stats["word_count"] = word_count
+    stats["character_count"] = character_count
+    stats["reading_time_minutes"] = estimate_reading_time(word_count, words_per_minute)
+    return stats
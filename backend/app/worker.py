@@ -0,0 +1,49 @@
+"""
+Background job worker entry point
+
+Usage (from the backend directory):
+    python -m app.worker [--threads 4] [--queue default] [--once]
+
+Set JOB_WORKER_THREADS=0 for the API when jobs are run by dedicated workers.
+"""
+import argparse
+import logging
+import signal
+import threading
+from app.core.config import settings
+from app.services import job_service
+from app.services.job_worker import JobWorker
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run queued background jobs")
+    parser.add_argument("--threads", type=int, default=max(settings.JOB_WORKER_THREADS, 1),
+                        help="jobs run at the same time")
+    parser.add_argument("--queue", action="append", dest="queues",
+                        help=f"queue to take jobs from (repeatable, default: {job_service.DEFAULT_QUEUE})")
+    parser.add_argument("--once", action="store_true", help="run the jobs that are due, then exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    worker = JobWorker(
+        threads=args.threads,
+        queues=args.queues or [job_service.DEFAULT_QUEUE],
+        poll_interval_seconds=settings.JOB_POLL_INTERVAL_SECONDS,
+    )
+
+    if args.once:
+        logging.getLogger(__name__).info("Ran %d jobs", worker.run_pending())
+        return
+
+    stopped = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopped.set())
+
+    worker.start()
+    logging.getLogger(__name__).info("Worker %s started with %d threads", worker.name, args.threads)
+    stopped.wait()
+    worker.stop()
+
+
+if __name__ == "__main__":
+    main()
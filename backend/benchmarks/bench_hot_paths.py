@@ -0,0 +1,304 @@
+"""
+Benchmark: hot-path functions and serializers, without a server
+
+Times the pure functions every chapter save, chapter read and authenticated
+request goes through:
+    - calculate_word_count on large interactive chapters
+    - response serialization of Chapter and BookListResponse: validated and
+      encoded with json (FastAPI's default), with orjson (ORJSONResponse), and
+      the trusted path that skips validation (model_response)
+    - ChapterCreate.validate_content_data (including the graph check)
+    - JWT encoding (app/core/security.py) and decoding (as in get_current_user)
+    - FileStorage.create_thumbnail on typical to very large covers
+
+Each benchmark is run in batches of calls lasting about BATCH_SECONDS; the
+report shows the median and fastest time per call over REPEAT batches.
+
+Results are tracked per commit in RESULTS_FILE (one JSON line per run). Each
+benchmark is compared with its latest saved result from the same machine,
+and the run fails (exit code 1) if one got slower by more than --tolerance:
+
+    python benchmarks/bench_hot_paths.py --save       # record the current commit
+    python benchmarks/bench_hot_paths.py -k thumbnail # only matching benchmarks
+"""
+import argparse
+import atexit
+import json
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+# Add backend directory to path
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import orjson
+from jose import jwt
+from PIL import Image
+from app.core.config import settings
+from app.core.responses import ORJSON_OPTIONS, model_response
+from app.core.security import create_access_token
+from app.core.storage import FileStorage
+from app.models.book import BookStatus
+from app.models.chapter import ContentType
+from app.schemas.book import BookListResponse
+from app.schemas.chapter import Chapter, ChapterCreate
+from app.services.chapter_service import calculate_word_count
+from content import ParagraphPool, make_interactive_content, make_simple_content
+
+RESULTS_FILE = Path(__file__).resolve().parent / "results" / "hot_paths.jsonl"
+
+BATCH_SECONDS = 0.2
+REPEAT = 7
+DEFAULT_TOLERANCE = 0.15  # Allowed slowdown of a median before a run fails
+
+INTERACTIVE_NODE_COUNTS = (1_000, 10_000)
+WORDS_PER_NODE = 60
+SIMPLE_CHAPTER_WORDS = 5_000
+BOOK_LIST_PAGE_SIZE = 100
+COVER_SIZES = ((600, 900), (1600, 2400), (4000, 6000))
+
+_rng = random.Random(42)
+_pool = ParagraphPool(_rng)
+_workdir = Path(tempfile.mkdtemp(prefix="bench_hot_paths_"))
+atexit.register(shutil.rmtree, _workdir, ignore_errors=True)
+
+# name -> setup function returning the callable to time
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark's setup function"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _interactive_content(node_count: int) -> dict:
+    return make_interactive_content(_pool, _rng, node_count * WORDS_PER_NODE, node_count)[0]
+
+
+def _chapter_row(content_type: ContentType, content_data: dict) -> SimpleNamespace:
+    """Stand-in for a Chapter ORM row, read through from_attributes like the API does"""
+    now = datetime.now(timezone.utc)
+    return SimpleNamespace(
+        id=1, book_id=1, chapter_number=1, title="Chapter 1", content_type=content_type,
+        content_data=content_data, is_published=True, word_count=0, character_count=0,
+        reading_time_minutes=0, version=1, compiled_graph=None, published_at=now, publish_at=None,
+        created_at=now, updated_at=now
+    )
+
+
+def _serialize(model, value) -> bytes:
+    """Validate and serialize a response the way FastAPI does for response_model"""
+    return json.dumps(model.model_validate(value).model_dump(mode="json")).encode()
+
+
+def _serialize_orjson(model, value) -> bytes:
+    """As _serialize, with the orjson default response class"""
+    return orjson.dumps(model.model_validate(value).model_dump(mode="json"), option=ORJSON_OPTIONS)
+
+
+def _response_benchmarks(name: str, model, make_value) -> None:
+    """Register the three ways of serializing a response"""
+    for suffix, serialize in (
+        ("", _serialize),
+        (" orjson", _serialize_orjson),
+        (" trusted", lambda model, value: model_response(model, value).body),
+    ):
+        def setup(serialize=serialize):
+            value = make_value()
+            return lambda: serialize(model, value)
+        BENCHMARKS[name + suffix] = setup
+
+
+for _nodes in INTERACTIVE_NODE_COUNTS:
+    @benchmark(f"calculate_word_count interactive {_nodes} nodes")
+    def _(nodes=_nodes):
+        content_data = _interactive_content(nodes)
+        return lambda: calculate_word_count(content_data, ContentType.INTERACTIVE)
+
+    @benchmark(f"ChapterCreate validation interactive {_nodes} nodes")
+    def _(nodes=_nodes):
+        payload = {
+            "title": "Chapter 1", "chapter_number": 1,
+            "content_type": "interactive", "content_data": _interactive_content(nodes)
+        }
+        return lambda: ChapterCreate.model_validate(payload)
+
+    _response_benchmarks(
+        f"Chapter response interactive {_nodes} nodes", Chapter,
+        lambda nodes=_nodes: _chapter_row(ContentType.INTERACTIVE, _interactive_content(nodes))
+    )
+
+
+@benchmark(f"calculate_word_count simple {SIMPLE_CHAPTER_WORDS} words")
+def _():
+    content_data = make_simple_content(_pool, _rng, SIMPLE_CHAPTER_WORDS)[0]
+    return lambda: calculate_word_count(content_data, ContentType.SIMPLE)
+
+
+_response_benchmarks(
+    f"Chapter response simple {SIMPLE_CHAPTER_WORDS} words", Chapter,
+    lambda: _chapter_row(ContentType.SIMPLE, make_simple_content(_pool, _rng, SIMPLE_CHAPTER_WORDS)[0])
+)
+
+
+def _book_list_page() -> dict:
+    now = datetime.now(timezone.utc)
+    books = [
+        SimpleNamespace(
+            id=i, author_id=i % 50 + 1, title=f"Book {i}", description=_pool.paragraphs[i % 100],
+            cover_image_url=f"/uploads/images/covers/{i}.jpg",
+            thumbnail_url=f"/uploads/images/thumbnails/thumb_{i}.jpg",
+            genre="Fantasy", tags=["magic", "dragons", "adventure"], status=BookStatus.ONGOING,
+            total_views=i * 37, total_likes=i * 3, created_at=now, updated_at=now
+        )
+        for i in range(1, BOOK_LIST_PAGE_SIZE + 1)
+    ]
+    return {"books": books, "total": 10_000, "page": 1, "page_size": BOOK_LIST_PAGE_SIZE, "total_pages": 100}
+
+
+_response_benchmarks(f"BookListResponse {BOOK_LIST_PAGE_SIZE} books", BookListResponse, _book_list_page)
+
+
+@benchmark("JWT create_access_token")
+def _():
+    return lambda: create_access_token({"sub": 12345})
+
+
+@benchmark("JWT decode access token")
+def _():
+    token = create_access_token({"sub": 12345}, expires_delta=timedelta(days=1))
+    return lambda: jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
+for _width, _height in COVER_SIZES:
+    @benchmark(f"create_thumbnail {_width}x{_height} JPEG")
+    def _(width=_width, height=_height):
+        source = _workdir / f"cover_{width}x{height}.jpg"
+        Image.effect_noise((width, height), 64).convert("RGB").save(source, quality=85)
+        destination = _workdir / f"thumb_{width}x{height}.jpg"
+        return lambda: FileStorage.create_thumbnail(source, destination)
+
+
+def measure(func: Callable[[], object]) -> Dict[str, float]:
+    """Median and fastest seconds per call over REPEAT batches"""
+    func()  # Warm up caches and lazy imports
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - start >= BATCH_SECONDS:
+            break
+        loops *= 2
+
+    per_call = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        per_call.append((time.perf_counter() - start) / loops)
+    return {"median": statistics.median(per_call), "min": min(per_call), "loops": loops}
+
+
+def _format(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:8.2f} s "
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:8.2f} ms"
+    return f"{seconds * 1e6:8.2f} us"
+
+
+def machine_id() -> str:
+    """Results are only compared between runs on the same machine and Python"""
+    return f"{platform.node()}/{platform.machine()}/py{platform.python_version()}"
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=backend_dir
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous_results() -> Dict[str, dict]:
+    """Latest saved result of each benchmark on this machine, with its commit"""
+    previous = {}
+    if not RESULTS_FILE.exists():
+        return previous
+    for line in RESULTS_FILE.read_text().splitlines():
+        if line.strip():
+            run = json.loads(line)
+            if run.get("machine") == machine_id():
+                for name, timing in run["results"].items():
+                    previous[name] = dict(timing, commit=run["commit"])
+    return previous
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark hot-path functions and serializers")
+    parser.add_argument("-k", dest="pattern", default="", help="Only run benchmarks containing this text")
+    parser.add_argument("--save", action="store_true", help=f"Append the results to {RESULTS_FILE.name}")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    return parser.parse_args()
+
+
+def main():
+    """Run the hot-path benchmarks"""
+    args = parse_args()
+    previous = load_previous_results()
+
+    print("\n" + "=" * 60)
+    print("HOT PATH BENCHMARKS")
+    print("=" * 60)
+
+    results = {}
+    regressions: List[str] = []
+    for name, setup in BENCHMARKS.items():
+        if args.pattern.lower() not in name.lower():
+            continue
+        timing = measure(setup())
+        results[name] = timing
+        line = f"{name:<50} {_format(timing['median'])}  (min {_format(timing['min']).strip()})"
+        before = previous.get(name)
+        if before:
+            change = (timing["median"] - before["median"]) / before["median"]
+            line += f"  {change:+6.1%} vs {before['commit']}"
+            if change > args.tolerance:
+                regressions.append(name)
+                line += "  [SLOWER]"
+        print(line)
+
+    if args.save:
+        RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with RESULTS_FILE.open("a") as results_file:
+            results_file.write(json.dumps({
+                "commit": git_commit(),
+                "recorded_at": datetime.now(timezone.utc).isoformat(),
+                "machine": machine_id(),
+                "results": results
+            }) + "\n")
+        print(f"\nResults saved to {RESULTS_FILE}")
+
+    if regressions:
+        print(f"\n[FAIL] {len(regressions)} benchmark(s) more than {args.tolerance:.0%} slower")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Benchmark: offline client sync of 500 queued operations
+Compares replaying each operation as its own request against the batch
+endpoints (POST /reading-progress/batch and POST /bookmarks/batch).
+
+Requires a running server: cd backend && uvicorn main:app
+"""
+import random
+import time
+from datetime import datetime, timedelta, timezone
+import requests
+
+BASE_URL = "http://localhost:8000/api/v1"
+
+TOTAL_OPERATIONS = 500
+PROGRESS_SHARE = 0.7  # Remaining operations are bookmark toggles
+BOOK_COUNT = 10
+CHAPTERS_PER_BOOK = 3
+
+
+def register_and_login(username, role):
+    """Register a user and return auth headers"""
+    register_data = {
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": "Pass1234",
+        "role": role
+    }
+    response = requests.post(f"{BASE_URL}/auth/register", json=register_data)
+    response.raise_for_status()
+    
+    response = requests.post(f"{BASE_URL}/auth/login", data={
+        "username": register_data["username"],
+        "password": register_data["password"]
+    })
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def setup():
+    """Create books and chapters, plus one reader per replay strategy"""
+    timestamp = str(int(time.time()))
+    headers = register_and_login(f"syncbench{timestamp}", "author")
+    
+    books = {}
+    for b in range(BOOK_COUNT):
+        response = requests.post(f"{BASE_URL}/books/", json={
+            "title": f"Sync Benchmark Book {timestamp}-{b}",
+            "status": "ongoing"
+        }, headers=headers)
+        response.raise_for_status()
+        book_id = response.json()["id"]
+        
+        books[book_id] = []
+        for c in range(1, CHAPTERS_PER_BOOK + 1):
+            response = requests.post(f"{BASE_URL}/books/{book_id}/chapters", json={
+                "chapter_number": c,
+                "title": f"Chapter {c}",
+                "content_type": "simple",
+                "content_data": {"text": "Benchmark chapter text."},
+                "is_published": True
+            }, headers=headers)
+            response.raise_for_status()
+            books[book_id].append(response.json()["id"])
+    
+    # Separate readers so both strategies start from the same empty state
+    single_headers = register_and_login(f"syncsingle{timestamp}", "reader")
+    batch_headers = register_and_login(f"syncbatch{timestamp}", "reader")
+    return single_headers, batch_headers, books
+
+
+def generate_queue(books):
+    """Generate a queue of offline operations in client time order"""
+    rng = random.Random(42)
+    start = datetime.now(timezone.utc) - timedelta(hours=2)
+    queue = []
+    
+    for i in range(TOTAL_OPERATIONS):
+        book_id = rng.choice(list(books))
+        client_timestamp = (start + timedelta(seconds=i * 10)).isoformat()
+        if rng.random() < PROGRESS_SHARE:
+            queue.append(("progress", {
+                "book_id": book_id,
+                "chapter_id": rng.choice(books[book_id]),
+                "progress_percentage": round(rng.uniform(0, 100), 1),
+                "client_timestamp": client_timestamp
+            }))
+        else:
+            queue.append(("bookmark", {
+                "book_id": book_id,
+                "bookmarked": rng.random() < 0.6,
+                "client_timestamp": client_timestamp
+            }))
+    
+    return queue
+
+
+def replay_one_by_one(headers, queue):
+    """Replay the queue with the single-item endpoints"""
+    session = requests.Session()
+    session.headers.update(headers)
+    
+    start = time.perf_counter()
+    for kind, item in queue:
+        if kind == "progress":
+            session.post(f"{BASE_URL}/reading-progress/", json={
+                "book_id": item["book_id"],
+                "chapter_id": item["chapter_id"],
+                "progress_percentage": item["progress_percentage"]
+            })
+        elif item["bookmarked"]:
+            session.post(f"{BASE_URL}/bookmarks/", json={"book_id": item["book_id"]})
+        else:
+            session.delete(f"{BASE_URL}/bookmarks/book/{item['book_id']}")
+    return time.perf_counter() - start
+
+
+def replay_batched(headers, queue):
+    """Replay the queue with the batch endpoints"""
+    session = requests.Session()
+    session.headers.update(headers)
+    
+    progress_items = [item for kind, item in queue if kind == "progress"]
+    bookmark_items = [item for kind, item in queue if kind == "bookmark"]
+    
+    start = time.perf_counter()
+    progress_response = session.post(
+        f"{BASE_URL}/reading-progress/batch", json={"items": progress_items}
+    )
+    bookmark_response = session.post(
+        f"{BASE_URL}/bookmarks/batch", json={"items": bookmark_items}
+    )
+    elapsed = time.perf_counter() - start
+    
+    progress_response.raise_for_status()
+    bookmark_response.raise_for_status()
+    return elapsed, progress_response.json(), bookmark_response.json()
+
+
+def main():
+    """Run the offline sync benchmark"""
+    print("\n" + "=" * 60)
+    print(f"OFFLINE SYNC BENCHMARK - {TOTAL_OPERATIONS} queued operations")
+    print("=" * 60)
+    
+    try:
+        single_headers, batch_headers, books = setup()
+    except requests.exceptions.ConnectionError:
+        print("[FAIL] Cannot connect to server. Is it running?")
+        return
+    
+    queue = generate_queue(books)
+    
+    single_seconds = replay_one_by_one(single_headers, queue)
+    batch_seconds, progress_result, bookmark_result = replay_batched(batch_headers, queue)
+    
+    print(f"\nOne request per operation: {single_seconds * 1000:8.1f} ms "
+          f"({len(queue)} requests)")
+    print(f"Batch endpoints:           {batch_seconds * 1000:8.1f} ms (2 requests)")
+    print(f"Speedup:                   {single_seconds / batch_seconds:8.1f}x")
+    print(f"\nProgress items:  applied={progress_result['applied']} "
+          f"superseded={progress_result['superseded']} invalid={progress_result['invalid']}")
+    print(f"Bookmark items:  applied={bookmark_result['applied']} "
+          f"superseded={bookmark_result['superseded']} invalid={bookmark_result['invalid']}")
+
+
+if __name__ == "__main__":
+    main()
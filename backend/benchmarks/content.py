@@ -0,0 +1,112 @@
+"""
+Synthetic chapter content shared by the benchmarks
+
+Chapters are assembled from a pool of generated paragraphs, so millions of
+them can be produced quickly while keeping realistic sizes and shapes:
+simple chapters hold one text, interactive chapters a branching node graph
+in the format of app/utils/chapter_graph.py (text nodes linked by "next",
+choice nodes with options, "end" finishing the chapter).
+"""
+import random
+from typing import List, Tuple
+
+WORDS = (
+    "the a an and but or of to in on at by with from into over under after before "
+    "she he they we you it her his their our your its this that these those "
+    "said asked whispered shouted answered thought knew felt saw heard walked ran "
+    "turned looked opened closed held took gave left found kept waited stood fell "
+    "door window road river forest castle city village tower gate bridge sword "
+    "letter map ship storm night morning evening light shadow fire water stone "
+    "king queen captain stranger friend enemy mother father child dragon wizard "
+    "old young dark bright quiet cold warm silent ancient broken hidden golden "
+    "slowly quickly again never always suddenly finally almost only still "
+    "voice hand eyes face heart name secret promise story journey battle dream"
+).split()
+
+# Paragraphs in the pool; chapters repeat them, but rarely in the same order
+PARAGRAPH_POOL_SIZE = 500
+PARAGRAPH_WORDS = (40, 160)
+
+NODES_PER_CHOICE = 6  # Every so many nodes, the reader gets a choice
+
+
+class ParagraphPool:
+    """Generated paragraphs with their word counts"""
+
+    def __init__(self, rng: random.Random, size: int = PARAGRAPH_POOL_SIZE):
+        self.paragraphs: List[str] = []
+        self.word_counts: List[int] = []
+        for _ in range(size):
+            word_count = rng.randint(*PARAGRAPH_WORDS)
+            sentences = []
+            remaining = word_count
+            while remaining > 0:
+                length = min(remaining, rng.randint(6, 20))
+                sentence = " ".join(rng.choices(WORDS, k=length))
+                sentences.append(sentence[0].upper() + sentence[1:] + ".")
+                remaining -= length
+            self.paragraphs.append(" ".join(sentences))
+            self.word_counts.append(word_count)
+        self.average_words = sum(self.word_counts) / len(self.word_counts)
+
+    def text(self, rng: random.Random, words: int) -> Tuple[str, int]:
+        """
+        Text of about `words` words (at least one paragraph)
+
+        Returns:
+            (text, exact word count)
+        """
+        count = max(1, round(words / self.average_words))
+        picks = rng.choices(range(len(self.paragraphs)), k=count)
+        return "\n\n".join(self.paragraphs[i] for i in picks), sum(self.word_counts[i] for i in picks)
+
+
+def make_simple_content(pool: ParagraphPool, rng: random.Random, words: int) -> Tuple[dict, int]:
+    """
+    content_data of a simple chapter
+
+    Returns:
+        (content_data, word count)
+    """
+    text, word_count = pool.text(rng, words)
+    return {"text": text}, word_count
+
+
+def make_interactive_content(
+    pool: ParagraphPool, rng: random.Random, words: int, node_count: int
+) -> Tuple[dict, int]:
+    """
+    content_data of an interactive chapter with `node_count` nodes sharing
+    about `words` words. Choices branch forward, and some branches rejoin, so
+    the graph has no cycles and every node is reachable.
+
+    Returns:
+        (content_data, word count)
+    """
+    node_count = max(2, node_count)
+    words_per_node = max(1, words // node_count)
+    ids = ["start"] + [f"n{i}" for i in range(1, node_count)]
+
+    def target(position: int) -> str:
+        return ids[position] if position < node_count else "end"
+
+    nodes = []
+    total_words = 0
+    for position, node_id in enumerate(ids):
+        text, word_count = pool.text(rng, words_per_node)
+        total_words += word_count
+        if position % NODES_PER_CHOICE == NODES_PER_CHOICE - 1:
+            nodes.append({
+                "id": node_id,
+                "type": "choice",
+                "text": text,
+                "options": [
+                    {"text": "Go on", "next": target(position + 1)},
+                    {"text": "Take the other way", "next": target(position + 2)},
+                ]
+            })
+        else:
+            nodes.append({"id": node_id, "type": "text", "text": text, "next": target(position + 1)})
+
+    return {"nodes": nodes}, total_words
+
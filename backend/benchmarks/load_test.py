@@ -0,0 +1,332 @@
+"""
+Load test: reader and author scenarios against a seeded database
+
+Virtual users (one thread each) log in as seeded users and run a weighted
+mix of scenarios for a fixed time:
+    browse          book list pages by genre, trending, a book's details
+    search          title search
+    read_chapter    chapter list, a chapter, its comments
+    comment_burst   several comments on one chapter in quick succession
+    progress_ticks  reading progress ticks while scrolling a chapter
+    cover_upload    a cover image upload
+
+Reports throughput and p50/p95/p99 latency per request type and scenario.
+Save a run as a baseline and compare later runs with it to catch regressions:
+
+    python benchmarks/load_test.py --users 50 --duration 120 --save-baseline benchmarks/baselines/main.json
+    python benchmarks/load_test.py --users 50 --duration 120 --compare benchmarks/baselines/main.json
+
+Requires a running server on a database seeded with benchmarks/seed_data.py:
+cd backend && uvicorn main:app --workers 4
+"""
+import argparse
+import io
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+import requests
+
+BASE_URL = "http://localhost:8000/api/v1"
+
+BENCHMARK_PASSWORD = "BenchPass123"  # Set by seed_data.py
+
+# Relative weight of each scenario in the mix
+SCENARIO_WEIGHTS = {
+    "browse": 30,
+    "search": 10,
+    "read_chapter": 35,
+    "comment_burst": 5,
+    "progress_ticks": 18,
+    "cover_upload": 2,
+}
+
+GENRES = ["Fantasy", "Science Fiction", "Mystery", "Romance", "Horror", "Adventure"]
+SEARCH_TERMS = ["Story", "Fantasy", "Mystery 1", "Romance Story 2", "Horror", "Story 99"]
+COMMENT_BURST_SIZE = (3, 10)
+PROGRESS_TICKS = (5, 20)
+THINK_TIME_SECONDS = (0.0, 0.2)  # Pause between a user's scenarios
+DISCOVERY_PAGES = 20  # Book list pages sampled for book ids before the run
+PERCENTILES = (50, 95, 99)
+DEFAULT_TOLERANCE = 0.10  # Allowed p95 increase / throughput drop when comparing
+
+
+class Results:
+    """Latencies and errors recorded by every virtual user"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    def record(self, name: str, seconds: float, ok: bool) -> None:
+        if not self.recording:
+            return
+        with self._lock:
+            self.latencies[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+
+
+class VirtualUser:
+    """One logged-in client running scenarios until the run ends"""
+
+    def __init__(self, user_id: int, catalogue: "Catalogue", results: Results, rng: random.Random):
+        self.session = requests.Session()
+        self.catalogue = catalogue
+        self.results = results
+        self.rng = rng
+
+        response = self.session.post(f"{BASE_URL}/auth/login", data={
+            "username": f"bench_user_{user_id}",
+            "password": BENCHMARK_PASSWORD
+        })
+        response.raise_for_status()
+        self.session.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    def request(self, name: str, method: str, path: str, **kwargs) -> Optional[requests.Response]:
+        """Send a request, recording its latency under `name`; None if it failed"""
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{BASE_URL}{path}", **kwargs)
+            ok = response.status_code < 400
+        except requests.exceptions.RequestException:
+            response, ok = None, False
+        self.results.record(name, time.perf_counter() - start, ok)
+        return response if ok else None
+
+    def run(self, deadline: float) -> None:
+        scenarios = list(SCENARIO_WEIGHTS)
+        weights = list(SCENARIO_WEIGHTS.values())
+        while time.time() < deadline:
+            scenario = self.rng.choices(scenarios, weights=weights)[0]
+            start = time.perf_counter()
+            getattr(self, scenario)()
+            self.results.record(f"scenario {scenario}", time.perf_counter() - start, True)
+            time.sleep(self.rng.uniform(*THINK_TIME_SECONDS))
+
+    def browse(self):
+        page = self.rng.randint(1, 50)
+        self.request("GET /books/", "GET", "/books/", params={
+            "genre": self.rng.choice(GENRES), "page": page, "page_size": 20
+        })
+        self.request("GET /books/trending", "GET", "/books/trending", params={"limit": 20})
+        self.request("GET /books/{id}", "GET", f"/books/{self.catalogue.book(self.rng)}")
+
+    def search(self):
+        self.request("GET /books/?search", "GET", "/books/", params={"search": self.rng.choice(SEARCH_TERMS)})
+
+    def read_chapter(self):
+        chapter_id = self.chapter()
+        if chapter_id is None:
+            return
+        self.request("GET /chapters/{id}", "GET", f"/chapters/{chapter_id}")
+        self.request("GET /comments/chapter/{id}", "GET", f"/comments/chapter/{chapter_id}")
+
+    def comment_burst(self):
+        chapter_id = self.chapter()
+        if chapter_id is None:
+            return
+        for i in range(self.rng.randint(*COMMENT_BURST_SIZE)):
+            self.request("POST /comments/", "POST", "/comments/", json={
+                "chapter_id": chapter_id,
+                "content": f"Load test comment {i}: what a twist!"
+            })
+
+    def progress_ticks(self):
+        book_id = self.catalogue.book(self.rng)
+        chapter_id = self.chapter(book_id)
+        if chapter_id is None:
+            return
+        start = self.rng.uniform(0, 50)
+        for tick in range(self.rng.randint(*PROGRESS_TICKS)):
+            self.request("POST /reading-progress/ticks", "POST", "/reading-progress/ticks", json={
+                "book_id": book_id,
+                "chapter_id": chapter_id,
+                "progress_percentage": min(100.0, round(start + tick * 2.5, 1))
+            })
+
+    def cover_upload(self):
+        self.request("POST /files/upload/cover", "POST", "/files/upload/cover", files={
+            "file": ("cover.jpg", self.catalogue.cover_image, "image/jpeg")
+        })
+
+    def chapter(self, book_id: Optional[int] = None) -> Optional[int]:
+        """A published chapter of a book (listing the book's chapters the first time)"""
+        book_id = book_id or self.catalogue.book(self.rng)
+        chapter_ids = self.catalogue.chapters.get(book_id)
+        if chapter_ids is None:
+            response = self.request("GET /books/{id}/chapters", "GET", f"/books/{book_id}/chapters",
+                                    params={"published_only": True})
+            chapter_ids = [chapter["id"] for chapter in response.json()["chapters"]] if response else []
+            self.catalogue.chapters[book_id] = chapter_ids
+        return self.rng.choice(chapter_ids) if chapter_ids else None
+
+
+class Catalogue:
+    """Book ids discovered before the run, chapter ids as users find them"""
+
+    def __init__(self, book_ids: List[int], cover_image: bytes):
+        self.book_ids = book_ids
+        self.chapters: Dict[int, List[int]] = {}
+        self.cover_image = cover_image
+
+    def book(self, rng: random.Random) -> int:
+        return rng.choice(self.book_ids)
+
+
+def discover_books(rng: random.Random) -> List[int]:
+    """Sample book ids from random pages of the book list"""
+    response = requests.get(f"{BASE_URL}/books/", params={"page_size": 100})
+    response.raise_for_status()
+    total_pages = response.json()["total_pages"]
+    book_ids = [book["id"] for book in response.json()["books"]]
+    for page in rng.sample(range(2, total_pages + 1), min(DISCOVERY_PAGES, max(0, total_pages - 1))):
+        response = requests.get(f"{BASE_URL}/books/", params={"page": page, "page_size": 100})
+        response.raise_for_status()
+        book_ids.extend(book["id"] for book in response.json()["books"])
+    return book_ids
+
+
+def make_cover_image() -> bytes:
+    """A 600x900 JPEG cover, the size of a typical upload"""
+    from PIL import Image
+
+    image = Image.effect_noise((600, 900), 64).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(results: Results, seconds: float) -> Dict[str, dict]:
+    """Throughput, error count and latency percentiles (ms) per request type"""
+    summary = {}
+    for name, latencies in sorted(results.latencies.items()):
+        latencies = sorted(latencies)
+        summary[name] = {
+            "count": len(latencies),
+            "errors": results.errors.get(name, 0),
+            "rps": round(len(latencies) / seconds, 2),
+            **{f"p{p}_ms": round(percentile(latencies, p) * 1000, 1) for p in PERCENTILES},
+        }
+    return summary
+
+
+def print_summary(summary: Dict[str, dict]) -> None:
+    print(f"\n{'Request':<34} {'count':>8} {'err':>6} {'req/s':>8} "
+          + " ".join(f"{f'p{p} ms':>9}" for p in PERCENTILES))
+    for name, row in summary.items():
+        print(f"{name:<34} {row['count']:>8} {row['errors']:>6} {row['rps']:>8.1f} "
+              + " ".join(f"{row[f'p{p}_ms']:>9.1f}" for p in PERCENTILES))
+
+
+def compare(summary: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> bool:
+    """Print changes against a baseline; returns False if anything regressed"""
+    print(f"\nCompared with baseline (tolerance {tolerance:.0%}):")
+    ok = True
+    for name, row in summary.items():
+        before = baseline.get(name)
+        if not before:
+            print(f"   [NEW]  {name}")
+            continue
+        p95_change = (row["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        rps_change = (row["rps"] - before["rps"]) / before["rps"] if before["rps"] else 0.0
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        ok = ok and not regressed
+        print(f"   [{'FAIL' if regressed else 'OK'}]{' ' if regressed else '   '}{name:<34} "
+              f"p95 {before['p95_ms']:.1f} -> {row['p95_ms']:.1f} ms ({p95_change:+.0%}), "
+              f"req/s {before['rps']:.1f} -> {row['rps']:.1f} ({rps_change:+.0%})")
+    return ok
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test against a seeded server")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=10, help="Unmeasured seconds before the run")
+    parser.add_argument("--user-pool", type=int, default=1000, help="Log in as bench_user_1..N")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save-baseline", type=Path, help="Write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="Compare the results with this baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    return parser.parse_args()
+
+
+def main():
+    """Run the load test"""
+    args = parse_args()
+    rng = random.Random(args.seed)
+
+    print("\n" + "=" * 60)
+    print(f"LOAD TEST - {args.users} users, {args.duration:.0f}s (+{args.warmup:.0f}s warm-up)")
+    print("=" * 60)
+
+    try:
+        catalogue = Catalogue(discover_books(rng), make_cover_image())
+        results = Results()
+        users = [
+            VirtualUser(rng.randint(1, args.user_pool), catalogue, results, random.Random(rng.random()))
+            for _ in range(args.users)
+        ]
+    except requests.exceptions.ConnectionError:
+        print("[FAIL] Cannot connect to server. Is it running?")
+        return
+    print(f"Sampled {len(catalogue.book_ids)} books; {len(users)} users logged in")
+
+    deadline = time.time() + args.warmup + args.duration
+    threads = [threading.Thread(target=user.run, args=(deadline,), daemon=True) for user in users]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+    results.recording = True
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    measured = time.perf_counter() - started
+
+    summary = summarize(results, measured)
+    print_summary(summary)
+
+    ok = True
+    if args.compare:
+        ok = compare(summary, json.loads(args.compare.read_text())["results"], args.tolerance)
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(json.dumps({
+            "commit": git_commit(),
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "users": args.users,
+            "duration_seconds": round(measured, 1),
+            "results": summary
+        }, indent=2))
+        print(f"\nBaseline saved to {args.save_baseline}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
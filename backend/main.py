@@ -1,18 +1,28 @@
 """
 Main FastAPI application entry point
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
 from app.api.v1.api import api_router
 from app.core.storage import FileStorage
+from app.core.instrumentation import RequestInstrumentationMiddleware, install_query_hooks, render_metrics
+from app.core.responses import get_default_response_class
+from app.core.compression import CompressionMiddleware
+from app.db.session import replica_set, read_your_writes
+from app.services.reading_progress_buffer import progress_buffer
+from app.services.chapter_import_service import shutdown_executor
+from app.services.job_worker import api_worker
+from app.services.outbox_relay import outbox_relay
+from app.services.trending_tracker import trending_tracker
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     description="Interactive Web Novels Platform API",
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=get_default_response_class()
 )
 
 # CORS middleware configuration
@@ -24,6 +34,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.DATABASE_REPLICA_URLS:
+    @app.middleware("http")
+    async def route_reads_after_writes(request: Request, call_next):
+        """Send a client's reads to the primary right after it writes (see app.db.replicas)"""
+        response = await call_next(request)
+        read_your_writes.mark_write(request, response)
+        return response
+
+# gzip/brotli/zstd response bodies (inside the instrumentation, so its timings include compression)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Per-route latency, SQL and serialization metrics (added last: outermost, so it times everything)
+install_query_hooks()
+app.add_middleware(RequestInstrumentationMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -31,6 +57,29 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 app.mount("/uploads", StaticFiles(directory=str(FileStorage.UPLOAD_DIR)), name="uploads")
 
 
+@app.on_event("startup")
+def start_background_flushers():
+    """Start background writers for buffered data, the job worker and the change event relay"""
+    replica_set.start()
+    progress_buffer.start()
+    trending_tracker.start()
+    api_worker.start()
+    if settings.OUTBOX_RELAY_ENABLED:
+        outbox_relay.start()
+
+
+@app.on_event("shutdown")
+def stop_background_flushers():
+    """Flush buffered data before the process exits"""
+    progress_buffer.stop()
+    trending_tracker.stop()
+    api_worker.stop()
+    if settings.OUTBOX_RELAY_ENABLED:
+        outbox_relay.stop()
+    shutdown_executor()
+    replica_set.stop()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -46,3 +95,10 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Prometheus metrics (request latency, SQL statements and time, serialization per route)"""
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
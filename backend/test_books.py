@@ -247,7 +247,28 @@ def test_books_api():
         print(f"   Showing {len(result['books'])} of {result['total']} total books")
     else:
         print(f"   [FAIL] Pagination failed")
-    
+
+    # Step 15: Trending books (views and the like from earlier steps are flushed in the background)
+    print("\n15. Testing Trending Books...")
+    trending_ids = []
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        response = requests.get(f"{BASE_URL}/books/trending?genre=Fantasy&limit=10")
+        if response.status_code != 200:
+            break
+        trending_ids = [item["id"] for item in response.json()["books"]]
+        if book_id in trending_ids:
+            break
+        time.sleep(1)
+
+    if response.status_code == 200 and book_id in trending_ids:
+        top = response.json()["books"][trending_ids.index(book_id)]
+        print(f"   [OK] Book is trending in Fantasy (rank {trending_ids.index(book_id) + 1}, score {top['trending_score']})")
+    elif response.status_code == 200:
+        print(f"   [FAIL] Book not in the Fantasy ranking: {trending_ids}")
+    else:
+        print(f"   [FAIL] Trending failed: {response.status_code}")
+
     print("\n" + "=" * 60)
     print("All Books API tests completed!")
     print("=" * 60)
@@ -4,6 +4,7 @@ Test script for Chapters API endpoints
 import requests
 import json
 import time
+from datetime import datetime, timedelta, timezone
 
 BASE_URL = "http://localhost:8000/api/v1"
 
@@ -333,6 +334,332 @@ def test_chapters_api():
     else:
         print(f"   [FAIL] Validation should have failed but didn't")
     
+    # Step 14: Test graph validation (choice option links to a missing node)
+    print("\n14. Testing graph validation (dangling choice target)...")
+    dangling_chapter = {
+        "title": "Broken Branches",
+        "chapter_number": 11,
+        "content_type": "interactive",
+        "content_data": {
+            "nodes": [
+                {"id": "start", "type": "text", "text": "A fork in the road.", "next": "choice1"},
+                {
+                    "id": "choice1",
+                    "type": "choice",
+                    "options": [
+                        {"text": "Go left", "next": "left"},
+                        {"text": "Go right", "next": "nowhere"}
+                    ]
+                },
+                {"id": "left", "type": "text", "text": "You went left.", "next": "end"}
+            ]
+        },
+        "is_published": False
+    }
+    
+    dangling_response = requests.post(
+        f"{BASE_URL}/books/{book_id}/chapters",
+        json=dangling_chapter,
+        headers=headers
+    )
+    
+    if dangling_response.status_code == 422:
+        print(f"   [OK] Validation correctly rejected dangling target")
+        print(f"        Error: {dangling_response.json()['detail'][0]['msg']}")
+    else:
+        print(f"   [FAIL] Validation should have failed but didn't")
+    
+    # The fixed graph is accepted and compiled
+    dangling_chapter["content_data"]["nodes"][1]["options"][1]["next"] = "end"
+    compiled_response = requests.post(
+        f"{BASE_URL}/books/{book_id}/chapters",
+        json=dangling_chapter,
+        headers=headers
+    )
+    
+    if compiled_response.status_code == 201 and "compiled_graph" not in compiled_response.json():
+        print(f"   [OK] Fixed graph accepted (its compiled graph is served by the node endpoints only)")
+    else:
+        print(f"   [FAIL] Fixed chapter was not accepted: {compiled_response.text}")
+    
+    # Step 15: Node-level lazy loading
+    print("\n15. Loading a long interactive chapter node by node...")
+    long_chapter = {
+        "title": "The Long Road",
+        "chapter_number": 12,
+        "content_type": "interactive",
+        "content_data": {
+            "nodes": [
+                {"id": f"n{i}", "type": "text", "text": f"Step {i}", "next": f"n{i + 1}" if i < 99 else "end"}
+                for i in range(100)
+            ]
+        },
+        "is_published": True
+    }
+    long_response = requests.post(f"{BASE_URL}/books/{book_id}/chapters", json=long_chapter, headers=headers)
+    if long_response.status_code != 201:
+        print(f"   [FAIL] Long chapter creation failed: {long_response.text}")
+        return
+    long_id = long_response.json()["id"]
+    
+    window_response = requests.get(f"{BASE_URL}/chapters/{long_id}/nodes/window", params={"depth": 4})
+    if window_response.status_code == 200 and len(window_response.json()["nodes"]) == 5:
+        window = window_response.json()
+        print(f"   [OK] Window starts at '{window['start_node']}', frontier: {window['frontier']}")
+    else:
+        print(f"   [FAIL] Window request failed: {window_response.text}")
+        return
+    
+    batch_response = requests.get(
+        f"{BASE_URL}/chapters/{long_id}/nodes",
+        params={"ids": window["frontier"] + ["missing_node"]}
+    )
+    if batch_response.status_code == 200 and batch_response.json()["missing"] == ["missing_node"]:
+        print(f"   [OK] Fetched {len(batch_response.json()['nodes'])} frontier node(s) by id")
+    else:
+        print(f"   [FAIL] Node batch request failed: {batch_response.text}")
+    
+    # Step 16: Asset manifest and preload hints
+    print("\n16. Getting the asset manifest of a visual novel chapter...")
+    vn_chapter = {
+        "title": "Moonlit Garden",
+        "chapter_number": 13,
+        "content_type": "interactive",
+        "content_data": {
+            "nodes": [
+                {"id": "start", "type": "scene", "background": "/uploads/images/chapters/garden.jpg",
+                 "music": "/uploads/audio/night.mp3", "next": "line1"},
+                {"id": "line1", "type": "dialogue", "sprite": "/uploads/images/chapters/hero.png",
+                 "text": "What a quiet night.", "next": "end"}
+            ]
+        },
+        "is_published": True
+    }
+    vn_response = requests.post(f"{BASE_URL}/books/{book_id}/chapters", json=vn_chapter, headers=headers)
+    if vn_response.status_code != 201:
+        print(f"   [FAIL] Visual novel chapter creation failed: {vn_response.text}")
+        return
+    
+    assets_response = requests.get(f"{BASE_URL}/chapters/{vn_response.json()['id']}/assets")
+    if assets_response.status_code == 200:
+        urls = [asset["url"] for asset in assets_response.json()["assets"]]
+        print(f"   [OK] Assets in reading order: {urls}")
+        print(f"        Link: {assets_response.headers.get('Link')}")
+    else:
+        print(f"   [FAIL] Asset manifest request failed: {assets_response.text}")
+    
+    # Step 17: Text statistics
+    print("\n17. Getting text statistics of the visual novel chapter...")
+    stats_response = requests.get(
+        f"{BASE_URL}/chapters/{vn_response.json()['id']}/stats", headers=headers
+    )
+    if stats_response.status_code == 200:
+        stats = stats_response.json()
+        print(f"   [OK] Words: {stats['word_count']}, characters: {stats['character_count']}, "
+              f"reading time: {stats['reading_time_minutes']} min")
+        print(f"        Per node: {[(node['id'], node['word_count']) for node in stats['nodes']]}")
+    else:
+        print(f"   [FAIL] Text statistics request failed: {stats_response.text}")
+    
+    # Step 18: Delta autosave with optimistic concurrency
+    print("\n18. Autosaving the visual novel chapter with a delta...")
+    vn_id = vn_response.json()['id']
+    delta = {
+        "base_version": vn_response.json()['version'],
+        "operations": [{"op": "replace", "path": "/nodes/1/text", "value": "What a quiet, starry night."}],
+        "text_edits": [{"path": "/nodes/1/text", "offset": 0, "delete": 4, "insert": "Such"}]
+    }
+    patch_response = requests.patch(f"{BASE_URL}/chapters/{vn_id}", json=delta, headers=headers)
+    if patch_response.status_code == 200:
+        print(f"   [OK] Saved version {patch_response.json()['version']} "
+              f"({patch_response.json()['word_count']} words)")
+    else:
+        print(f"   [FAIL] Delta save failed: {patch_response.text}")
+    
+    # Replaying the same delta against the old version must conflict
+    stale_response = requests.patch(f"{BASE_URL}/chapters/{vn_id}", json=delta, headers=headers)
+    if stale_response.status_code == 409:
+        print(f"   [OK] Stale save rejected: {stale_response.json()['detail']}")
+    else:
+        print(f"   [FAIL] Expected 409 for a stale save, got {stale_response.status_code}")
+    
+    # Step 19: Revision history, diff and restore
+    print("\n19. Browsing the revision history of the visual novel chapter...")
+    revisions_response = requests.get(f"{BASE_URL}/chapters/{vn_id}/revisions", headers=headers)
+    if revisions_response.status_code == 200:
+        revisions = revisions_response.json()
+        print(f"   [OK] {revisions['total']} revisions (current version {revisions['current_version']})")
+    else:
+        print(f"   [FAIL] Revision list request failed: {revisions_response.text}")
+    
+    diff_response = requests.get(f"{BASE_URL}/chapters/{vn_id}/revisions/1/diff", headers=headers)
+    if diff_response.status_code == 200:
+        diff = diff_response.json()
+        print(f"   [OK] Diff v{diff['from_version']} -> v{diff['to_version']}: "
+              f"{len(diff['operations'])} operations, {len(diff['text_edits'])} text edits")
+    else:
+        print(f"   [FAIL] Revision diff request failed: {diff_response.text}")
+    
+    restore_response = requests.post(f"{BASE_URL}/chapters/{vn_id}/revisions/1/restore", headers=headers)
+    if restore_response.status_code == 200:
+        restored = restore_response.json()
+        print(f"   [OK] Restored version 1 as version {restored['version']}: "
+              f"{restored['content_data']['nodes'][1]['text']}")
+    else:
+        print(f"   [FAIL] Revision restore failed: {restore_response.text}")
+    
+    # Step 20: Batch chapter moves
+    print("\n20. Moving several chapters in one request...")
+    moves = {"moves": [
+        {"chapter_id": vn_id, "new_chapter_number": 2},
+        {"chapter_id": chapter3_id, "new_chapter_number": 3}
+    ]}
+    moves_response = requests.post(f"{BASE_URL}/books/{book_id}/chapters/moves", json=moves, headers=headers)
+    if moves_response.status_code == 200:
+        changed = moves_response.json()
+        print(f"   [OK] {changed['total']} chapters renumbered: "
+              f"{[(ch['id'], ch['chapter_number']) for ch in changed['chapters']]}")
+    else:
+        print(f"   [FAIL] Batch move failed: {moves_response.text}")
+    
+    bad_moves = {"moves": [{"chapter_id": vn_id, "new_chapter_number": 9999}]}
+    bad_response = requests.post(f"{BASE_URL}/books/{book_id}/chapters/moves", json=bad_moves, headers=headers)
+    if bad_response.status_code == 400:
+        print(f"   [OK] Out-of-range move rejected: {bad_response.json()['detail']}")
+    else:
+        print(f"   [FAIL] Expected 400 for an out-of-range move, got {bad_response.status_code}")
+    
+    # Step 21: Bulk import (NDJSON)
+    print("\n21. Importing 50 chapters from NDJSON...")
+    ndjson = "\n".join(
+        json.dumps({"title": f"Imported {i}", "text": f"Imported chapter {i} text."}) for i in range(1, 51)
+    )
+    import_response = requests.post(
+        f"{BASE_URL}/books/{book_id}/chapters/import",
+        files={"file": ("chapters.ndjson", ndjson.encode(), "application/x-ndjson")},
+        headers=headers
+    )
+    events = [json.loads(line) for line in import_response.text.splitlines() if line]
+    if import_response.status_code == 200 and events and events[-1]["event"] == "completed":
+        print(f"   [OK] Imported {events[-1]['imported']} chapters "
+              f"(numbers {events[-1]['first_chapter_number']}-{events[-1]['last_chapter_number']})")
+    else:
+        print(f"   [FAIL] Import failed: {import_response.text[:300]}")
+    
+    # Step 22: Whole-book export
+    print("\n22. Exporting the book as NDJSON and EPUB...")
+    export_response = requests.get(f"{BASE_URL}/books/{book_id}/export", params={"format": "ndjson"})
+    if export_response.status_code == 200:
+        exported = [json.loads(line) for line in export_response.text.splitlines() if line]
+        print(f"   [OK] Exported {len(exported)} published chapters as NDJSON")
+    else:
+        print(f"   [FAIL] NDJSON export failed: {export_response.text[:300]}")
+
+    epub_response = requests.get(f"{BASE_URL}/books/{book_id}/export", params={"format": "epub"})
+    if epub_response.status_code == 200 and epub_response.content[30:58] == b"mimetypeapplication/epub+zip":
+        print(f"   [OK] Exported EPUB ({len(epub_response.content)} bytes)")
+        cached_response = requests.get(
+            f"{BASE_URL}/books/{book_id}/export",
+            params={"format": "epub"},
+            headers={"If-None-Match": epub_response.headers["ETag"]}
+        )
+        if cached_response.status_code == 304:
+            print(f"   [OK] Unchanged export not sent again (304)")
+        else:
+            print(f"   [FAIL] Expected 304, got {cached_response.status_code}")
+    else:
+        print(f"   [FAIL] EPUB export failed: {epub_response.status_code}")
+    
+    # Step 23: Scheduled releases
+    print("\n23. Scheduling chapter releases...")
+    next_number = requests.get(
+        f"{BASE_URL}/books/{book_id}/chapters/next-number", headers=headers
+    ).json()["next_chapter_number"]
+    scheduled_chapter = {
+        "title": "Scheduled Chapter",
+        "chapter_number": next_number,
+        "content_type": "simple",
+        "content_data": {"text": "Released on schedule."},
+        "is_published": False
+    }
+    
+    past_response = requests.post(f"{BASE_URL}/books/{book_id}/chapters", json={
+        **scheduled_chapter, "publish_at": (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    }, headers=headers)
+    if past_response.status_code == 422:
+        print(f"   [OK] Release time in the past rejected")
+    else:
+        print(f"   [FAIL] Expected 422 for a past publish_at, got {past_response.status_code}")
+    
+    published_response = requests.post(f"{BASE_URL}/books/{book_id}/chapters", json={
+        **scheduled_chapter, "is_published": True,
+        "publish_at": (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
+    }, headers=headers)
+    if published_response.status_code == 422:
+        print(f"   [OK] Release time on a published chapter rejected")
+    else:
+        print(f"   [FAIL] Expected 422 for a published chapter with publish_at, got {published_response.status_code}")
+    
+    schedule_response = requests.post(f"{BASE_URL}/books/{book_id}/chapters", json={
+        **scheduled_chapter, "publish_at": (datetime.now(timezone.utc) + timedelta(seconds=3)).isoformat()
+    }, headers=headers)
+    if schedule_response.status_code != 201 or not schedule_response.json()["publish_at"]:
+        print(f"   [FAIL] Scheduling a chapter failed: {schedule_response.text}")
+        return
+    scheduled_id = schedule_response.json()["id"]
+    
+    early_response = requests.get(f"{BASE_URL}/chapters/{scheduled_id}", headers=reader_headers)
+    if early_response.status_code == 403:
+        print(f"   [OK] Scheduled chapter {scheduled_id} hidden from readers until its release")
+    else:
+        print(f"   [FAIL] Expected 403 before the release, got {early_response.status_code}")
+    
+    released = None
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        release_response = requests.get(f"{BASE_URL}/chapters/{scheduled_id}", headers=reader_headers)
+        if release_response.status_code == 200:
+            released = release_response.json()
+            break
+        time.sleep(1)
+    if released and released["is_published"] and released["publish_at"] is None:
+        print(f"   [OK] Chapter released on schedule (published_at {released['published_at']})")
+    else:
+        print(f"   [FAIL] Chapter not released within 15 seconds")
+    
+    cancel_response = requests.post(f"{BASE_URL}/books/{book_id}/chapters", json={
+        **scheduled_chapter, "chapter_number": next_number + 1,
+        "publish_at": (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
+    }, headers=headers)
+    cancelled = requests.put(
+        f"{BASE_URL}/chapters/{cancel_response.json()['id']}", json={"publish_at": None}, headers=headers
+    ) if cancel_response.status_code == 201 else cancel_response
+    if cancelled.status_code == 200 and cancelled.json()["publish_at"] is None and not cancelled.json()["is_published"]:
+        print(f"   [OK] Schedule cancelled (chapter stays unpublished)")
+    else:
+        print(f"   [FAIL] Cancelling the schedule failed: {cancelled.text}")
+    
+    # Step 24: A deleted book's scheduled chapters are not released
+    print("\n24. Deleting a book with a chapter about to be released...")
+    doomed_book = requests.post(f"{BASE_URL}/books/", json={**book_data, "title": "Deleted Before Release"},
+                                headers=headers).json()
+    doomed_response = requests.post(f"{BASE_URL}/books/{doomed_book['id']}/chapters", json={
+        **scheduled_chapter, "chapter_number": 1,
+        "publish_at": (datetime.now(timezone.utc) + timedelta(seconds=3)).isoformat()
+    }, headers=headers)
+    if doomed_response.status_code != 201:
+        print(f"   [FAIL] Scheduling a chapter failed: {doomed_response.text}")
+        return
+    doomed_id = doomed_response.json()["id"]
+    time.sleep(1)  # Its release is prepared right away (it is due within PUBLISH_PREPARE_SECONDS)
+    requests.delete(f"{BASE_URL}/books/{doomed_book['id']}", headers=headers)
+    time.sleep(4)
+    gone_response = requests.get(f"{BASE_URL}/chapters/{doomed_id}", headers=reader_headers)
+    if gone_response.status_code == 404:
+        print(f"   [OK] Prepared release dropped with the book (404)")
+    else:
+        print(f"   [FAIL] Expected 404 after deleting the book, got {gone_response.status_code}")
+    
     print("\n" + "=" * 60)
     print("[SUCCESS] All Chapters API tests completed successfully!")
     print("=" * 60)
@@ -344,6 +671,16 @@ def test_chapters_api():
     print(f"  - Tested reader access permissions")
     print(f"  - Deleted a chapter")
     print(f"  - Validated input data")
+    print(f"  - Validated and compiled interactive node graphs")
+    print(f"  - Loaded interactive nodes lazily (window + batch)")
+    print(f"  - Built asset manifests with preload hints")
+    print(f"  - Computed chapter text statistics")
+    print(f"  - Saved content deltas with version checks")
+    print(f"  - Browsed, diffed and restored chapter revisions")
+    print(f"  - Moved several chapters in one batch")
+    print(f"  - Bulk imported chapters from NDJSON")
+    print(f"  - Exported the book as NDJSON and EPUB")
+    print(f"  - Validated, released and cancelled scheduled chapters")
     print("\n[COMPLETE] Phase 1.4: Chapters Management API - COMPLETE!")
 
 
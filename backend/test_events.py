@@ -0,0 +1,186 @@
+"""
+Test script for the change event log (outbox -> relay -> GET /events)
+"""
+import requests
+import time
+
+BASE_URL = "http://localhost:8000/api/v1"
+
+# Longest wait for the relay to move a committed event into the log
+RELAY_TIMEOUT_SECONDS = 10
+
+
+def register_and_login(role: str, timestamp: str):
+    """Register a user with a role and return its auth headers (None on failure)"""
+    user_data = {
+        "username": f"events{role}{timestamp}",
+        "email": f"events{role}{timestamp}@example.com",
+        "password": "EventsPass123",
+        "role": role
+    }
+    response = requests.post(f"{BASE_URL}/auth/register", json=user_data)
+    if response.status_code != 201:
+        print(f"   [FAIL] {role.capitalize()} registration failed: {response.json()}")
+        return None
+
+    login_response = requests.post(
+        f"{BASE_URL}/auth/login",
+        data={"username": user_data["username"], "password": user_data["password"]}
+    )
+    if login_response.status_code != 200:
+        print(f"   [FAIL] {role.capitalize()} login failed: {login_response.json()}")
+        return None
+
+    print(f"   [OK] Logged in as {user_data['username']}")
+    return {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+
+def wait_for_events(headers: dict, after: int, event_type: str, count: int):
+    """Read the log after an offset until `count` events of a type show up (None on timeout)"""
+    deadline = time.time() + RELAY_TIMEOUT_SECONDS
+    while time.time() < deadline:
+        response = requests.get(
+            f"{BASE_URL}/events/",
+            params={"after": after, "type": event_type},
+            headers=headers
+        )
+        if response.status_code != 200:
+            print(f"   [FAIL] Reading events failed: {response.status_code} {response.text}")
+            return None
+        events = response.json()["events"]
+        if len(events) >= count:
+            return response.json()
+        time.sleep(0.5)
+    print(f"   [FAIL] {count} '{event_type}' events not relayed within {RELAY_TIMEOUT_SECONDS}s")
+    return None
+
+
+def test_events_api():
+    """Test that committed changes reach the change log in order"""
+
+    print("=" * 60)
+    print("Testing Interactive Web Novels - Change Events API")
+    print("=" * 60)
+
+    # Step 1: Set up an author (makes changes) and an admin (reads the log)
+    print("\n1. Setting up test users...")
+    timestamp = str(int(time.time()))
+    try:
+        author_headers = register_and_login("author", timestamp)
+    except requests.exceptions.ConnectionError:
+        print("   [FAIL] Cannot connect to server. Is it running?")
+        print("   Hint: cd backend && run.bat")
+        return
+    admin_headers = register_and_login("admin", timestamp)
+    if not author_headers or not admin_headers:
+        return
+
+    # Step 2: Only admins read the log
+    print("\n2. Checking access to the change log...")
+    response = requests.get(f"{BASE_URL}/events/", headers=author_headers)
+    if response.status_code == 403:
+        print("   [OK] Non-admin correctly denied (403)")
+    else:
+        print(f"   [FAIL] Expected 403, got {response.status_code}")
+        return
+
+    response = requests.get(f"{BASE_URL}/events/", params={"limit": 1000}, headers=admin_headers)
+    if response.status_code != 200:
+        print(f"   [FAIL] Reading events failed: {response.json()}")
+        return
+    start_offset = response.json()["next_offset"]
+    while response.json()["events"]:
+        response = requests.get(
+            f"{BASE_URL}/events/", params={"after": start_offset, "limit": 1000}, headers=admin_headers
+        )
+        start_offset = response.json()["next_offset"]
+    print(f"   [OK] Change log read up to offset {start_offset}")
+
+    # Step 3: Record events by changing content
+    print("\n3. Creating and updating a book...")
+    book_response = requests.post(f"{BASE_URL}/books/", json={
+        "title": "Test Book for Events",
+        "description": "A book to test the change log",
+        "genre": "Fantasy",
+        "tags": ["test", "events"],
+        "status": "ongoing"
+    }, headers=author_headers)
+    if book_response.status_code != 201:
+        print(f"   [FAIL] Book creation failed: {book_response.json()}")
+        return
+    book_id = book_response.json()["id"]
+
+    update_response = requests.put(
+        f"{BASE_URL}/books/{book_id}", json={"title": "Test Book for Events (renamed)"}, headers=author_headers
+    )
+    if update_response.status_code != 200:
+        print(f"   [FAIL] Book update failed: {update_response.json()}")
+        return
+    print(f"   [OK] Book {book_id} created and renamed")
+
+    # Step 4: The relay moves them into the log
+    print("\n4. Waiting for the events to be relayed...")
+    page = wait_for_events(admin_headers, start_offset, "book.", 2)
+    if page is None:
+        return
+
+    events = [event for event in page["events"] if event["aggregate_id"] == book_id]
+    types = [event["type"] for event in events]
+    if types[:2] == ["book.created", "book.updated"]:
+        print(f"   [OK] Relayed in commit order: {types[:2]}")
+    else:
+        print(f"   [FAIL] Unexpected events for book {book_id}: {types}")
+        return
+
+    offsets = [event["offset"] for event in page["events"]]
+    if all(offset > start_offset for offset in offsets) and offsets == sorted(set(offsets)):
+        print(f"   [OK] Offsets increase past {start_offset}: {offsets}")
+    else:
+        print(f"   [FAIL] Offsets out of order: {offsets}")
+        return
+    if page["next_offset"] == offsets[-1]:
+        print(f"   [OK] next_offset is the last offset returned ({page['next_offset']})")
+    else:
+        print(f"   [FAIL] next_offset {page['next_offset']} != {offsets[-1]}")
+        return
+
+    # Step 5: Continue from next_offset
+    print("\n5. Continuing from next_offset...")
+    delete_response = requests.delete(f"{BASE_URL}/books/{book_id}", headers=author_headers)
+    if delete_response.status_code != 204:
+        print(f"   [FAIL] Book deletion failed: {delete_response.status_code}")
+        return
+
+    page = wait_for_events(admin_headers, offsets[-1], "book.", 1)
+    if page is None:
+        return
+    deleted = [event for event in page["events"] if event["aggregate_id"] == book_id]
+    if deleted and deleted[0]["type"] == "book.deleted" and deleted[0]["offset"] > offsets[-1]:
+        print(f"   [OK] book.deleted relayed at offset {deleted[0]['offset']}, after the earlier events")
+    else:
+        print(f"   [FAIL] Expected book.deleted after offset {offsets[-1]}: {page['events']}")
+        return
+
+    response = requests.get(
+        f"{BASE_URL}/events/", params={"after": page["next_offset"], "type": "book."}, headers=admin_headers
+    )
+    if response.status_code == 200 and all(
+        event["offset"] > page["next_offset"] for event in response.json()["events"]
+    ):
+        print("   [OK] Events at or before `after` are not returned again")
+    else:
+        print(f"   [FAIL] Unexpected events after {page['next_offset']}: {response.text}")
+        return
+
+    print("\n" + "=" * 60)
+    print("[SUCCESS] All Change Events API tests completed successfully!")
+    print("=" * 60)
+    print("\nTest Summary:")
+    print(f"  - Restricted the change log to admins")
+    print(f"  - Recorded book events with content changes")
+    print(f"  - Relayed them into the log in commit order")
+    print(f"  - Read the log by offset with next_offset")
+
+
+if __name__ == "__main__":
+    test_events_api()
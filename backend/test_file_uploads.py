@@ -173,10 +173,14 @@ def test_cover_image_upload():
     else:
         print(f"   [FAIL] Failed with status {response.status_code}")
     
-    # Test 4: Verify thumbnail is accessible
+    # Test 4: Verify thumbnail is accessible (created by a background job)
     print("\n4. Verifying thumbnail is accessible...")
     full_url = f"http://localhost:8000{thumbnail_url}"
-    response = requests.get(full_url)
+    for _ in range(20):
+        response = requests.get(full_url)
+        if response.status_code == 200:
+            break
+        time.sleep(0.5)
     if response.status_code == 200:
         print("   [OK] Thumbnail is accessible")
         print(f"   Thumbnail size: {len(response.content)} bytes")
@@ -171,6 +171,90 @@ def test_reading_progress():
             print(f"   Response: {response.text}")
 
 
+def test_reading_progress_ticks():
+    """Test buffered reading progress ticks"""
+    print("\n" + "=" * 60)
+    print("Testing Buffered Reading Progress Ticks")
+    print("=" * 60)
+    
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    
+    # Test 1: Send a burst of ticks
+    print("\n1. Sending 20 progress ticks...")
+    accepted = 0
+    for i in range(20):
+        tick_data = {
+            "book_id": book_id,
+            "chapter_id": chapter_id,
+            "progress_percentage": float(i * 5)
+        }
+        response = requests.post(f"{BASE_URL}/reading-progress/ticks", json=tick_data, headers=headers)
+        if response.status_code == 202:
+            accepted += 1
+    
+    if accepted == 20:
+        print("   [OK] All ticks accepted")
+    else:
+        print(f"   [FAIL] Only {accepted}/20 ticks accepted")
+        return
+    
+    # Test 2: Read back immediately - should include the latest buffered tick
+    print("\n2. Reading progress right after the burst...")
+    response = requests.get(f"{BASE_URL}/reading-progress/book/{book_id}", headers=headers)
+    if response.status_code == 200 and response.json()["progress_percentage"] == 95.0:
+        print("   [OK] Latest position returned before flush")
+    else:
+        print(f"   [FAIL] Failed with status {response.status_code}")
+        print(f"   Response: {response.text}")
+
+
+def test_offline_sync():
+    """Test batch sync endpoints for offline clients"""
+    print("\n" + "=" * 60)
+    print("Testing Offline Sync (Batch Writes)")
+    print("=" * 60)
+    
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    
+    # Test 1: Progress batch with a duplicate key and an unknown book
+    print("\n1. Syncing a reading progress batch...")
+    batch = {
+        "items": [
+            {"book_id": book_id, "chapter_id": chapter_id, "progress_percentage": 10.0,
+             "client_timestamp": "2030-01-01T10:00:00Z"},
+            {"book_id": book_id, "chapter_id": chapter_id, "progress_percentage": 5.0,
+             "client_timestamp": "2020-01-01T09:00:00Z"},
+            {"book_id": 999999999, "chapter_id": chapter_id, "progress_percentage": 50.0,
+             "client_timestamp": "2020-01-01T10:00:00Z"}
+        ]
+    }
+    response = requests.post(f"{BASE_URL}/reading-progress/batch", json=batch, headers=headers)
+    if response.status_code == 200:
+        statuses = [r["status"] for r in response.json()["results"]]
+        if statuses == ["applied", "superseded", "invalid"]:
+            print("   [OK] Per-item results returned in request order")
+        else:
+            print(f"   [FAIL] Unexpected statuses: {statuses}")
+    else:
+        print(f"   [FAIL] Failed with status {response.status_code}")
+        print(f"   Response: {response.text}")
+    
+    # Test 2: Bookmark toggles - the latest toggle wins
+    print("\n2. Syncing a bookmark batch...")
+    batch = {
+        "items": [
+            {"book_id": book_id, "bookmarked": True, "client_timestamp": "2020-01-01T10:00:00Z"},
+            {"book_id": book_id, "bookmarked": False, "client_timestamp": "2020-01-01T10:05:00Z"}
+        ]
+    }
+    response = requests.post(f"{BASE_URL}/bookmarks/batch", json=batch, headers=headers)
+    if response.status_code == 200:
+        print(f"   [OK] Applied: {response.json()['applied']}, Superseded: {response.json()['superseded']}")
+    else:
+        print(f"   [FAIL] Failed with status {response.status_code}")
+        print(f"   Response: {response.text}")
+
+
 def test_bookmarks():
     """Test bookmark endpoints"""
     print("\n" + "=" * 60)
@@ -435,6 +519,41 @@ def test_book_statistics():
             print(f"   Response: {response.text}")
 
 
+def test_recommendations():
+    """Test book and user recommendation endpoints"""
+    print("\n" + "=" * 60)
+    print("Testing Recommendations")
+    print("=" * 60)
+    
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    
+    # Lists are precomputed by the background refresh, so they may be empty here
+    print("\n1. Getting books similar to the test book...")
+    response = requests.get(f"{BASE_URL}/books/{book_id}/recommendations?limit=5")
+    if response.status_code == 200:
+        print(f"   [OK] {len(response.json()['books'])} similar books")
+    else:
+        print(f"   [FAIL] Failed with status {response.status_code}")
+    
+    print("\n2. Getting the user's recommendations...")
+    response = requests.get(f"{BASE_URL}/users/me/recommendations?limit=5", headers=headers)
+    if response.status_code == 200:
+        books = response.json()["books"]
+        if any(book["id"] == book_id for book in books):
+            print("   [FAIL] Recommended a book the user already reads")
+        else:
+            print(f"   [OK] {len(books)} recommended books")
+    else:
+        print(f"   [FAIL] Failed with status {response.status_code}")
+    
+    print("\n3. Getting recommendations without authentication...")
+    response = requests.get(f"{BASE_URL}/users/me/recommendations")
+    if response.status_code == 401:
+        print("   [OK] Authentication required")
+    else:
+        print(f"   [FAIL] Expected 401, got {response.status_code}")
+
+
 def main():
     """Run all reader feature tests"""
     print("\n" + "=" * 60)
@@ -448,10 +567,13 @@ def main():
     
     # Run tests
     test_reading_progress()
+    test_reading_progress_ticks()
+    test_offline_sync()
     test_bookmarks()
     test_ratings()
     test_comments()
     test_book_statistics()
+    test_recommendations()
     
     # Summary
     print("\n" + "=" * 60)
@@ -460,10 +582,13 @@ def main():
     print("\nAll reader features have been tested!")
     print("\nFeatures tested:")
     print("  [OK] Reading Progress (Create, Read, Update, Delete)")
+    print("  [OK] Reading Progress Ticks (Buffered, Read-your-writes)")
+    print("  [OK] Offline Sync (Batch progress and bookmarks)")
     print("  [OK] Bookmarks (Create, Read, Delete)")
     print("  [OK] Ratings (Create, Read, Update, Statistics)")
     print("  [OK] Comments (Create, Read, Update, Replies, Count)")
     print("  [OK] Book Statistics (Comprehensive stats)")
+    print("  [OK] Recommendations (Similar books, Per user)")
     print("\n" + "=" * 60)
 
 